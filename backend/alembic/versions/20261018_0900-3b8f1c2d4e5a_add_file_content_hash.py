@@ -0,0 +1,26 @@
+"""add file content hash
+
+Revision ID: 3b8f1c2d4e5a
+Revises: 
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3b8f1c2d4e5a"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好该列，这里按需添加
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("files")}
+    if "content_hash" not in columns:
+        op.add_column("files", sa.Column("content_hash", sa.String(length=64), nullable=True))
+        op.create_index("ix_files_content_hash", "files", ["content_hash"])
+
+def downgrade() -> None:
+    op.drop_index("ix_files_content_hash", table_name="files")
+    op.drop_column("files", "content_hash")
@@ -0,0 +1,59 @@
+"""add upload sessions
+
+Revision ID: 5c2e9a7b1f3d
+Revises: 3b8f1c2d4e5a
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5c2e9a7b1f3d"
+down_revision = "3b8f1c2d4e5a"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好这些表，这里按需创建
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "upload_sessions" not in tables:
+        op.create_table(
+            "upload_sessions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("upload_id", sa.String(length=64), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("original_name", sa.String(length=255), nullable=False),
+            sa.Column("file_type", sa.String(length=50), nullable=False),
+            sa.Column("mime_type", sa.String(length=100), nullable=True),
+            sa.Column("total_size", sa.BigInteger(), nullable=False),
+            sa.Column("chunk_size", sa.Integer(), nullable=False),
+            sa.Column("temp_path", sa.String(length=500), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_upload_sessions_id", "upload_sessions", ["id"])
+        op.create_index("ix_upload_sessions_upload_id", "upload_sessions", ["upload_id"], unique=True)
+        op.create_index("ix_upload_sessions_updated_at", "upload_sessions", ["updated_at"])
+
+    if "upload_chunks" not in tables:
+        op.create_table(
+            "upload_chunks",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "session_id",
+                sa.Integer(),
+                sa.ForeignKey("upload_sessions.id", ondelete="CASCADE"),
+                nullable=False
+            ),
+            sa.Column("chunk_index", sa.Integer(), nullable=False),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.UniqueConstraint("session_id", "chunk_index", name="uq_upload_chunks_session_index"),
+        )
+        op.create_index("ix_upload_chunks_id", "upload_chunks", ["id"])
+
+def downgrade() -> None:
+    op.drop_table("upload_chunks")
+    op.drop_table("upload_sessions")
@@ -0,0 +1,47 @@
+"""add content-addressed blob store
+
+Revision ID: 7d4a1e6c9b2f
+Revises: 5c2e9a7b1f3d
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7d4a1e6c9b2f"
+down_revision = "5c2e9a7b1f3d"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好表和列，这里按需创建
+    inspector = sa.inspect(op.get_bind())
+
+    if "blobs" not in inspector.get_table_names():
+        op.create_table(
+            "blobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("content_hash", sa.String(length=64), nullable=False),
+            sa.Column("storage_path", sa.String(length=500), nullable=False),
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_blobs_id", "blobs", ["id"])
+        op.create_index("ix_blobs_content_hash", "blobs", ["content_hash"], unique=True)
+
+    # 已有文件保留各自的存储路径（blob_id 为空），删除时按旧方式直接删除
+    columns = {column["name"] for column in inspector.get_columns("files")}
+    if "blob_id" not in columns:
+        with op.batch_alter_table("files") as batch_op:
+            batch_op.add_column(sa.Column("blob_id", sa.Integer(), nullable=True))
+            batch_op.create_foreign_key("fk_files_blob_id_blobs", "blobs", ["blob_id"], ["id"])
+            batch_op.create_index("ix_files_blob_id", ["blob_id"])
+
+def downgrade() -> None:
+    with op.batch_alter_table("files") as batch_op:
+        batch_op.drop_index("ix_files_blob_id")
+        batch_op.drop_constraint("fk_files_blob_id_blobs", type_="foreignkey")
+        batch_op.drop_column("blob_id")
+    op.drop_table("blobs")
@@ -0,0 +1,35 @@
+"""add dashboard stats dimension
+
+Revision ID: 9e3b5f2a7c41
+Revises: 7d4a1e6c9b2f
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9e3b5f2a7c41"
+down_revision = "7d4a1e6c9b2f"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好该列和约束，这里按需添加
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("dashboard_stats")}
+    constraints = {constraint["name"] for constraint in inspector.get_unique_constraints("dashboard_stats")}
+
+    with op.batch_alter_table("dashboard_stats") as batch_op:
+        if "dimension" not in columns:
+            batch_op.add_column(sa.Column("dimension", sa.String(length=100), nullable=False, server_default=""))
+        if "uq_dashboard_stats_type_date_dimension" not in constraints:
+            batch_op.create_unique_constraint(
+                "uq_dashboard_stats_type_date_dimension",
+                ["stat_type", "stat_date", "dimension"]
+            )
+
+def downgrade() -> None:
+    with op.batch_alter_table("dashboard_stats") as batch_op:
+        batch_op.drop_constraint("uq_dashboard_stats_type_date_dimension", type_="unique")
+        batch_op.drop_column("dimension")
@@ -0,0 +1,33 @@
+"""add activity sketches
+
+Revision ID: b2c6d8e4f1a3
+Revises: 9e3b5f2a7c41
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b2c6d8e4f1a3"
+down_revision = "9e3b5f2a7c41"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好该表，这里按需创建
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "activity_sketches" not in tables:
+        op.create_table(
+            "activity_sketches",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("sketch_date", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("sketch", sa.LargeBinary(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_activity_sketches_id", "activity_sketches", ["id"])
+        op.create_index("ix_activity_sketches_sketch_date", "activity_sketches", ["sketch_date"], unique=True)
+
+def downgrade() -> None:
+    op.drop_table("activity_sketches")
@@ -0,0 +1,38 @@
+"""add composite indexes
+
+Revision ID: c4e8a1f7d2b9
+Revises: b2c6d8e4f1a3
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c4e8a1f7d2b9"
+down_revision = "b2c6d8e4f1a3"
+branch_labels = None
+depends_on = None
+
+# 索引名 -> (表名, 列)
+INDEXES = {
+    "ix_chat_messages_session_created": ("chat_messages", ["session_id", "created_at"]),
+    "ix_chat_sessions_user_active_updated": ("chat_sessions", ["user_id", "is_active", "updated_at"]),
+    "ix_files_user_created": ("files", ["user_id", "created_at"]),
+    "ix_tool_usage_user_created": ("tool_usage", ["user_id", "created_at"]),
+    "ix_user_activities_created_type": ("user_activities", ["created_at", "activity_type"]),
+    "ix_user_activities_user_created": ("user_activities", ["user_id", "created_at"]),
+    "ix_tools_active_public_usage": ("tools", ["is_active", "is_public", "usage_count"]),
+}
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好这些索引，这里按需创建
+    inspector = sa.inspect(op.get_bind())
+    for name, (table, columns) in INDEXES.items():
+        existing = {index["name"] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns)
+
+def downgrade() -> None:
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,71 @@
+"""add chat message cumulative tokens
+
+Revision ID: d7f3b9c2e6a4
+Revises: c4e8a1f7d2b9
+Create Date: 2026-10-18 15:00:00
+
+"""
+import math
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d7f3b9c2e6a4"
+down_revision = "c4e8a1f7d2b9"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# 按本迁移编写时的估算规则固定下来，不引用应用代码，以免之后修改计数方式影响迁移结果。
+# 回填值只是已有消息的近似 token 数，累计值与写入的 tokens 保持一致即可。
+MESSAGE_OVERHEAD = 4
+CJK_CHAR = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+def message_tokens(content: str) -> int:
+    """中日韩字符每字约 1 个 token，其余约 4 个字符 1 个，另加每条消息的格式开销"""
+    content = content or ""
+    cjk = len(CJK_CHAR.findall(content))
+    return cjk + math.ceil((len(content) - cjk) / 4) + MESSAGE_OVERHEAD
+
+def backfill_tokens(connection) -> None:
+    """为已有消息计算 token 数和会话内累计值"""
+    rows = connection.execute(sa.text(
+        "SELECT id, session_id, content, tokens FROM chat_messages ORDER BY session_id, id"
+    ))
+    update = sa.text("UPDATE chat_messages SET tokens = :tokens, cumulative_tokens = :cumulative WHERE id = :id")
+    batch = []
+    session_id, cumulative = None, 0
+    for row in rows.fetchall():
+        if row.session_id != session_id:
+            session_id, cumulative = row.session_id, 0
+        tokens = row.tokens or message_tokens(row.content)
+        cumulative += tokens
+        batch.append({"id": row.id, "tokens": tokens, "cumulative": cumulative})
+        if len(batch) >= BATCH_SIZE:
+            connection.execute(update, batch)
+            batch = []
+    if batch:
+        connection.execute(update, batch)
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好该列和索引，这里按需添加
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("chat_messages")}
+    indexes = {index["name"] for index in inspector.get_indexes("chat_messages")}
+
+    if "cumulative_tokens" not in columns:
+        op.add_column(
+            "chat_messages",
+            sa.Column("cumulative_tokens", sa.Integer(), nullable=False, server_default="0")
+        )
+        backfill_tokens(op.get_bind())
+    if "ix_chat_messages_session_cumulative" not in indexes:
+        op.create_index("ix_chat_messages_session_cumulative", "chat_messages", ["session_id", "cumulative_tokens"])
+
+def downgrade() -> None:
+    op.drop_index("ix_chat_messages_session_cumulative", table_name="chat_messages")
+    with op.batch_alter_table("chat_messages") as batch_op:
+        batch_op.drop_column("cumulative_tokens")
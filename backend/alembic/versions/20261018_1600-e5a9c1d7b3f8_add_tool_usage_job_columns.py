@@ -0,0 +1,51 @@
+"""add tool usage job columns
+
+Revision ID: e5a9c1d7b3f8
+Revises: d7f3b9c2e6a4
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e5a9c1d7b3f8"
+down_revision = "d7f3b9c2e6a4"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("job_id", sa.String(length=32), nullable=True),
+    sa.Column("status", sa.String(length=20), nullable=False, server_default="done"),
+    sa.Column("error", sa.Text(), nullable=True),
+    sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    sa.Column("queued_at", sa.DateTime(timezone=True), nullable=True),
+    sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+    sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+]
+
+# 索引名 -> (列, 是否唯一)
+INDEXES = {
+    "ix_tool_usage_job_id": (["job_id"], True),
+    "ix_tool_usage_status_id": (["status", "id"], False),
+}
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好这些列和索引，这里按需添加
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("tool_usage")}
+    indexes = {index["name"] for index in inspector.get_indexes("tool_usage")}
+
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("tool_usage", column)
+    for name, (index_columns, unique) in INDEXES.items():
+        if name not in indexes:
+            op.create_index(name, "tool_usage", index_columns, unique=unique)
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="tool_usage")
+    with op.batch_alter_table("tool_usage") as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,30 @@
+"""add tool usage cached flag
+
+Revision ID: f2b8d4a6c1e9
+Revises: e5a9c1d7b3f8
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f2b8d4a6c1e9"
+down_revision = "e5a9c1d7b3f8"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好该列，这里按需添加
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("tool_usage")}
+
+    if "cached" not in columns:
+        op.add_column(
+            "tool_usage",
+            sa.Column("cached", sa.Boolean(), nullable=False, server_default="0")
+        )
+
+def downgrade() -> None:
+    with op.batch_alter_table("tool_usage") as batch_op:
+        batch_op.drop_column("cached")
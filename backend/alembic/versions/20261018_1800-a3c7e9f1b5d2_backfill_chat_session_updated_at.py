@@ -0,0 +1,37 @@
+"""backfill chat session updated_at
+
+Revision ID: a3c7e9f1b5d2
+Revises: f2b8d4a6c1e9
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a3c7e9f1b5d2"
+down_revision = "f2b8d4a6c1e9"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # 从未更新过的会话以创建时间作为更新时间，之后该列不再为空
+    op.execute(
+        "UPDATE chat_sessions SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+    )
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.alter_column(
+            "updated_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now()
+        )
+
+def downgrade() -> None:
+    with op.batch_alter_table("chat_sessions") as batch_op:
+        batch_op.alter_column(
+            "updated_at",
+            existing_type=sa.DateTime(timezone=True),
+            nullable=True,
+            server_default=None
+        )
@@ -0,0 +1,24 @@
+"""add users active index
+
+Revision ID: b8d2f4a6c3e1
+Revises: a3c7e9f1b5d2
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b8d2f4a6c3e1"
+down_revision = "a3c7e9f1b5d2"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # init_db 的 create_all 可能已建好该索引，这里按需创建
+    inspector = sa.inspect(op.get_bind())
+    if "ix_users_is_active" not in {index["name"] for index in inspector.get_indexes("users")}:
+        op.create_index("ix_users_is_active", "users", ["is_active"])
+
+def downgrade() -> None:
+    op.drop_index("ix_users_is_active", table_name="users")
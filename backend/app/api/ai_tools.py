@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, distinct
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import aclosing
+from typing import List, Optional
 
-from ..db.database import get_db
+from ..db.database import get_async_db
+from ..core.config import settings
 from ..core.security import get_current_user
 from ..models.tool import Tool, ToolUsage
-from ..schemas import ToolResponse, ToolUsageResponse, BaseResponse
+from ..schemas import ToolResponse, ToolUsageResponse, ToolJobResponse, ToolBatchRequest, BaseResponse
+from ..services.counters import counter_buffer
+from ..services.activity import activity_queue
+from ..services.pagination import Cursor, page_cursor, fetch_page
+from ..services.jobs import job_engine, get_job
+from ..services.tool_executors import ToolInputError
+from ..services.streaming import SSE_HEADERS, cancel_on_disconnect, sse_event
 
 router = APIRouter(prefix="/ai-tools", tags=["AI工具管理"])
 
@@ -14,99 +24,211 @@ async def get_tools(
     category: str | None = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[Cursor] = Depends(page_cursor),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取AI工具列表"""
-    query = db.query(Tool).filter(Tool.is_active == True)
+    """获取AI工具列表（按创建时间正序，支持 cursor 分页）"""
+    query = select(Tool).where(Tool.is_active == True)
     
     if category:
-        query = query.filter(Tool.category == category)
+        query = query.where(Tool.category == category)
     
-    tools = query.offset(skip).limit(limit).all()
+    tools, next_cursor = await fetch_page(db, query, Tool.created_at, Tool.id, cursor, limit, skip)
     
     return BaseResponse(
         message="获取工具列表成功",
-        data=[ToolResponse.model_validate(tool) for tool in tools]
+        data=[ToolResponse.model_validate(tool) for tool in tools],
+        next_cursor=next_cursor
     )
 
-@router.get("/{tool_id}", response_model=BaseResponse)
-async def get_tool_detail(
-    tool_id: str,
-    db: Session = Depends(get_db)
-):
-    """获取工具详情"""
-    tool = db.query(Tool).filter(
-        Tool.tool_id == tool_id,
-        Tool.is_active == True
-    ).first()
+async def get_active_tool(db: AsyncSession, tool_id: str) -> Tool:
+    tool = await db.scalar(
+        select(Tool).where(
+            Tool.tool_id == tool_id,
+            Tool.is_active == True
+        )
+    )
     
     if not tool:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="工具不存在"
         )
+    return tool
+
+@router.get("/{tool_id}", response_model=BaseResponse)
+async def get_tool_detail(
+    tool_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取工具详情"""
+    tool = await get_active_tool(db, tool_id)
     
     return BaseResponse(
         message="获取工具详情成功",
         data=ToolResponse.model_validate(tool)
     )
 
+async def submit_tool_job(db: AsyncSession, tool: Tool, user_id: int, input_data: dict) -> ToolUsage:
+    """提交工具任务并记录使用次数和活动"""
+    try:
+        usage = await job_engine.submit(db, tool, user_id, input_data)
+    except ToolInputError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # 更新工具使用次数（缓冲后批量写入）
+    counter_buffer.increment(Tool, "usage_count", tool.id)
+    
+    # 记录使用活动
+    await activity_queue.record(user_id, "tool_use", {"tool_id": tool.tool_id})
+    return usage
+
 @router.post("/{tool_id}/use", response_model=BaseResponse)
 async def use_tool(
     tool_id: str,
     input_data: dict,
+    response: Response,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """使用AI工具"""
-    tool = db.query(Tool).filter(
-        Tool.tool_id == tool_id,
-        Tool.is_active == True
-    ).first()
+    """
+    使用AI工具
     
-    if not tool:
+    工具在后台任务中执行，最多等待 TOOL_INLINE_WAIT 秒；届时仍未完成则返回202和任务状态，
+    之后通过 /ai-tools/jobs/{job_id} 查询结果。
+    相同输入的结果已缓存时直接返回。
+    """
+    tool = await get_active_tool(db, tool_id)
+    usage = await submit_tool_job(db, tool, current_user["id"], input_data)
+    # 等待结果期间归还数据库连接（会话在响应发送后才关闭，否则并发等待的请求会占满连接池）
+    await db.close()
+    
+    job = usage
+    if not usage.cached:
+        job = await job_engine.wait(usage.job_id, current_user["id"], settings.TOOL_INLINE_WAIT) or usage
+    if job.status == "failed":
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="工具不存在"
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"工具执行失败: {job.error}"
+        )
+    if job.status != "done":
+        response.status_code = status.HTTP_202_ACCEPTED
+        return BaseResponse(
+            message="工具任务已提交，请稍后查询结果",
+            data=ToolJobResponse.model_validate(job)
         )
     
-    # 这里应该调用具体的AI工具服务
-    # 暂时返回模拟结果
-    result = {
-        "tool_id": tool_id,
-        "result": f"工具 {tool.name} 的处理结果",
-        "status": "success"
-    }
-    
-    # 记录使用日志
-    usage_record = ToolUsage(
-        tool_id=tool.id,
-        user_id=current_user["id"],
-        usage_data=input_data,
-        result_data=result
+    return BaseResponse(
+        message="工具使用成功",
+        data=job.result_data
     )
-    db.add(usage_record)
+
+@router.post("/{tool_id}/batch", response_model=BaseResponse)
+async def use_tool_batch(
+    tool_id: str,
+    batch: ToolBatchRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    批量使用AI工具
     
-    # 更新工具使用次数
-    from sqlalchemy import update
-    stmt = update(Tool).where(Tool.id == tool.id).values(usage_count=Tool.usage_count + 1)
-    db.execute(stmt)
+    一次提交多个输入（最多 TOOL_BATCH_MAX_ITEMS 个），执行完成后按输入顺序返回每项的状态和结果；
+    单项失败时该项 status 为 failed、error 为原因，不影响其他项。
+    """
+    if len(batch.inputs) > settings.TOOL_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"一次最多提交 {settings.TOOL_BATCH_MAX_ITEMS} 个输入"
+        )
+    tool = await get_active_tool(db, tool_id)
+    # 查询完输入引用的文件后关闭会话，执行期间不占用数据库连接
+    usages = await job_engine.run_batch(db, tool, current_user["id"], batch.inputs)
     
-    db.commit()
+    # 使用次数按输入数一次累加
+    counter_buffer.increment(Tool, "usage_count", tool.id, delta=len(usages))
+    await activity_queue.record(current_user["id"], "tool_use", {"tool_id": tool.tool_id, "count": len(usages)})
     
+    items = [ToolJobResponse.model_validate(usage) for usage in usages]
+    succeeded = sum(item.status == "done" for item in items)
     return BaseResponse(
-        message="工具使用成功",
-        data=result
+        message=f"批量使用完成，成功 {succeeded} 项，失败 {len(items) - succeeded} 项",
+        data={"total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded, "items": items}
+    )
+
+@router.post("/{tool_id}/jobs", response_model=BaseResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    tool_id: str,
+    input_data: dict,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """提交后台工具任务，立即返回任务ID"""
+    tool = await get_active_tool(db, tool_id)
+    usage = await submit_tool_job(db, tool, current_user["id"], input_data)
+    
+    return BaseResponse(
+        message="工具任务已提交",
+        data=ToolJobResponse.model_validate(usage)
+    )
+
+@router.get("/jobs/{job_id}", response_model=BaseResponse)
+async def get_job_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """查询后台工具任务的状态和结果"""
+    job = await get_job(db, job_id, current_user["id"])
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    
+    return BaseResponse(
+        message="获取任务状态成功",
+        data=ToolJobResponse.model_validate(job)
+    )
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_status(
+    job_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """以 Server-Sent Events 推送任务状态变化（status 事件），任务结束后关闭"""
+    if not await get_job(db, job_id, current_user["id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    # 推送期间不占用数据库连接，状态由 watch 按需读取
+    await db.close()
+    
+    async def events():
+        async with aclosing(job_engine.watch(job_id, current_user["id"])) as updates:
+            async for job in updates:
+                yield sse_event(ToolJobResponse.model_validate(job).model_dump(mode="json"), "status")
+    
+    return StreamingResponse(
+        cancel_on_disconnect(request, events()),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
     )
 
 @router.get("/{tool_id}/related", response_model=BaseResponse)
 async def get_related_tools(
     tool_id: str,
     limit: int = 5,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取相关工具"""
-    current_tool = db.query(Tool).filter(Tool.tool_id == tool_id).first()
+    current_tool = await db.scalar(select(Tool).where(Tool.tool_id == tool_id))
     if not current_tool:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -114,12 +236,14 @@ async def get_related_tools(
         )
     
     # 获取同分类的其他工具
-    related_tools = db.query(Tool).filter(
-        Tool.category == current_tool.category,
-        Tool.id != current_tool.id,
-        Tool.is_active == True,
-        Tool.is_public == True
-    ).limit(limit).all()
+    related_tools = (await db.scalars(
+        select(Tool).where(
+            Tool.category == current_tool.category,
+            Tool.id != current_tool.id,
+            Tool.is_active == True,
+            Tool.is_public == True
+        ).limit(limit)
+    )).all()
     
     return BaseResponse(
         message="获取相关工具成功",
@@ -130,27 +254,31 @@ async def get_related_tools(
 async def get_user_tool_usage(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[Cursor] = Depends(page_cursor),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取用户的工具使用记录"""
-    usage_records = db.query(ToolUsage).filter(
-        ToolUsage.user_id == current_user["id"]
-    ).order_by(ToolUsage.created_at.desc()).offset(skip).limit(limit).all()
+    """获取用户的工具使用记录（按时间倒序，支持 cursor 分页）"""
+    usage_records, next_cursor = await fetch_page(
+        db,
+        select(ToolUsage).where(ToolUsage.user_id == current_user["id"]),
+        ToolUsage.created_at, ToolUsage.id, cursor, limit, skip, descending=True
+    )
     
     return BaseResponse(
         message="获取使用记录成功",
-        data=[ToolUsageResponse.model_validate(record) for record in usage_records]
+        data=[ToolUsageResponse.model_validate(record) for record in usage_records],
+        next_cursor=next_cursor
     )
 
 @router.get("/categories", response_model=BaseResponse)
-async def get_tool_categories(db: Session = Depends(get_db)):
+async def get_tool_categories(db: AsyncSession = Depends(get_async_db)):
     """获取工具分类"""
-    from sqlalchemy import distinct
-    
-    categories = db.query(distinct(Tool.category)).filter(
-        Tool.is_active == True
-    ).all()
+    categories = (await db.execute(
+        select(distinct(Tool.category)).where(
+            Tool.is_active == True
+        )
+    )).all()
     
     category_list = [cat[0] for cat in categories if cat[0]]
     
@@ -162,13 +290,15 @@ async def get_tool_categories(db: Session = Depends(get_db)):
 @router.get("/hot/list", response_model=BaseResponse)
 async def get_hot_tools(
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取热门工具"""
-    hot_tools = db.query(Tool).filter(
-        Tool.is_active == True,
-        Tool.is_public == True
-    ).order_by(Tool.usage_count.desc()).limit(limit).all()
+    hot_tools = (await db.scalars(
+        select(Tool).where(
+            Tool.is_active == True,
+            Tool.is_public == True
+        ).order_by(Tool.usage_count.desc()).limit(limit)
+    )).all()
     
     return BaseResponse(
         message="获取热门工具成功",
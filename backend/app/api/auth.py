@@ -1,20 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime, timezone
 
-from ..core.security import get_password_hash, verify_password, create_tokens, get_current_user
-from ..db.database import get_db
+from ..core.security import (
+    get_password_hash_async,
+    verify_password_async,
+    verify_and_update_password,
+    create_tokens,
+    get_current_user,
+    invalidate_user_cache
+)
+from ..db.database import get_async_db
 from ..models.user import User
 from ..schemas import UserCreate, UserResponse, UserUpdate, BaseResponse, LoginRequest, Token, RefreshTokenRequest
+from ..services.activity import activity_queue
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
 @router.post("/register", response_model=BaseResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """用户注册"""
     # 检查用户名是否已存在
-    existing_user = db.query(User).filter(User.username == user.username).first()
+    existing_user = await db.scalar(select(User).where(User.username == user.username))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,7 +31,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # 检查邮箱是否已存在
-    existing_email = db.query(User).filter(User.email == user.email).first()
+    existing_email = await db.scalar(select(User).where(User.email == user.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,12 +42,12 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     db_user = User(
         username=user.username,
         email=user.email,
-        password_hash=get_password_hash(user.password),
+        password_hash=await get_password_hash_async(user.password),
         full_name=user.full_name
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return BaseResponse(
         message="注册成功",
@@ -46,11 +55,19 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=BaseResponse)
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
     # 查找用户
-    user = db.query(User).filter(User.username == login_data.username).first()
-    if not user or not verify_password(login_data.password, user.password_hash):  # type: ignore
+    user = await db.scalar(select(User).where(User.username == login_data.username))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="用户名或密码错误"
+        )
+    
+    # 验证密码（在线程池中执行），成本因子变化时返回新哈希
+    valid, new_hash = await verify_and_update_password(login_data.password, user.password_hash)  # type: ignore
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误"
@@ -67,7 +84,14 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     
     # 更新最后登录时间
     user.last_login = datetime.now(timezone.utc)  # type: ignore
-    db.commit()
+    
+    # 透明升级密码哈希
+    if new_hash:
+        user.password_hash = new_hash  # type: ignore
+    await db.commit()
+    
+    # 记录登录活动
+    await activity_queue.record(user.id, "login")  # type: ignore
     
     return BaseResponse(
         message="登录成功",
@@ -106,10 +130,10 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 async def update_current_user_info(
     user_update: UserUpdate, 
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新当前用户信息"""
-    user = db.query(User).filter(User.id == current_user["id"]).first()
+    user = await db.scalar(select(User).where(User.id == current_user["id"]))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -121,8 +145,11 @@ async def update_current_user_info(
     for field, value in update_data.items():
         setattr(user, field, value)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    
+    # 提交后再次失效，避免并发请求缓存到旧数据
+    invalidate_user_cache(user.id)
     
     return BaseResponse(
         message="更新用户信息成功",
@@ -140,10 +167,10 @@ async def change_password(
     old_password: str,
     new_password: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """修改密码"""
-    user = db.query(User).filter(User.id == current_user["id"]).first()
+    user = await db.scalar(select(User).where(User.id == current_user["id"]))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -151,14 +178,14 @@ async def change_password(
         )
     
     # 验证旧密码
-    if not verify_password(old_password, user.password_hash):  # type: ignore
+    if not await verify_password_async(old_password, user.password_hash):  # type: ignore
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="旧密码错误"
         )
     
     # 更新密码
-    user.password_hash = get_password_hash(new_password)  # type: ignore
-    db.commit()
+    user.password_hash = await get_password_hash_async(new_password)  # type: ignore
+    await db.commit()
     
     return BaseResponse(message="密码修改成功")
\ No newline at end of file
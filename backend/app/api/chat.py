@@ -1,27 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from contextlib import aclosing
+import asyncio
+import json
+import logging
+import time
 import uuid
 from datetime import datetime, timezone
 
-from ..db.database import get_db
-from ..core.security import get_current_user
+from ..db.database import get_async_db, AsyncSessionLocal
+from ..core.security import get_current_user, authenticate_token
+from ..core.config import settings
+from ..core.metrics import metrics
 from ..models.chat import ChatSession, ChatMessage
+from ..services.search_index import DOC_MESSAGE, remove_documents
+from ..services.pagination import Cursor, page_cursor, fetch_page
+from ..services.llm import stream_chat, complete_chat, ChatBackendError
+from ..services.chat_context import build_context, new_chat_message
+from ..services.streaming import sse_event, cancel_on_disconnect, SSE_HEADERS
 from ..schemas import (
     ChatSessionCreate, 
     ChatSessionResponse, 
     ChatMessageResponse, 
     ChatMessageCreate,
+    ChatStreamRequest,
     BaseResponse
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["AI聊天"])
 
 @router.post("/sessions", response_model=BaseResponse)
 async def create_chat_session(
     session_data: ChatSessionCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建聊天会话"""
     # 生成唯一的会话ID
@@ -35,8 +53,8 @@ async def create_chat_session(
     )
     
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    await db.commit()
+    await db.refresh(db_session)
     
     return BaseResponse(
         message="创建会话成功",
@@ -47,31 +65,39 @@ async def create_chat_session(
 async def get_chat_sessions(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[Cursor] = Depends(page_cursor),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取用户的聊天会话列表"""
-    sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user["id"],
-        ChatSession.is_active == True
-    ).order_by(ChatSession.updated_at.desc()).offset(skip).limit(limit).all()
+    """获取用户的聊天会话列表（按更新时间倒序，支持 cursor 分页）"""
+    sessions, next_cursor = await fetch_page(
+        db,
+        select(ChatSession).where(
+            ChatSession.user_id == current_user["id"],
+            ChatSession.is_active == True
+        ),
+        ChatSession.updated_at, ChatSession.id, cursor, limit, skip, descending=True
+    )
     
     return BaseResponse(
         message="获取会话列表成功",
-        data=[ChatSessionResponse.model_validate(session) for session in sessions]
+        data=[ChatSessionResponse.model_validate(session) for session in sessions],
+        next_cursor=next_cursor
     )
 
 @router.get("/sessions/{session_id}", response_model=BaseResponse)
 async def get_chat_session(
     session_id: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取聊天会话详情"""
-    session = db.query(ChatSession).filter(
-        ChatSession.session_id == session_id,
-        ChatSession.user_id == current_user["id"]
-    ).first()
+    session = await db.scalar(
+        select(ChatSession).where(
+            ChatSession.session_id == session_id,
+            ChatSession.user_id == current_user["id"]
+        )
+    )
     
     if not session:
         raise HTTPException(
@@ -88,13 +114,15 @@ async def get_chat_session(
 async def delete_chat_session(
     session_id: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除聊天会话"""
-    session = db.query(ChatSession).filter(
-        ChatSession.session_id == session_id,
-        ChatSession.user_id == current_user["id"]
-    ).first()
+    session = await db.scalar(
+        select(ChatSession).where(
+            ChatSession.session_id == session_id,
+            ChatSession.user_id == current_user["id"]
+        )
+    )
     
     if not session:
         raise HTTPException(
@@ -102,11 +130,9 @@ async def delete_chat_session(
             detail="会话不存在"
         )
     
-    # 软删除，标记为不活跃
-    from sqlalchemy import update
-    stmt = update(ChatSession).where(ChatSession.id == session.id).values(is_active=False)
-    db.execute(stmt)
-    db.commit()
+    # 软删除，标记为不活跃（通过ORM更新以同步搜索索引）
+    session.is_active = False  # type: ignore
+    await db.commit()
     
     return BaseResponse(message="删除会话成功")
 
@@ -115,15 +141,18 @@ async def get_chat_messages(
     session_id: str,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[Cursor] = Depends(page_cursor),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取聊天消息"""
+    """获取聊天消息（按时间正序，支持 cursor 分页）"""
     # 验证会话所有权
-    session = db.query(ChatSession).filter(
-        ChatSession.session_id == session_id,
-        ChatSession.user_id == current_user["id"]
-    ).first()
+    session = await db.scalar(
+        select(ChatSession).where(
+            ChatSession.session_id == session_id,
+            ChatSession.user_id == current_user["id"]
+        )
+    )
     
     if not session:
         raise HTTPException(
@@ -131,13 +160,16 @@ async def get_chat_messages(
             detail="会话不存在"
         )
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session.id
-    ).order_by(ChatMessage.created_at.asc()).offset(skip).limit(limit).all()
+    messages, next_cursor = await fetch_page(
+        db,
+        select(ChatMessage).where(ChatMessage.session_id == session.id),
+        ChatMessage.created_at, ChatMessage.id, cursor, limit, skip
+    )
     
     return BaseResponse(
         message="获取消息成功",
-        data=[ChatMessageResponse.model_validate(msg) for msg in messages]
+        data=[ChatMessageResponse.model_validate(msg) for msg in messages],
+        next_cursor=next_cursor
     )
 
 @router.post("/sessions/{session_id}/messages", response_model=BaseResponse)
@@ -145,14 +177,16 @@ async def send_message(
     session_id: str,
     message_data: ChatMessageCreate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """发送聊天消息"""
     # 验证会话所有权
-    session = db.query(ChatSession).filter(
-        ChatSession.session_id == session_id,
-        ChatSession.user_id == current_user["id"]
-    ).first()
+    session = await db.scalar(
+        select(ChatSession).where(
+            ChatSession.session_id == session_id,
+            ChatSession.user_id == current_user["id"]
+        )
+    )
     
     if not session:
         raise HTTPException(
@@ -160,32 +194,24 @@ async def send_message(
             detail="会话不存在"
         )
     
-    # 保存用户消息
-    user_message = ChatMessage(
-        session_id=session.id,
-        role="user",
-        content=message_data.content
+    # 携带预算内的历史消息调用模型服务（未配置时返回模拟回复）
+    model = session.model_type or settings.DEFAULT_AI_MODEL
+    messages = await build_context(
+        db, session.id, model, pending=[{"role": "user", "content": message_data.content}]
     )
-    db.add(user_message)
-    
-    # 这里应该调用AI服务生成回复
-    # 暂时返回模拟的AI回复
-    ai_reply = f"这是AI助手对您的消息 '{message_data.content}' 的回复。"
-    
-    # 保存AI回复
-    ai_message = ChatMessage(
-        session_id=session.id,
-        role="assistant",
-        content=ai_reply
-    )
-    db.add(ai_message)
-    
-    # 更新会话时间
-    from sqlalchemy import update
-    stmt = update(ChatSession).where(ChatSession.id == session.id).values(updated_at=datetime.now(timezone.utc))
-    db.execute(stmt)
+    session_pk = session.id
+    # 等待模型回复期间归还数据库连接（可能长达读取超时加重试），回复用独立的会话保存
+    await db.close()
+    try:
+        ai_reply = await complete_chat(model, messages)
+    except ChatBackendError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     
-    db.commit()
+    # 保存用户消息和AI回复（逐条写入以累计 token 数）
+    user_message, ai_message = await save_chat_exchange(session_pk, message_data.content, ai_reply, model)
     
     return BaseResponse(
         message="消息发送成功",
@@ -195,18 +221,193 @@ async def send_message(
         }
     )
 
+async def save_chat_exchange(session_pk: int, content: str, reply: str, model: str) -> Tuple[ChatMessage, ChatMessage]:
+    """用独立的数据库会话保存用户消息和回复并更新会话时间（等待回复期间不占用请求的会话）"""
+    async with AsyncSessionLocal() as db:
+        user_message = new_chat_message(session_pk, "user", content, model)
+        db.add(user_message)
+        await db.flush()
+        ai_message = new_chat_message(session_pk, "assistant", reply, model)
+        db.add(ai_message)
+        await db.execute(
+            update(ChatSession).where(ChatSession.id == session_pk).values(updated_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+        await db.refresh(user_message)
+        await db.refresh(ai_message)
+        return user_message, ai_message
+
+async def stream_reply(session_pk: int, model_type: str, content: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    流式生成回复，依次产出 start、token…、done（或 error）事件
+
+    与 send_message 相同，用户消息和回复在生成完成后一起保存（随 done 事件返回）；
+    生成失败或中途被关闭（客户端断开或取消）时都不保存，上游请求随之中止。
+    """
+    model = model_type or settings.DEFAULT_AI_MODEL
+    async with AsyncSessionLocal() as db:
+        messages = await build_context(db, session_pk, model, pending=[{"role": "user", "content": content}])
+    yield {"type": "start"}
+    
+    started = time.perf_counter()
+    parts: List[str] = []
+    try:
+        async with aclosing(stream_chat(model, messages)) as deltas:
+            async for delta in deltas:
+                if not parts:
+                    metrics.observe("chat.stream.first_token", time.perf_counter() - started)
+                parts.append(delta)
+                yield {"type": "token", "delta": delta}
+    except ChatBackendError as e:
+        metrics.inc("chat.stream.failed")
+        yield {"type": "error", "detail": str(e)}
+        return
+    except (asyncio.CancelledError, GeneratorExit):
+        metrics.inc("chat.stream.cancelled")
+        raise
+    
+    user_message, ai_message = await save_chat_exchange(session_pk, content, "".join(parts), model)
+    metrics.inc("chat.stream.completed")
+    metrics.observe("chat.stream", time.perf_counter() - started)
+    yield {
+        "type": "done",
+        "user_message": ChatMessageResponse.model_validate(user_message).model_dump(mode="json"),
+        "ai_message": ChatMessageResponse.model_validate(ai_message).model_dump(mode="json")
+    }
+
+@router.post("/sessions/{session_id}/messages/stream")
+async def send_message_stream(
+    session_id: str,
+    message_data: ChatStreamRequest,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """发送聊天消息，以 Server-Sent Events 逐段返回回复（客户端断开即停止生成）"""
+    session = await db.scalar(
+        select(ChatSession).where(
+            ChatSession.session_id == session_id,
+            ChatSession.user_id == current_user["id"]
+        )
+    )
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="会话不存在"
+        )
+    # 生成回复期间不占用数据库连接，历史读取和保存使用各自的会话
+    await db.close()
+    
+    async def events():
+        async with aclosing(stream_reply(session.id, session.model_type, message_data.content)) as replies:
+            async for event in replies:
+                yield sse_event(event, event["type"])
+    
+    return StreamingResponse(
+        cancel_on_disconnect(request, events()),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+async def relay_reply(websocket: WebSocket, session_pk: int, model_type: str, content: str) -> None:
+    async with aclosing(stream_reply(session_pk, model_type, content)) as replies:
+        async for event in replies:
+            await websocket.send_json(event)
+
+@router.websocket("/sessions/{session_id}/ws")
+async def chat_websocket(websocket: WebSocket, session_id: str, token: str = ""):
+    """
+    WebSocket 流式对话
+    
+    通过查询参数 token 认证。每条 {"content": "..."} 消息产生一轮回复（start、token…、done 事件），
+    回复过程中可发送 {"type": "cancel"} 中止；连接断开时取消正在进行的生成。
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            user = await authenticate_token(token, db)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        session = await db.scalar(
+            select(ChatSession).where(
+                ChatSession.session_id == session_id,
+                ChatSession.user_id == user["id"]
+            )
+        )
+    
+    if not session:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    receiver = asyncio.create_task(websocket.receive())
+    reply: Optional[asyncio.Task] = None
+    
+    async def cancel_reply() -> None:
+        reply.cancel()
+        await asyncio.gather(reply, return_exceptions=True)
+    
+    try:
+        while True:
+            waiting = {receiver, reply} if reply is not None else {receiver}
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            
+            if reply is not None and reply in done:
+                if not reply.cancelled() and reply.exception() is not None:
+                    logger.error(f"流式回复失败: {str(reply.exception())}")
+                reply = None
+            
+            if receiver not in done:
+                continue
+            message = receiver.result()
+            if message["type"] == "websocket.disconnect":
+                return
+            receiver = asyncio.create_task(websocket.receive())
+            
+            try:
+                data = json.loads(message.get("text") or message.get("bytes") or "")
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "消息必须是JSON"})
+                continue
+            
+            if isinstance(data, dict) and data.get("type") == "cancel":
+                if reply is not None:
+                    await cancel_reply()
+                    reply = None
+                    await websocket.send_json({"type": "cancelled"})
+                continue
+            
+            if reply is not None:
+                await websocket.send_json({"type": "error", "detail": "上一条回复尚未完成"})
+                continue
+            
+            try:
+                request_data = ChatStreamRequest.model_validate(data)
+            except ValidationError:
+                await websocket.send_json({"type": "error", "detail": "消息内容不能为空"})
+                continue
+            
+            reply = asyncio.create_task(relay_reply(websocket, session.id, session.model_type, request_data.content))
+    finally:
+        receiver.cancel()
+        if reply is not None:
+            await cancel_reply()
+
 @router.post("/sessions/{session_id}/clear", response_model=BaseResponse)
 async def clear_chat_session(
     session_id: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """清空聊天记录"""
     # 验证会话所有权
-    session = db.query(ChatSession).filter(
-        ChatSession.session_id == session_id,
-        ChatSession.user_id == current_user["id"]
-    ).first()
+    session = await db.scalar(
+        select(ChatSession).where(
+            ChatSession.session_id == session_id,
+            ChatSession.user_id == current_user["id"]
+        )
+    )
     
     if not session:
         raise HTTPException(
@@ -214,9 +415,13 @@ async def clear_chat_session(
             detail="会话不存在"
         )
     
-    # 删除所有消息
-    db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete()
-    db.commit()
+    # 删除所有消息，批量删除不触发ORM事件，需同步清理搜索索引
+    message_ids = (await db.scalars(
+        select(ChatMessage.id).where(ChatMessage.session_id == session.id)
+    )).all()
+    await remove_documents(db, DOC_MESSAGE, message_ids)
+    await db.execute(delete(ChatMessage).where(ChatMessage.session_id == session.id))
+    await db.commit()
     
     return BaseResponse(message="清空聊天记录成功")
 
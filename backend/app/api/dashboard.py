@@ -1,59 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select, func, cast, String
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 
-from ..db.database import get_db
+from ..db.database import get_async_db
 from ..core.security import get_current_user
 from ..models.dashboard import DashboardStats, UserActivity
 from ..models.user import User
 from ..models.tool import Tool, ToolUsage
 from ..schemas import DashboardStatsResponse, BaseResponse
+from ..services.activity import activity_queue
+from ..services.rollups import day_start, to_day, merge_sketches, STAT_VISITS, STAT_TOOL_USAGE
 
 router = APIRouter(prefix="/dashboard", tags=["数据统计"])
 
 @router.get("/stats", response_model=BaseResponse)
 async def get_dashboard_stats(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取仪表板统计数据"""
     
-    # 总访问量（最近30天）
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-    total_visits = db.query(UserActivity).filter(
-        UserActivity.created_at >= thirty_days_ago,
-        UserActivity.activity_type == "login"
-    ).count()
+    # 总访问量（最近30天，读取按天汇总数据）
+    thirty_days_ago = day_start(29)
+    total_visits = await db.scalar(
+        select(func.coalesce(func.sum(DashboardStats.stat_value), 0)).where(
+            DashboardStats.stat_type == STAT_VISITS,
+            DashboardStats.stat_date >= thirty_days_ago
+        )
+    )
     
     # 总用户数
-    total_users = db.query(User).filter(User.is_active == True).count()
+    total_users = await db.scalar(
+        select(func.count(User.id)).where(User.is_active == True)
+    )
     
-    # 活跃用户（最近7天）
-    seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-    active_users = db.query(UserActivity.user_id).filter(
-        UserActivity.created_at >= seven_days_ago
-    ).distinct().count()
+    # 活跃用户（最近7天，合并每日去重草图）
+    active_users = (await merge_sketches(db, day_start(6))).count()
     
     # 转化率（注册用户中活跃用户的比例）
     conversion_rate = (active_users / total_users * 100) if total_users > 0 else 0
     
-    # 工具使用统计
+    # 工具使用统计（最近30天，按工具汇总）
     tool_usage_stats = {}
-    tool_usages = db.query(Tool.name, func.count(ToolUsage.id)).join(
-        ToolUsage, Tool.id == ToolUsage.tool_id
-    ).filter(
-        ToolUsage.created_at >= thirty_days_ago
-    ).group_by(Tool.name).all()
+    tool_usages = (await db.execute(
+        select(Tool.name, func.sum(DashboardStats.stat_value)).join(
+            DashboardStats, DashboardStats.dimension == cast(Tool.id, String)
+        ).where(
+            DashboardStats.stat_type == STAT_TOOL_USAGE,
+            DashboardStats.stat_date >= thirty_days_ago
+        ).group_by(Tool.name)
+    )).all()
     
     for tool_name, usage_count in tool_usages:
         tool_usage_stats[tool_name] = usage_count
     
     # 最近活动
-    recent_activities = db.query(UserActivity).order_by(
-        UserActivity.created_at.desc()
-    ).limit(10).all()
+    recent_activities = (await db.scalars(
+        select(UserActivity).order_by(
+            UserActivity.created_at.desc()
+        ).limit(10)
+    )).all()
     
     activity_list = []
     for activity in recent_activities:
@@ -79,45 +87,88 @@ async def get_dashboard_stats(
         data=stats_data
     )
 
+@router.get("/active-users", response_model=BaseResponse)
+async def get_active_users(
+    days: Optional[int] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """获取日/周/月活跃用户数（按UTC自然日，含今天），可用 days 指定任意窗口"""
+    if days is not None and (days < 1 or days > 365):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="天数必须在1-365之间"
+        )
+    
+    windows = {"dau": 1, "wau": 7, "mau": 30}
+    if days is not None:
+        windows["custom"] = days
+    
+    active_data = {}
+    exact = True
+    error_rate = 0.0
+    for name, window in windows.items():
+        sketch = await merge_sketches(db, day_start(window - 1))
+        active_data[name] = sketch.count()
+        exact = exact and sketch.is_exact
+        error_rate = max(error_rate, sketch.standard_error)
+    
+    active_data["exact"] = exact
+    active_data["error_rate"] = round(error_rate, 4)
+    
+    return BaseResponse(
+        message="获取活跃用户数成功",
+        data=active_data
+    )
+
 @router.get("/user/stats", response_model=BaseResponse)
 async def get_user_stats(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户个人统计数据"""
     user_id = current_user["id"]
     
-    # 用户活动统计（最近30天）
+    # 用户活动统计（最近30天，按类型分组计数）
     thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-    user_activities = db.query(UserActivity).filter(
+    in_window = (
         UserActivity.user_id == user_id,
         UserActivity.created_at >= thirty_days_ago
-    ).all()
-    
-    # 按活动类型分组
-    activity_stats = {}
-    for activity in user_activities:
-        activity_type = activity.activity_type
-        if activity_type not in activity_stats:
-            activity_stats[activity_type] = 0
-        activity_stats[activity_type] += 1
+    )
+    activity_counts = (await db.execute(
+        select(UserActivity.activity_type, func.count(UserActivity.id)).where(
+            *in_window
+        ).group_by(UserActivity.activity_type)
+    )).all()
+    
+    activity_stats = {activity_type: count for activity_type, count in activity_counts}
+    
+    # 最活跃的一天（按天分组取次数最多的一天）
+    activity_day = func.date(UserActivity.created_at)
+    most_active_day = await db.scalar(
+        select(activity_day).where(*in_window).group_by(activity_day).order_by(
+            func.count(UserActivity.id).desc(), activity_day
+        ).limit(1)
+    )
     
     # 工具使用统计
-    tool_usages = db.query(Tool.name, func.count(ToolUsage.id)).join(
-        ToolUsage, Tool.id == ToolUsage.tool_id
-    ).filter(
-        ToolUsage.user_id == user_id,
-        ToolUsage.created_at >= thirty_days_ago
-    ).group_by(Tool.name).all()
+    tool_usages = (await db.execute(
+        select(Tool.name, func.count(ToolUsage.id)).join(
+            ToolUsage, Tool.id == ToolUsage.tool_id
+        ).where(
+            ToolUsage.user_id == user_id,
+            ToolUsage.created_at >= thirty_days_ago
+        ).group_by(Tool.name)
+    )).all()
     
     tool_stats = {tool_name: count for tool_name, count in tool_usages}
     
     user_stats = {
-        "total_activities": len(user_activities),
+        "total_activities": sum(activity_stats.values()),
         "activity_breakdown": activity_stats,
         "tool_usage": tool_stats,
-        "most_active_day": get_most_active_day(user_activities),
-        "join_days": (datetime.now(timezone.utc) - current_user.get("created_at", datetime.now(timezone.utc))).days
+        "most_active_day": to_day(most_active_day).date().isoformat() if most_active_day else None,
+        "join_days": get_join_days(current_user.get("created_at"))
     }
     
     return BaseResponse(
@@ -125,35 +176,27 @@ async def get_user_stats(
         data=user_stats
     )
 
-def get_most_active_day(activities):
-    """获取最活跃的一天"""
-    if not activities:
-        return None
-    
-    day_counts = {}
-    for activity in activities:
-        day = activity.created_at.date()
-        day_counts[day] = day_counts.get(day, 0) + 1
-    
-    most_active_day = max(day_counts.items(), key=lambda x: x[1])[0]
-    return most_active_day.isoformat()
+def get_join_days(created_at: Optional[datetime]) -> int:
+    """计算注册天数"""
+    if created_at is None:
+        return 0
+    # SQLite返回的时间不带时区，按UTC处理
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).days
 
 @router.post("/activity", response_model=BaseResponse)
 async def record_activity(
     activity_type: str,
     activity_data: Optional[Dict[str, Any]] = None,
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: dict = Depends(get_current_user)
 ):
-    """记录用户活动"""
-    activity = UserActivity(
-        user_id=current_user["id"],
-        activity_type=activity_type,
-        activity_data=str(activity_data) if activity_data else None
-    )
-    
-    db.add(activity)
-    db.commit()
+    """记录用户活动（进入批量写入队列）"""
+    if not await activity_queue.record(current_user["id"], activity_type, activity_data or None):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="活动记录繁忙，请稍后重试"
+        )
     
     return BaseResponse(message="活动记录成功")
 
@@ -161,7 +204,7 @@ async def record_activity(
 async def get_trends(
     days: int = 30,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取趋势数据"""
     if days < 1 or days > 365:
@@ -171,38 +214,37 @@ async def get_trends(
         )
     
     end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=days)
-    
-    # 按天统计访问量
-    daily_visits = db.query(
-        func.date(UserActivity.created_at).label('date'),
-        func.count(UserActivity.id).label('count')
-    ).filter(
-        UserActivity.created_at >= start_date,
-        UserActivity.created_at <= end_date,
-        UserActivity.activity_type == "login"
-    ).group_by(
-        func.date(UserActivity.created_at)
-    ).order_by(
-        func.date(UserActivity.created_at)
-    ).all()
-    
-    # 按天统计工具使用
-    daily_tool_usage = db.query(
-        func.date(ToolUsage.created_at).label('date'),
-        func.count(ToolUsage.id).label('count')
-    ).filter(
-        ToolUsage.created_at >= start_date,
-        ToolUsage.created_at <= end_date
-    ).group_by(
-        func.date(ToolUsage.created_at)
-    ).order_by(
-        func.date(ToolUsage.created_at)
-    ).all()
+    start_date = day_start(days - 1)
+    
+    # 按天统计访问量（读取按天汇总数据）
+    daily_visits = (await db.execute(
+        select(
+            DashboardStats.stat_date.label('date'),
+            DashboardStats.stat_value.label('count')
+        ).where(
+            DashboardStats.stat_type == STAT_VISITS,
+            DashboardStats.stat_date >= start_date
+        ).order_by(DashboardStats.stat_date)
+    )).all()
+    
+    # 按天统计工具使用（各工具汇总行相加）
+    daily_tool_usage = (await db.execute(
+        select(
+            DashboardStats.stat_date.label('date'),
+            func.sum(DashboardStats.stat_value).label('count')
+        ).where(
+            DashboardStats.stat_type == STAT_TOOL_USAGE,
+            DashboardStats.stat_date >= start_date
+        ).group_by(
+            DashboardStats.stat_date
+        ).order_by(
+            DashboardStats.stat_date
+        )
+    )).all()
     
     trends_data = {
-        "daily_visits": [{"date": str(item.date), "count": item.count} for item in daily_visits],
-        "daily_tool_usage": [{"date": str(item.date), "count": item.count} for item in daily_tool_usage],
+        "daily_visits": [{"date": item.date.date().isoformat(), "count": item.count} for item in daily_visits],
+        "daily_tool_usage": [{"date": item.date.date().isoformat(), "count": item.count} for item in daily_tool_usage],
         "period": f"{start_date.date()} to {end_date.date()}"
     }
     
@@ -1,102 +1,428 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import FormData, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
 from typing import List, Optional
+import asyncio
 import os
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
-from ..db.database import get_db
+from ..db.database import get_async_db, AsyncSessionLocal
 from ..core.security import get_current_user
-from ..models.file import File as FileModel
-from ..schemas import FileCreate, FileResponse, BaseResponse
+from ..models.file import File as FileModel, UploadSession, UploadChunk
+from ..schemas import (
+    FileCreate, FileResponse, BaseResponse,
+    UploadSessionCreate, UploadSessionResponse, UploadCompleteRequest, ShareRequest
+)
 from ..core.config import settings
+from ..core.metrics import metrics
+from ..services.file_storage import (
+    limit_stream, save_upload_stream, FileTooLargeError, ChunkSizeError, MIN_SESSION_CHUNK_SIZE,
+    allocate_part_file, write_chunk_stream, hash_file, chunk_ranges, remove_file_quietly
+)
+from ..services.blob_store import blob_path, store_blob, release_blob, finish_release
+from ..services.file_download import (
+    make_etag, to_http_date, is_not_modified, not_modified_response, file_range_response
+)
+from ..services.counters import counter_buffer
+from ..services.activity import activity_queue
+from ..services.pagination import Cursor, page_cursor, fetch_page
+from ..services.share_links import create_share_token, verify_share_token, share_denylist, InvalidShareToken
 
 router = APIRouter(prefix="/files", tags=["文件管理"])
 
-@router.post("/upload", response_model=BaseResponse)
-async def upload_file(
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """上传文件"""
-    # 检查文件大小
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    
-    if file_size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"文件大小超过限制 ({settings.MAX_FILE_SIZE // (1024*1024)}MB)"
-        )
-    
-    # 检查文件类型
-    filename = file.filename or ''
+def get_file_extension(filename: str) -> str:
+    """获取并校验文件扩展名"""
     file_extension = filename.split('.')[-1].lower() if '.' in filename else ''
     if file_extension not in settings.ALLOWED_FILE_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"不支持的文件类型。支持的类型: {', '.join(settings.ALLOWED_FILE_TYPES)}"
         )
+    return file_extension
+
+# 上传接口自行解析请求体，在文档中声明表单结构
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+async def read_upload_form(request: Request) -> FormData:
+    """边接收边解析 multipart 请求体（文件内容超过 1MB 后转存磁盘），收到的字节超过大小限制时立即停止读取"""
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请使用 multipart/form-data 上传文件"
+        )
+    parser = MultiPartParser(request.headers, limit_stream(request.stream(), settings.MAX_FILE_SIZE), max_files=1)
+    try:
+        return await parser.parse()
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except MultiPartException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message
+        )
+
+@router.post("/upload", response_model=BaseResponse, openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_file(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    上传文件（multipart/form-data 的 file 字段）
+    
+    请求体在接收的同时解析，超过大小限制时立即中止并返回413，不依赖 Content-Length（分块传输编码的请求同样适用）。
+    """
+    form = await read_upload_form(request)
+    try:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="请通过 file 字段上传文件"
+            )
+        return await save_uploaded_file(db, file, current_user["id"])
+    finally:
+        await form.close()
+
+async def save_uploaded_file(db: AsyncSession, file: UploadFile, user_id: int) -> BaseResponse:
+    """保存表单中的上传文件并创建文件记录"""
+    # 检查文件类型
+    file_extension = get_file_extension(file.filename or '')
     
     # 生成唯一文件名
     safe_filename = file.filename or f"file_{uuid.uuid4().hex[:8]}"
     unique_filename = f"{uuid.uuid4().hex}_{safe_filename}"
-    file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
+    temp_path = os.path.join(settings.UPLOAD_TEMP_DIR, f"{uuid.uuid4().hex}.upload")
+    
+    # 分块保存文件，超过大小限制时立即中止
+    try:
+        file_size, content_hash = await save_upload_stream(file, temp_path)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
     
-    # 保存文件
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+    # 相同内容只保存一份
+    blob = await store_blob(db, temp_path, content_hash, file_size)
     
     # 创建文件记录
     db_file = FileModel(
         filename=unique_filename,
         original_name=file.filename,
-        file_path=file_path,
+        file_path=blob.storage_path,
         file_size=file_size,
         file_type=file_extension,
         mime_type=file.content_type,
+        content_hash=content_hash,
+        blob_id=blob.id,
+        user_id=user_id
+    )
+    
+    db.add(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+    
+    # 记录上传活动
+    await activity_queue.record(user_id, "file_upload", {"file_id": db_file.id, "file_size": db_file.file_size})
+    
+    return BaseResponse(
+        message="文件上传成功",
+        data=FileResponse.model_validate(db_file)
+    )
+
+async def get_upload_session(db: AsyncSession, upload_id: str, user_id: int) -> UploadSession:
+    """获取当前用户的上传会话"""
+    session = await db.scalar(
+        select(UploadSession).where(
+            UploadSession.upload_id == upload_id,
+            UploadSession.user_id == user_id
+        )
+    )
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="上传会话不存在或已过期"
+        )
+    
+    return session
+
+async def get_upload_status(db: AsyncSession, session: UploadSession) -> UploadSessionResponse:
+    """汇总上传会话的已接收分块"""
+    received = sorted((await db.scalars(
+        select(UploadChunk.chunk_index).where(UploadChunk.session_id == session.id)
+    )).all())
+    received_set = set(received)
+    ranges = chunk_ranges(received, session.chunk_size, session.total_size)
+    
+    return UploadSessionResponse(
+        upload_id=session.upload_id,
+        filename=session.original_name,
+        file_size=session.total_size,
+        chunk_size=session.chunk_size,
+        total_chunks=session.total_chunks,
+        received_chunks=received,
+        received_ranges=[[start, end] for start, end in ranges],
+        missing_chunks=[i for i in range(session.total_chunks) if i not in received_set],
+        bytes_received=sum(end - start for start, end in ranges)
+    )
+
+@router.post("/uploads", response_model=BaseResponse)
+async def create_upload_session(
+    upload_data: UploadSessionCreate,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """创建分块上传会话（断点续传）"""
+    file_extension = get_file_extension(upload_data.filename)
+    
+    if upload_data.file_size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(FileTooLargeError(settings.MAX_FILE_SIZE))
+        )
+    
+    chunk_size = upload_data.chunk_size or settings.UPLOAD_SESSION_CHUNK_SIZE
+    if not MIN_SESSION_CHUNK_SIZE <= chunk_size <= settings.UPLOAD_SESSION_MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"分块大小需在 {MIN_SESSION_CHUNK_SIZE} 到 {settings.UPLOAD_SESSION_MAX_CHUNK_SIZE} 字节之间"
+        )
+    
+    upload_id = uuid.uuid4().hex
+    temp_path = os.path.join(settings.UPLOAD_TEMP_DIR, f"{upload_id}.part")
+    await allocate_part_file(temp_path, upload_data.file_size)
+    
+    session = UploadSession(
+        upload_id=upload_id,
+        user_id=current_user["id"],
+        original_name=upload_data.filename,
+        file_type=file_extension,
+        mime_type=upload_data.mime_type,
+        total_size=upload_data.file_size,
+        chunk_size=chunk_size,
+        temp_path=temp_path
+    )
+    
+    db.add(session)
+    try:
+        await db.commit()
+    except Exception:
+        await remove_file_quietly(temp_path)
+        raise
+    
+    return BaseResponse(
+        message="上传会话创建成功",
+        data=await get_upload_status(db, session)
+    )
+
+@router.put("/uploads/{upload_id}/chunks/{chunk_index}", response_model=BaseResponse)
+async def upload_chunk(
+    upload_id: str,
+    chunk_index: int,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """上传第 chunk_index 个分块，请求体为分块的原始字节；重复上传同一分块会覆盖"""
+    session = await get_upload_session(db, upload_id, current_user["id"])
+    
+    if not 0 <= chunk_index < session.total_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"分块序号超出范围 (0-{session.total_chunks - 1})"
+        )
+    
+    # 结束读事务，避免在接收请求体期间占用数据库连接
+    await db.commit()
+    
+    expected_size = session.chunk_length(chunk_index)
+    try:
+        chunk_size = await write_chunk_stream(
+            request.stream(),
+            session.temp_path,
+            chunk_index * session.chunk_size,
+            expected_size
+        )
+    except ChunkSizeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="上传会话不存在或已过期"
+        )
+    
+    # 记录分块并刷新会话活跃时间
+    exists = await db.scalar(
+        select(UploadChunk.id).where(
+            UploadChunk.session_id == session.id,
+            UploadChunk.chunk_index == chunk_index
+        )
+    )
+    if not exists:
+        db.add(UploadChunk(session_id=session.id, chunk_index=chunk_index, size=chunk_size))
+    await db.execute(
+        update(UploadSession).where(UploadSession.id == session.id).values(updated_at=datetime.now(timezone.utc))
+    )
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 同一分块被并发重传，已由另一请求记录
+        await db.rollback()
+    
+    return BaseResponse(
+        message="分块上传成功",
+        data={"upload_id": upload_id, "chunk_index": chunk_index, "size": chunk_size}
+    )
+
+@router.get("/uploads/{upload_id}", response_model=BaseResponse)
+async def get_upload_session_status(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """查询已接收的分块和字节区间，用于断点续传"""
+    session = await get_upload_session(db, upload_id, current_user["id"])
+    
+    return BaseResponse(
+        message="获取上传进度成功",
+        data=await get_upload_status(db, session)
+    )
+
+@router.post("/uploads/{upload_id}/complete", response_model=BaseResponse)
+async def complete_upload_session(
+    upload_id: str,
+    complete_data: Optional[UploadCompleteRequest] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """所有分块上传完成后合并为正式文件"""
+    session = await get_upload_session(db, upload_id, current_user["id"])
+    upload_status = await get_upload_status(db, session)
+    
+    if upload_status.missing_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"还有 {len(upload_status.missing_chunks)} 个分块未上传"
+        )
+    
+    # 分块已按偏移量写入同一个临时文件，这里只需校验并存入内容寻址存储
+    content_hash = await asyncio.to_thread(hash_file, session.temp_path)
+    if complete_data and complete_data.sha256 and complete_data.sha256.lower() != content_hash:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="文件校验失败，SHA-256不匹配"
+        )
+    
+    # 同一会话被并发完成时只有一个请求能删除会话记录
+    result = await db.execute(delete(UploadSession).where(UploadSession.id == session.id))
+    if not result.rowcount:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="上传会话不存在或已过期"
+        )
+    await db.execute(delete(UploadChunk).where(UploadChunk.session_id == session.id))
+    blob = await store_blob(db, session.temp_path, content_hash, session.total_size)
+    
+    db_file = FileModel(
+        filename=f"{uuid.uuid4().hex}_{session.original_name}",
+        original_name=session.original_name,
+        file_path=blob.storage_path,
+        file_size=session.total_size,
+        file_type=session.file_type,
+        mime_type=session.mime_type,
+        content_hash=content_hash,
+        blob_id=blob.id,
         user_id=current_user["id"]
     )
     
     db.add(db_file)
-    db.commit()
-    db.refresh(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+    
+    # 记录上传活动
+    await activity_queue.record(current_user["id"], "file_upload", {"file_id": db_file.id, "file_size": db_file.file_size})
     
     return BaseResponse(
         message="文件上传成功",
         data=FileResponse.model_validate(db_file)
     )
 
+@router.delete("/uploads/{upload_id}", response_model=BaseResponse)
+async def abort_upload_session(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """取消分块上传并删除临时文件"""
+    session = await get_upload_session(db, upload_id, current_user["id"])
+    
+    await db.execute(delete(UploadChunk).where(UploadChunk.session_id == session.id))
+    await db.execute(delete(UploadSession).where(UploadSession.id == session.id))
+    await db.commit()
+    await remove_file_quietly(session.temp_path)
+    
+    return BaseResponse(message="上传已取消")
+
 @router.get("/", response_model=BaseResponse)
 async def get_user_files(
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[Cursor] = Depends(page_cursor),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取用户文件列表"""
-    files = db.query(FileModel).filter(
-        FileModel.user_id == current_user["id"]
-    ).offset(skip).limit(limit).all()
+    """获取用户文件列表（按上传时间正序，支持 cursor 分页）"""
+    files, next_cursor = await fetch_page(
+        db,
+        select(FileModel).where(FileModel.user_id == current_user["id"]),
+        FileModel.created_at, FileModel.id, cursor, limit, skip
+    )
     
     return BaseResponse(
         message="获取文件列表成功",
-        data=[FileResponse.model_validate(file) for file in files]
+        data=[FileResponse.model_validate(file) for file in files],
+        next_cursor=next_cursor
     )
 
 @router.get("/{file_id}", response_model=BaseResponse)
 async def get_file_info(
     file_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取文件信息"""
-    file = db.query(FileModel).filter(
-        FileModel.id == file_id,
-        FileModel.user_id == current_user["id"]
-    ).first()
+    file = await db.scalar(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == current_user["id"]
+        )
+    )
     
     if not file:
         raise HTTPException(
@@ -113,13 +439,15 @@ async def get_file_info(
 async def delete_file(
     file_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除文件"""
-    file = db.query(FileModel).filter(
-        FileModel.id == file_id,
-        FileModel.user_id == current_user["id"]
-    ).first()
+    file = await db.scalar(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == current_user["id"]
+        )
+    )
     
     if not file:
         raise HTTPException(
@@ -127,29 +455,125 @@ async def delete_file(
             detail="文件不存在"
         )
     
-    # 删除物理文件
-    if os.path.exists(file.file_path):  # type: ignore
-        os.remove(file.file_path)  # type: ignore
+    # 删除数据库记录，并使已签发的分享链接失效（内容可能仍被其他文件引用）
+    await db.delete(file)
     
-    # 删除数据库记录
-    db.delete(file)
-    db.commit()
+    # 共享存储的内容仅在最后一个引用删除时移除；物理文件在事务提交成功后才删除
+    released = await release_blob(db, file.blob_id) if file.blob_id else None
+    try:
+        await db.commit()
+    except Exception:
+        await finish_release(released, committed=False)
+        raise
+    await finish_release(released, committed=True)
+    share_denylist.revoke_file(file.id)
+    if not file.blob_id and file.file_path:
+        await remove_file_quietly(file.file_path)
     
     return BaseResponse(message="文件删除成功")
 
+def send_file_content(
+    request: Request,
+    path: str,
+    size: int,
+    filename: str,
+    media_type: Optional[str],
+    etag: str,
+    last_modified: Optional[str],
+    cache_control: str
+) -> Response:
+    """按条件请求和 Range 返回文件内容，304 只根据元数据判断而不访问磁盘"""
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified, cache_control)
+    
+    # 检查文件是否存在
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="文件不存在或已被删除"
+        )
+    
+    return file_range_response(
+        request,
+        path=path,
+        size=size,
+        filename=filename,
+        media_type=media_type or "application/octet-stream",
+        etag=etag,
+        last_modified=last_modified,
+        cache_control=cache_control
+    )
+
+def send_stored_file(request: Request, file: FileModel, cache_control: str) -> Response:
+    """返回数据库记录对应的文件内容"""
+    return send_file_content(
+        request,
+        path=file.file_path,  # type: ignore
+        size=file.file_size,  # type: ignore
+        filename=file.original_name,  # type: ignore
+        media_type=file.mime_type,  # type: ignore
+        etag=make_etag(file.content_hash, f"{file.id}-{file.file_size}"),  # type: ignore
+        last_modified=to_http_date(file.created_at),  # type: ignore
+        cache_control=cache_control
+    )
+
+@router.get("/public/{share_token}")
+async def get_shared_file(share_token: str, request: Request):
+    """
+    通过签名分享链接下载文件
+    
+    只校验令牌（签名、有效期、撤销列表），按令牌中的内容哈希读取存储的文件，不查询数据库；
+    文件删除时撤销其分享链接，内容不再被引用时存储的文件随之删除。
+    """
+    try:
+        payload = verify_share_token(share_token)
+    except InvalidShareToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    
+    metrics.inc("share.hits")
+    # 允许代理/CDN缓存重复访问，但不超过链接剩余有效期，撤销最迟在 SHARE_CACHE_MAX_AGE 后生效
+    max_age = max(0, min(settings.SHARE_CACHE_MAX_AGE, payload["e"] - int(time.time())))
+    cache_control = f"public, max-age={max_age}"
+    
+    if not payload.get("h"):
+        # 旧版独立存储的文件（及此前签发、只有文件ID的令牌）没有内容哈希，按文件ID读取记录
+        async with AsyncSessionLocal() as db:
+            file = await db.get(FileModel, payload["f"])
+        if not file:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="文件不存在或已被删除"
+            )
+        return send_stored_file(request, file, cache_control)
+    
+    return send_file_content(
+        request,
+        path=blob_path(payload["h"]),
+        size=payload["s"],
+        filename=payload["n"],
+        media_type=payload["m"],
+        etag=make_etag(payload["h"], f"{payload['f']}-{payload['s']}"),
+        last_modified=None,
+        cache_control=cache_control
+    )
+
 @router.get("/{file_id}/download")
 async def download_file(
     file_id: int,
+    request: Request,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """下载文件"""
-    from fastapi.responses import FileResponse
-    
-    file = db.query(FileModel).filter(
-        FileModel.id == file_id,
-        FileModel.user_id == current_user["id"]
-    ).first()
+    """下载文件，支持断点续传（Range）和条件请求（ETag/Last-Modified）"""
+    file = await db.scalar(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == current_user["id"]
+        )
+    )
     
     if not file:
         raise HTTPException(
@@ -157,36 +581,28 @@ async def download_file(
             detail="文件不存在"
         )
     
-    # 检查文件是否存在
-    if not os.path.exists(file.file_path):  # type: ignore
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="文件不存在或已被删除"
-        )
+    response = send_stored_file(request, file, "private, no-cache")
     
-    # 更新下载次数
-    from sqlalchemy import update
-    stmt = update(file.__class__).where(file.__class__.id == file.id).values(download_count=file.__class__.download_count + 1)
-    db.execute(stmt)
-    db.commit()
+    # 更新下载次数（缓冲后批量写入）：304 和续传的后续分段不计入
+    if response.status_code == 200 or response.headers.get("content-range", "").startswith("bytes 0-"):
+        counter_buffer.increment(FileModel, "download_count", file.id)
     
-    return FileResponse(
-        path=file.file_path,  # type: ignore
-        filename=file.original_name,  # type: ignore
-        media_type=file.mime_type or "application/octet-stream"  # type: ignore
-    )
+    return response
 
 @router.post("/{file_id}/share", response_model=BaseResponse)
 async def share_file(
     file_id: int,
+    share_data: Optional[ShareRequest] = None,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """分享文件"""
-    file = db.query(FileModel).filter(
-        FileModel.id == file_id,
-        FileModel.user_id == current_user["id"]
-    ).first()
+    """分享文件，生成带签名的限时分享链接"""
+    file = await db.scalar(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == current_user["id"]
+        )
+    )
     
     if not file:
         raise HTTPException(
@@ -194,44 +610,88 @@ async def share_file(
             detail="文件不存在"
         )
     
-    # 设置为公开分享
-    from sqlalchemy import update
-    stmt = update(file.__class__).where(file.__class__.id == file.id).values(is_public=True)
-    db.execute(stmt)
-    db.commit()
-    
-    share_url = f"{settings.HOST}/api/v1/files/{file_id}/public"
+    # 只签发令牌，不再设置 is_public：过期和撤销只对令牌生效
+    share = create_share_token(file, share_data.expires_in if share_data else None)
+    share_url = f"{settings.HOST}/api/v1/files/public/{share['token']}"
     
     return BaseResponse(
         message="文件分享成功",
-        data={"share_url": share_url}
+        data={
+            "share_url": share_url,
+            "share_token": share["token"],
+            "expires_at": datetime.fromtimestamp(share["payload"]["e"], timezone.utc)
+        }
     )
 
-@router.get("/{file_id}/public")
-async def get_public_file(file_id: int, db: Session = Depends(get_db)):
-    """获取公开文件"""
-    from fastapi.responses import FileResponse
-    
-    file = db.query(FileModel).filter(
-        FileModel.id == file_id,
-        FileModel.is_public == True
-    ).first()
+@router.delete("/{file_id}/share", response_model=BaseResponse)
+async def unshare_file(
+    file_id: int,
+    share_token: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """取消分享：指定 share_token 时只撤销该链接，否则撤销该文件的所有分享链接"""
+    file = await db.scalar(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.user_id == current_user["id"]
+        )
+    )
     
     if not file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="文件不存在或未公开分享"
+            detail="文件不存在"
         )
     
-    # 检查文件是否存在
-    if not os.path.exists(file.file_path):  # type: ignore
+    if share_token:
+        try:
+            payload = verify_share_token(share_token)
+        except InvalidShareToken as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        if payload["f"] != file.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="分享链接与文件不匹配"
+            )
+        share_denylist.revoke_token(payload["j"], payload["e"])
+    else:
+        share_denylist.revoke_file(file.id)
+        if file.is_public:
+            # 同时关闭旧版按文件ID的公开链接（新的分享不再设置 is_public）
+            stmt = update(FileModel).where(FileModel.id == file.id).values(is_public=False)
+            await db.execute(stmt)
+            await db.commit()
+    
+    return BaseResponse(message="已取消分享")
+
+@router.get("/{file_id}/public")
+async def get_public_file(
+    file_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    旧版按文件ID公开下载
+    
+    只为此前已发出的链接保留：新的分享不再设置 is_public，改用 /files/public/{share_token} 签名分享链接；
+    取消该文件的全部分享时关闭。
+    """
+    file = await db.scalar(
+        select(FileModel).where(
+            FileModel.id == file_id,
+            FileModel.is_public == True
+        )
+    )
+    
+    if not file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="文件不存在或已被删除"
+            detail="文件不存在或未公开分享"
         )
     
-    return FileResponse(
-        path=file.file_path,  # type: ignore
-        filename=file.original_name,  # type: ignore
-        media_type=file.mime_type or "application/octet-stream"  # type: ignore
-    )
\ No newline at end of file
+    # 没有有效期，取消分享须立即生效，不允许缓存复用
+    return send_stored_file(request, file, "public, no-cache")
@@ -1,10 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional, Tuple, Any
 
-from ..db.database import get_db
+from ..db.database import get_async_db
 from ..core.security import get_current_user
-from ..models import Tool, File, ChatSession, User
+from ..models import Tool, File, ChatSession, ChatMessage, User
+from ..services.search_index import (
+    DOC_TOOL,
+    DOC_FILE,
+    DOC_SESSION,
+    DOC_MESSAGE,
+    search_documents,
+    normalize_scores
+)
 from ..schemas import SearchRequest, SearchResult, BaseResponse
 
 router = APIRouter(prefix="/search", tags=["搜索"])
@@ -15,30 +25,27 @@ async def search(
     search_type: str = Query("all", description="搜索类型: all, tools, files, chats, users"),
     limit: int = Query(20, ge=1, le=100, description="返回结果数量限制"),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """全局搜索"""
     results = []
     
     if search_type in ["all", "tools"]:
         # 搜索工具
-        tools = db.query(Tool).filter(
+        ranked = await ranked_search(db, DOC_TOOL, q, None, limit // 2 if search_type == "all" else limit)
+        tools = await load_ranked(db, select(Tool).where(
             Tool.is_active == True,
             Tool.is_public == True
-        ).filter(
-            (Tool.name.contains(q)) |
-            (Tool.description.contains(q)) |
-            (Tool.category.contains(q))
-        ).limit(limit // 2 if search_type == "all" else limit).all()
+        ), Tool.id, ranked)
         
-        for tool in tools:
+        for tool, score in tools:
             results.append(SearchResult(
                 type="tool",
                 id=str(tool.id),  # type: ignore
                 title=tool.name,  # type: ignore
                 description=tool.description,  # type: ignore
                 content=tool.category,  # type: ignore
-                score=calculate_relevance_score(q, tool.name, tool.description),  # type: ignore
+                score=score,
                 metadata={
                     "category": tool.category,  # type: ignore
                     "usage_count": tool.usage_count,  # type: ignore
@@ -48,21 +55,19 @@ async def search(
     
     if search_type in ["all", "files"]:
         # 搜索文件
-        files = db.query(File).filter(
+        ranked = await ranked_search(db, DOC_FILE, q, current_user["id"], limit // 3 if search_type == "all" else limit)
+        files = await load_ranked(db, select(File).where(
             File.user_id == current_user["id"]
-        ).filter(
-            (File.original_name.contains(q)) |
-            (File.file_type.contains(q))
-        ).limit(limit // 3 if search_type == "all" else limit).all()
+        ), File.id, ranked)
         
-        for file in files:
+        for file, score in files:
             results.append(SearchResult(
                 type="file",
                 id=str(file.id),  # type: ignore
                 title=file.original_name,  # type: ignore
                 description=f"文件类型: {file.file_type.upper()}, 大小: {format_file_size(file.file_size)}",  # type: ignore
                 content=file.file_type,  # type: ignore
-                score=calculate_relevance_score(q, file.original_name),  # type: ignore
+                score=score,
                 metadata={
                     "file_type": file.file_type,  # type: ignore
                     "file_size": file.file_size,  # type: ignore
@@ -73,46 +78,48 @@ async def search(
     
     if search_type in ["all", "chats"]:
         # 搜索聊天记录
-        from ..models.chat import ChatSession, ChatMessage
+        chat_limit = limit // 4 if search_type == "all" else limit
         
         # 搜索会话标题
-        sessions = db.query(ChatSession).filter(
+        ranked = await ranked_search(db, DOC_SESSION, q, current_user["id"], chat_limit)
+        sessions = await load_ranked(db, select(ChatSession).where(
             ChatSession.user_id == current_user["id"],
-            ChatSession.is_active == True,
-            ChatSession.title.contains(q)
-        ).limit(limit // 4 if search_type == "all" else limit).all()
+            ChatSession.is_active == True
+        ), ChatSession.id, ranked)
         
-        for session in sessions:
+        for session, score in sessions:
             results.append(SearchResult(
                 type="chat",
                 id=session.session_id,  # type: ignore
                 title=session.title,  # type: ignore
                 description=f"AI模型: {session.model_type}",  # type: ignore
                 content=session.title,  # type: ignore
-                score=calculate_relevance_score(q, session.title) * 0.9,  # type: ignore 稍微降低聊天结果的权重
+                score=score * 0.9,  # 稍微降低聊天结果的权重
                 metadata={
                     "model_type": session.model_type,  # type: ignore
                     "updated_at": session.updated_at.isoformat() if session.updated_at else session.created_at.isoformat()  # type: ignore
                 }
             ))
         
-        # 搜索聊天内容
-        messages = db.query(ChatMessage).join(
+        # 搜索聊天内容（多取一些候选，过滤掉已删除会话中的消息）
+        ranked = await ranked_search(db, DOC_MESSAGE, q, current_user["id"], chat_limit * 2)
+        messages = await load_ranked(db, select(ChatMessage).join(
             ChatSession, ChatMessage.session_id == ChatSession.id
-        ).filter(
+        ).where(
             ChatSession.user_id == current_user["id"],
-            ChatSession.is_active == True,
-            ChatMessage.content.contains(q)
-        ).limit(limit // 4 if search_type == "all" else limit).all()
+            ChatSession.is_active == True
+        ).options(
+            selectinload(ChatMessage.session)  # 预加载所属会话，避免异步会话中的懒加载
+        ), ChatMessage.id, ranked)
         
-        for message in messages:
+        for message, score in messages[:chat_limit]:
             results.append(SearchResult(
                 type="chat",
                 id=message.session.session_id,  # type: ignore
                 title=f"聊天记录: {message.session.title}",  # type: ignore
                 description=truncate_text(message.content, 100),  # type: ignore
                 content=message.content,  # type: ignore
-                score=calculate_relevance_score(q, message.content) * 0.8,  # type: ignore
+                score=score * 0.8,
                 metadata={
                     "role": message.role,  # type: ignore
                     "created_at": message.created_at.isoformat(),  # type: ignore
@@ -133,35 +140,31 @@ async def search(
         }
     )
 
-def calculate_relevance_score(query: str, *text_fields: str) -> float:
-    """计算相关性分数"""
-    query_lower = query.lower()
-    total_score = 0.0
-    
-    for text in text_fields:
-        if not text:
-            continue
-        
-        text_lower = text.lower()
-        
-        # 完全匹配
-        if query_lower == text_lower:
-            total_score += 1.0
-        # 开头匹配
-        elif text_lower.startswith(query_lower):
-            total_score += 0.8
-        # 包含匹配
-        elif query_lower in text_lower:
-            total_score += 0.6
-        # 单词匹配
-        else:
-            query_words = query_lower.split()
-            text_words = text_lower.split()
-            matching_words = sum(1 for word in query_words if word in text_words)
-            if matching_words > 0:
-                total_score += (matching_words / len(query_words)) * 0.4
-    
-    return min(total_score, 1.0)
+async def ranked_search(
+    db: AsyncSession,
+    doc_type: str,
+    q: str,
+    owner_id: Optional[int],
+    limit: int,
+    title_only: bool = False
+) -> List[Tuple[int, float]]:
+    """查询全文索引，返回按BM25排序的 (ID, 分数)"""
+    ranked = await search_documents(db, doc_type, q, owner_id=owner_id, limit=limit, title_only=title_only)
+    if ranked is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="当前数据库不支持全文搜索"
+        )
+    return ranked
+
+async def load_ranked(db: AsyncSession, query, id_column, ranked: List[Tuple[int, float]]) -> List[Tuple[Any, float]]:
+    """按索引结果加载记录，保持相关性顺序并附带在本结果集内归一化的分数"""
+    if not ranked:
+        return []
+    rows = (await db.scalars(query.where(id_column.in_([doc_id for doc_id, _ in ranked])))).all()
+    rows_by_id = {row.id: row for row in rows}
+    found = [(rows_by_id[doc_id], score) for doc_id, score in ranked if doc_id in rows_by_id]
+    return list(zip([row for row, _ in found], normalize_scores([score for _, score in found])))
 
 def format_file_size(size_bytes: int) -> str:
     """格式化文件大小"""
@@ -188,7 +191,7 @@ def truncate_text(text: str, max_length: int) -> str:
 async def get_search_suggestions(
     q: str = Query(..., min_length=1, max_length=50, description="输入的关键词"),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取搜索建议"""
     if len(q) < 2:
@@ -197,13 +200,13 @@ async def get_search_suggestions(
     suggestions = []
     
     # 工具名称建议
-    tools = db.query(Tool.name).filter(
+    ranked = await ranked_search(db, DOC_TOOL, q, None, 5, title_only=True)
+    tools = await load_ranked(db, select(Tool).where(
         Tool.is_active == True,
-        Tool.is_public == True,
-        Tool.name.startswith(q)
-    ).limit(5).all()
+        Tool.is_public == True
+    ), Tool.id, ranked)
     
-    for tool in tools:
+    for tool, _ in tools:
         suggestions.append({
             "type": "tool",
             "text": tool.name,  # type: ignore
@@ -211,12 +214,12 @@ async def get_search_suggestions(
         })
     
     # 文件名称建议
-    files = db.query(File.original_name).filter(
-        File.user_id == current_user["id"],
-        File.original_name.startswith(q)
-    ).limit(5).all()
+    ranked = await ranked_search(db, DOC_FILE, q, current_user["id"], 5, title_only=True)
+    files = await load_ranked(db, select(File).where(
+        File.user_id == current_user["id"]
+    ), File.id, ranked)
     
-    for file in files:
+    for file, _ in files:
         suggestions.append({
             "type": "file",
             "text": file.original_name,  # type: ignore
@@ -224,15 +227,13 @@ async def get_search_suggestions(
         })
     
     # 会话标题建议
-    from ..models.chat import ChatSession
-    
-    sessions = db.query(ChatSession.title).filter(
+    ranked = await ranked_search(db, DOC_SESSION, q, current_user["id"], 5, title_only=True)
+    sessions = await load_ranked(db, select(ChatSession).where(
         ChatSession.user_id == current_user["id"],
-        ChatSession.is_active == True,
-        ChatSession.title.startswith(q)
-    ).limit(5).all()
+        ChatSession.is_active == True
+    ), ChatSession.id, ranked)
     
-    for session in sessions:
+    for session, _ in sessions:
         suggestions.append({
             "type": "chat",
             "text": session.title,  # type: ignore
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
 
-from ..db.database import get_db
+from ..db.database import get_async_db
 from ..core.security import get_current_user
 from ..models.settings import UserSettings, SystemSettings
 from ..schemas import UserSettingsResponse, SystemSettingsResponse, BaseResponse
@@ -12,19 +13,21 @@ router = APIRouter(prefix="/settings", tags=["系统设置"])
 @router.get("/user", response_model=BaseResponse)
 async def get_user_settings(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取用户设置"""
-    settings = db.query(UserSettings).filter(
-        UserSettings.user_id == current_user["id"]
-    ).first()
+    settings = await db.scalar(
+        select(UserSettings).where(
+            UserSettings.user_id == current_user["id"]
+        )
+    )
     
     if not settings:
         # 创建默认设置
         settings = UserSettings(user_id=current_user["id"])
         db.add(settings)
-        db.commit()
-        db.refresh(settings)
+        await db.commit()
+        await db.refresh(settings)
     
     return BaseResponse(
         message="获取用户设置成功",
@@ -35,12 +38,14 @@ async def get_user_settings(
 async def update_user_settings(
     settings_data: Dict[str, Any],
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新用户设置"""
-    settings = db.query(UserSettings).filter(
-        UserSettings.user_id == current_user["id"]
-    ).first()
+    settings = await db.scalar(
+        select(UserSettings).where(
+            UserSettings.user_id == current_user["id"]
+        )
+    )
     
     if not settings:
         # 创建新设置
@@ -55,8 +60,8 @@ async def update_user_settings(
             if hasattr(settings, key):
                 setattr(settings, key, value)
     
-    db.commit()
-    db.refresh(settings)
+    await db.commit()
+    await db.refresh(settings)
     
     return BaseResponse(
         message="更新用户设置成功",
@@ -65,12 +70,14 @@ async def update_user_settings(
 
 @router.get("/system/public", response_model=BaseResponse)
 async def get_public_system_settings(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取公开的系统设置"""
-    settings = db.query(SystemSettings).filter(
-        SystemSettings.is_public == True
-    ).all()
+    settings = (await db.scalars(
+        select(SystemSettings).where(
+            SystemSettings.is_public == True
+        )
+    )).all()
     
     settings_dict = {}
     for setting in settings:
@@ -88,7 +95,7 @@ async def get_public_system_settings(
 @router.get("/system", response_model=BaseResponse)
 async def get_system_settings(
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取所有系统设置（需要管理员权限）"""
     # 这里应该检查管理员权限
@@ -98,7 +105,7 @@ async def get_system_settings(
     #         detail="需要管理员权限"
     #     )
     
-    settings = db.query(SystemSettings).all()
+    settings = (await db.scalars(select(SystemSettings))).all()
     
     return BaseResponse(
         message="获取系统设置成功",
@@ -113,14 +120,16 @@ async def update_system_setting(
     description: Optional[str] = None,
     is_public: bool = False,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新系统设置（需要管理员权限）"""
     # 这里应该检查管理员权限
     
-    setting = db.query(SystemSettings).filter(
-        SystemSettings.setting_key == setting_key
-    ).first()
+    setting = await db.scalar(
+        select(SystemSettings).where(
+            SystemSettings.setting_key == setting_key
+        )
+    )
     
     if not setting:
         # 创建新设置
@@ -134,19 +143,17 @@ async def update_system_setting(
         db.add(setting)
     else:
         # 更新现有设置
-        from sqlalchemy import update
         update_data = {
             SystemSettings.setting_value: setting_value,  # type: ignore
             SystemSettings.setting_type: setting_type,  # type: ignore
             SystemSettings.description: description,  # type: ignore
             SystemSettings.is_public: is_public  # type: ignore
         }
-        stmt = update(SystemSettings).where(SystemSettings.id == setting.id).values(**update_data)
-        db.execute(stmt)
+        stmt = update(SystemSettings).where(SystemSettings.id == setting.id).values(update_data)
+        await db.execute(stmt)
     
-    db.commit()
-    if not setting:
-        db.refresh(setting)
+    await db.commit()
+    await db.refresh(setting)
     
     return BaseResponse(
         message="更新系统设置成功",
@@ -157,14 +164,16 @@ async def update_system_setting(
 async def delete_system_setting(
     setting_key: str,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """删除系统设置（需要管理员权限）"""
     # 这里应该检查管理员权限
     
-    setting = db.query(SystemSettings).filter(
-        SystemSettings.setting_key == setting_key
-    ).first()
+    setting = await db.scalar(
+        select(SystemSettings).where(
+            SystemSettings.setting_key == setting_key
+        )
+    )
     
     if not setting:
         raise HTTPException(
@@ -172,8 +181,8 @@ async def delete_system_setting(
             detail="设置不存在"
         )
     
-    db.delete(setting)
-    db.commit()
+    await db.delete(setting)
+    await db.commit()
     
     return BaseResponse(message="删除系统设置成功")
 
@@ -2,7 +2,10 @@
 from .config import settings
 
 # 数据库
-from ..db.database import get_db, init_db
+from ..db.database import get_db, get_async_db, init_db
+
+# 指标
+from .metrics import metrics
 
 # 安全相关
 from .security import (
@@ -10,16 +13,22 @@ from .security import (
     verify_token,
     get_password_hash,
     verify_password,
+    get_password_hash_async,
+    verify_password_async,
     get_current_user
 )
 
 __all__ = [
     "settings",
+    "metrics",
     "get_db",
+    "get_async_db",
     "init_db", 
     "create_access_token",
     "verify_token",
     "get_password_hash",
     "verify_password",
+    "get_password_hash_async",
+    "verify_password_async",
     "get_current_user"
 ]
\ No newline at end of file
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from .metrics import metrics
+
+class LRUTTLCache:
+    """带过期时间的LRU缓存（进程内）"""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        name: str = "cache",
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self.on_evict = on_evict
+        self._lock = threading.RLock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """读取缓存，过期或不存在时返回默认值"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                metrics.inc(f"cache.{self.name}.misses")
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                metrics.inc(f"cache.{self.name}.misses")
+                return default
+            self._data.move_to_end(key)
+            metrics.inc(f"cache.{self.name}.hits")
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，可单独指定过期时间（秒）"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (value, time.monotonic() + ttl)
+            while len(self._data) > self.max_size:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                metrics.inc(f"cache.{self.name}.evictions")
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存项"""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        value, _ = self._data.pop(key)
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -52,9 +52,21 @@ class Settings(BaseModel):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = get_env("ACCESS_TOKEN_EXPIRE_MINUTES", 30, int)
     REFRESH_TOKEN_EXPIRE_MINUTES: int = get_env("REFRESH_TOKEN_EXPIRE_MINUTES", 60 * 24 * 7, int)  # 7天
     
+    # 密码哈希配置
+    BCRYPT_ROUNDS: int = get_env("BCRYPT_ROUNDS", 12, int)  # bcrypt成本因子，修改后用户登录时自动重新哈希
+    PASSWORD_HASH_WORKERS: int = get_env("PASSWORD_HASH_WORKERS", 4, int)  # 哈希线程池大小
+    PASSWORD_HASH_QUEUE_SIZE: int = get_env("PASSWORD_HASH_QUEUE_SIZE", 64, int)  # 排队上限，超出时等待
+    
     # 文件上传配置
     UPLOAD_DIR: str = get_env("UPLOAD_DIR", "uploads")
     MAX_FILE_SIZE: int = get_env("MAX_FILE_SIZE", 100 * 1024 * 1024, int)  # 100MB
+    UPLOAD_CHUNK_SIZE: int = get_env("UPLOAD_CHUNK_SIZE", 1024 * 1024, int)  # 上传分块写盘大小，1MB
+    BLOB_DIR: str = get_env("BLOB_DIR", "blobs")  # 按内容哈希去重存储的文件目录，不对外提供静态访问
+    UPLOAD_TEMP_DIR: str = get_env("UPLOAD_TEMP_DIR", "uploads_tmp")  # 分块上传的临时文件目录，不对外提供静态访问
+    UPLOAD_SESSION_CHUNK_SIZE: int = get_env("UPLOAD_SESSION_CHUNK_SIZE", 8 * 1024 * 1024, int)  # 分块上传默认块大小，8MB
+    UPLOAD_SESSION_MAX_CHUNK_SIZE: int = get_env("UPLOAD_SESSION_MAX_CHUNK_SIZE", 32 * 1024 * 1024, int)
+    UPLOAD_SESSION_TTL: int = get_env("UPLOAD_SESSION_TTL", 24 * 3600, int)  # 未完成的上传会话闲置超过该秒数后清理
+    UPLOAD_SWEEP_INTERVAL: int = get_env("UPLOAD_SWEEP_INTERVAL", 600, int)  # 清理任务执行间隔，秒
     ALLOWED_FILE_TYPES: List[str] = parse_env_list(
         os.getenv("ALLOWED_FILE_TYPES"),
         ["pdf", "doc", "docx", "xls", "xlsx", 
@@ -62,14 +74,72 @@ class Settings(BaseModel):
          "txt", "md", "json", "csv"]
     )
     
+    # 分享链接配置
+    SHARE_LINK_TTL: int = get_env("SHARE_LINK_TTL", 7 * 24 * 3600, int)  # 默认有效期，秒
+    SHARE_LINK_MAX_TTL: int = get_env("SHARE_LINK_MAX_TTL", 30 * 24 * 3600, int)  # 最长有效期，秒
+    SHARE_CACHE_MAX_AGE: int = get_env("SHARE_CACHE_MAX_AGE", 3600, int)  # 代理/CDN缓存时间上限，撤销最迟在此时间后生效
+    
+    # 搜索配置
+    SEARCH_CJK_NGRAM: int = get_env("SEARCH_CJK_NGRAM", 2, int)  # 中日韩文本n-gram长度，修改后需重建索引
+    
     # AI服务配置
     OPENAI_API_KEY: Optional[str] = get_env("OPENAI_API_KEY", None)
     OPENAI_API_BASE: str = get_env("OPENAI_API_BASE", "https://api.openai.com/v1")
     DEFAULT_AI_MODEL: str = get_env("DEFAULT_AI_MODEL", "gpt-3.5-turbo")
+    LLM_MAX_CONNECTIONS: int = get_env("LLM_MAX_CONNECTIONS", 100, int)  # 模型服务连接池上限
+    LLM_MAX_KEEPALIVE: int = get_env("LLM_MAX_KEEPALIVE", 20, int)  # 保持的空闲长连接数
+    LLM_KEEPALIVE_EXPIRY: float = get_env("LLM_KEEPALIVE_EXPIRY", 30.0, float)  # 空闲长连接保留时间，秒
+    LLM_CONNECT_TIMEOUT: float = get_env("LLM_CONNECT_TIMEOUT", 5.0, float)  # 建立连接超时，秒
+    LLM_READ_TIMEOUT: float = get_env("LLM_READ_TIMEOUT", 60.0, float)  # 等待模型输出的超时，秒
+    LLM_MAX_CONCURRENCY_PER_HOST: int = get_env("LLM_MAX_CONCURRENCY_PER_HOST", 20, int)  # 每个上游主机的并发请求数
+    LLM_MAX_RETRIES: int = get_env("LLM_MAX_RETRIES", 2, int)  # 连接失败、超时、429、5xx 的重试次数
+    LLM_RETRY_BACKOFF_MS: int = get_env("LLM_RETRY_BACKOFF_MS", 200, int)  # 退避基数，按 2 的幂增长并加随机抖动
+    LLM_RETRY_MAX_BACKOFF_MS: int = get_env("LLM_RETRY_MAX_BACKOFF_MS", 5000, int)
+    LLM_BREAKER_FAILURES: int = get_env("LLM_BREAKER_FAILURES", 5, int)  # 连续失败该次数后熔断
+    LLM_BREAKER_RESET_SECONDS: float = get_env("LLM_BREAKER_RESET_SECONDS", 30.0, float)  # 熔断持续时间
+    CHAT_MAX_CONTEXT_TOKENS: int = get_env("CHAT_MAX_CONTEXT_TOKENS", 4000, int)  # 每次请求携带的历史消息 token 上限，0为按模型上下文窗口
+    CHAT_REPLY_TOKENS: int = get_env("CHAT_REPLY_TOKENS", 1000, int)  # 为模型回复预留的 token 数
+    CHAT_MOCK_TOKEN_DELAY_MS: int = get_env("CHAT_MOCK_TOKEN_DELAY_MS", 20, int)  # 未配置模型服务时模拟回复的逐字间隔
     
     # 缓存配置
     REDIS_URL: Optional[str] = get_env("REDIS_URL", None)
     CACHE_TTL: int = get_env("CACHE_TTL", 3600, int)  # 1小时
+    USER_CACHE_TTL: int = get_env("USER_CACHE_TTL", 60, int)  # 认证用户缓存，秒
+    USER_CACHE_MAX_SIZE: int = get_env("USER_CACHE_MAX_SIZE", 10000, int)
+    CHAT_CACHE_MAX_SIZE: int = get_env("CHAT_CACHE_MAX_SIZE", 5000, int)  # 对话回复缓存条数，0为关闭
+    CHAT_CACHE_TTL: int = get_env("CHAT_CACHE_TTL", 3600, int)  # 对话回复缓存时间，秒
+    CHAT_CACHE_DISABLED_MODELS: List[str] = get_env("CHAT_CACHE_DISABLED_MODELS", [], List)  # 不缓存回复的模型
+    CHAT_CACHE_SEMANTIC: bool = get_env("CHAT_CACHE_SEMANTIC", False, bool)  # 是否让相似问题命中缓存
+    CHAT_CACHE_SEMANTIC_THRESHOLD: float = get_env("CHAT_CACHE_SEMANTIC_THRESHOLD", 0.9, float)  # 余弦相似度阈值
+    CHAT_CACHE_EMBEDDING_DIM: int = get_env("CHAT_CACHE_EMBEDDING_DIM", 1024, int)  # 本地特征哈希向量维度
+    
+    # 计数器写回配置（usage_count、download_count）
+    COUNTER_FLUSH_INTERVAL_MS: int = get_env("COUNTER_FLUSH_INTERVAL_MS", 1000, int)  # 刷新间隔，毫秒
+    COUNTER_FLUSH_THRESHOLD: int = get_env("COUNTER_FLUSH_THRESHOLD", 500, int)  # 累计次数达到该值时立即刷新
+    
+    # 用户活动写入队列配置
+    ACTIVITY_QUEUE_SIZE: int = get_env("ACTIVITY_QUEUE_SIZE", 10000, int)  # 队列容量
+    ACTIVITY_BATCH_SIZE: int = get_env("ACTIVITY_BATCH_SIZE", 500, int)  # 每批插入条数上限
+    ACTIVITY_FLUSH_INTERVAL_MS: int = get_env("ACTIVITY_FLUSH_INTERVAL_MS", 1000, int)  # 凑批等待时间，毫秒
+    ACTIVITY_ENQUEUE_TIMEOUT_MS: int = get_env("ACTIVITY_ENQUEUE_TIMEOUT_MS", 50, int)  # 队列满时等待时间，超时丢弃
+    
+    # 统计汇总配置
+    ROLLUP_INTERVAL: int = get_env("ROLLUP_INTERVAL", 60, int)  # 汇总间隔，秒；统计数据最多延迟该时间
+    ROLLUP_BATCH_SIZE: int = get_env("ROLLUP_BATCH_SIZE", 50000, int)  # 每个事务汇总的原始记录数上限
+    ACTIVE_USERS_ERROR_RATE: float = get_env("ACTIVE_USERS_ERROR_RATE", 0.01, float)  # 活跃用户数的相对标准误差
+    ACTIVE_USERS_EXACT_THRESHOLD: int = get_env("ACTIVE_USERS_EXACT_THRESHOLD", 5000, int)  # 用户数不超过该值时精确计数，0为始终估算
+    
+    # 工具后台任务配置
+    JOB_WORKERS: int = get_env("JOB_WORKERS", 2, int)  # 执行工具的进程数
+    JOB_TOOL_CONCURRENCY: int = get_env("JOB_TOOL_CONCURRENCY", 2, int)  # 每个工具同时执行的任务数，可由工具配置 max_concurrency 覆盖
+    JOB_TIMEOUT: int = get_env("JOB_TIMEOUT", 600, int)  # 单个任务执行超时，秒，可由工具配置 timeout 覆盖
+    JOB_MAX_ATTEMPTS: int = get_env("JOB_MAX_ATTEMPTS", 3, int)  # 因重启、进程崩溃中断的任务最多执行次数
+    JOB_POLL_INTERVAL: float = get_env("JOB_POLL_INTERVAL", 1.0, float)  # 检查队列（含其他进程提交的任务）的间隔，秒
+    TOOL_INLINE_WAIT: float = get_env("TOOL_INLINE_WAIT", 10.0, float)  # 同步使用工具时等待结果的时间，超时返回任务ID
+    TOOL_BATCH_MAX_ITEMS: int = get_env("TOOL_BATCH_MAX_ITEMS", 1000, int)  # 批量使用工具时一次提交的最大输入数
+    TOOL_BATCH_SIZE: int = get_env("TOOL_BATCH_SIZE", 50, int)  # 批量输入按该大小分批交给工作进程，可由工具配置 batch_size 覆盖
+    TOOL_CACHE_MAX_SIZE: int = get_env("TOOL_CACHE_MAX_SIZE", 2000, int)  # 工具结果缓存条数
+    TOOL_CACHE_TTL: int = get_env("TOOL_CACHE_TTL", 3600, int)  # 工具结果缓存时间，秒，工具配置 cache_ttl 可覆盖（0为不缓存）
     
     # 限流配置
     RATE_LIMIT_PER_MINUTE: int = get_env("RATE_LIMIT_PER_MINUTE", 60, int)
@@ -93,4 +163,6 @@ settings = Settings()
 
 # 确保必要的目录存在
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+os.makedirs(settings.BLOB_DIR, exist_ok=True)
 os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
\ No newline at end of file
@@ -0,0 +1,65 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Any
+
+class MetricsRegistry:
+    """进程内指标注册表（计数器、仪表盘、耗时统计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """设置仪表盘当前值"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def add_gauge(self, name: str, delta: float) -> None:
+        """仪表盘增减"""
+        with self._lock:
+            self._gauges[name] = self._gauges.get(name, 0) + delta
+
+    def observe(self, name: str, seconds: float) -> None:
+        """记录一次耗时"""
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def get_counter(self, name: str) -> int:
+        """读取计数器"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def get_gauge(self, name: str) -> float:
+        """读取仪表盘当前值"""
+        with self._lock:
+            return self._gauges.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出所有指标"""
+        with self._lock:
+            timings = {
+                name: {
+                    "count": t["count"],
+                    "avg_ms": round(t["total"] / t["count"] * 1000, 3) if t["count"] else 0.0,
+                    "max_ms": round(t["max"] * 1000, 3)
+                }
+                for name, t in self._timings.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings
+            }
+
+# 全局指标实例
+metrics = MetricsRegistry()
@@ -1,16 +1,36 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union, Any
+from typing import Optional, Union, Any, Tuple, Callable, Dict, Set
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from .config import settings
-from ..db.database import get_db
-from sqlalchemy.orm import Session
+from .metrics import metrics
+from .cache import LRUTTLCache
+from ..db.database import get_async_db
+from ..models.user import User
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # 密码加密上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# 密码哈希专用线程池（bcrypt在C扩展中释放GIL，线程即可并行，且不占用事件循环）
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+# 限制同时提交到线程池的任务数，超出部分在协程中等待
+_password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE)
 
 # JWT token方案
 security = HTTPBearer()
@@ -43,17 +63,23 @@ def create_refresh_token(
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """验证JWT令牌"""
+def decode_token(token: str) -> Optional[dict]:
+    """解码并校验JWT令牌，返回载荷"""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: Optional[str] = payload.get("sub")
-        if user_id is None:
-            return None
-        return user_id
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         return None
 
+def verify_token(token: str) -> Optional[str]:
+    """验证JWT令牌"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    user_id: Optional[str] = payload.get("sub")
+    if user_id is None:
+        return None
+    return user_id
+
 def get_password_hash(password: str) -> str:
     """获取密码哈希"""
     return pwd_context.hash(password)
@@ -62,24 +88,124 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
     return pwd_context.verify(plain_password, hashed_password)
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> dict:
-    """获取当前用户"""
-    token = credentials.credentials
-    user_id = verify_token(token)
+async def _run_password_task(func: Callable, *args) -> Any:
+    """在密码哈希线程池中执行任务，并记录排队深度和耗时"""
+    loop = asyncio.get_running_loop()
+    enqueued_at = time.perf_counter()
+
+    def run():
+        started_at = time.perf_counter()
+        metrics.observe("password_hash.wait", started_at - enqueued_at)
+        try:
+            return func(*args)
+        finally:
+            metrics.observe("password_hash.run", time.perf_counter() - started_at)
+
+    # 排队深度 = 已提交但尚未完成的哈希任务数
+    metrics.add_gauge("password_hash.queue_depth", 1)
+    try:
+        async with _password_slots:
+            return await loop.run_in_executor(password_executor, run)
+    finally:
+        metrics.add_gauge("password_hash.queue_depth", -1)
+
+async def get_password_hash_async(password: str) -> str:
+    """异步获取密码哈希"""
+    return await _run_password_task(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """异步验证密码"""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """异步验证密码，成本因子变化时同时返回新哈希"""
+    return await _run_password_task(pwd_context.verify_and_update, plain_password, hashed_password)
+
+# 已验证令牌 -> 用户信息缓存，以及用户ID -> 令牌索引（用于按用户失效）
+_user_tokens: Dict[int, Set[str]] = {}
+
+def _forget_token(token: str, user: dict) -> None:
+    tokens = _user_tokens.get(user["id"])
+    if tokens is not None:
+        tokens.discard(token)
+        if not tokens:
+            _user_tokens.pop(user["id"], None)
+
+user_cache = LRUTTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    name="auth_user",
+    on_evict=_forget_token
+)
+
+def invalidate_user_cache(user_id: Union[int, str]) -> None:
+    """使某个用户的所有缓存令牌失效（用户信息更新或被禁用时调用）"""
+    for token in list(_user_tokens.get(int(user_id), ())):
+        user_cache.delete(token)
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_user_update(mapper, connection, target):
+    """用户记录变更时自动失效缓存"""
+    invalidate_user_cache(target.id)
+
+def user_to_context(user: User) -> dict:
+    """将用户记录转换为请求上下文"""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name,
+        "avatar": user.avatar,
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "created_at": user.created_at,
+        "last_login": user.last_login
+    }
+
+async def authenticate_token(token: str, db: AsyncSession) -> dict:
+    """根据访问令牌获取用户信息，优先读取缓存"""
+    user = user_cache.get(token)
+    if user is None:
+        payload = decode_token(token)
+        user_id = payload.get("sub") if payload else None
+        if user_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="无效的认证凭据",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        db_user = await db.scalar(select(User).where(User.id == int(user_id)))
+        if not db_user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户不存在",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user = user_to_context(db_user)
+        # 缓存时间不超过令牌剩余有效期
+        ttl = settings.USER_CACHE_TTL
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            _user_tokens.setdefault(user["id"], set()).add(token)
+            user_cache.set(token, user, ttl=ttl)
     
-    if user_id is None:
+    if not user["is_active"]:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="无效的认证凭据",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="账户已被禁用"
         )
     
-    # 这里需要从数据库获取用户信息
-    # 暂时返回用户ID
-    return {"id": user_id}
+    return dict(user)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> dict:
+    """获取当前用户"""
+    return await authenticate_token(credentials.credentials, db)
 
 def create_tokens(user_id: str) -> dict:
     """创建访问令牌和刷新令牌"""
@@ -1,10 +1,24 @@
 # 数据库相关导入
-from .database import Base, get_db, init_db, engine, SessionLocal
+from .database import (
+    Base,
+    get_db,
+    get_async_db,
+    init_db,
+    close_db,
+    engine,
+    async_engine,
+    SessionLocal,
+    AsyncSessionLocal
+)
 
 __all__ = [
     "Base",
     "get_db", 
+    "get_async_db",
     "init_db",
+    "close_db",
     "engine",
-    "SessionLocal"
-]
\ No newline at end of file
+    "async_engine",
+    "SessionLocal",
+    "AsyncSessionLocal"
+]
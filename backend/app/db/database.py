@@ -1,20 +1,52 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from ..core.config import settings
 
-# 创建数据库引擎
+# 同步驱动 -> 异步驱动映射
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def get_async_database_url(url: str) -> str:
+    """将同步数据库URL转换为异步驱动URL"""
+    scheme, sep, rest = url.partition("://")
+    dialect, _, driver = scheme.partition("+")
+    if not sep or driver in ("aiosqlite", "asyncpg", "aiomysql"):
+        return url
+    return f"{ASYNC_DRIVERS.get(dialect, scheme)}://{rest}"
+
+# 创建数据库引擎（同步，供Alembic迁移和初始化使用）
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
     echo=settings.DEBUG
 )
 
+# 创建异步数据库引擎（供API路由使用，避免阻塞事件循环）
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    echo=settings.DEBUG
+)
+
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 创建异步会话工厂
+# expire_on_commit=False: 提交后仍可直接序列化ORM对象，避免隐式的懒加载IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # 创建基类
 Base = declarative_base()
 
@@ -26,8 +58,21 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
     """初始化数据库"""
     from ..models import user, file, chat, tool, dashboard, settings as settings_model
+    from ..services.search_index import ensure_search_index
     Base.metadata.create_all(bind=engine)
-    print("数据库初始化完成")
\ No newline at end of file
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+    print("数据库初始化完成")
+
+async def close_db():
+    """关闭数据库连接池"""
+    await async_engine.dispose()
+    engine.dispose()
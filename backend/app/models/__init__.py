@@ -2,7 +2,7 @@
 from .user import User
 
 # 文件模型
-from .file import File
+from .file import File, Blob, UploadSession, UploadChunk
 
 # 聊天模型
 from .chat import ChatSession, ChatMessage
@@ -11,7 +11,7 @@ from .chat import ChatSession, ChatMessage
 from .tool import Tool, ToolUsage
 
 # 仪表板模型
-from .dashboard import DashboardStats, UserActivity
+from .dashboard import DashboardStats, ActivitySketch, UserActivity
 
 # 设置模型
 from .settings import UserSettings, SystemSettings
@@ -19,11 +19,15 @@ from .settings import UserSettings, SystemSettings
 __all__ = [
     "User",
     "File", 
+    "Blob",
+    "UploadSession",
+    "UploadChunk",
     "ChatSession",
     "ChatMessage",
     "Tool",
     "ToolUsage",
     "DashboardStats",
+    "ActivitySketch",
     "UserActivity",
     "UserSettings",
     "SystemSettings"
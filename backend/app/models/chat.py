@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -6,6 +6,9 @@ from ..db.database import Base
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_active_updated", "user_id", "is_active", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(100), unique=True, index=True, nullable=False)
@@ -14,7 +17,8 @@ class ChatSession(Base):
     model_type = Column(String(50), default="gpt-3.5-turbo")
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 创建时即有值，会话列表按 (updated_at, id) 分页可直接走索引
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     
     # 关联用户和消息
     user = relationship("User", backref="chat_sessions")
@@ -25,12 +29,17 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+        Index("ix_chat_messages_session_cumulative", "session_id", "cumulative_tokens"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
     role = Column(String(20), nullable=False)  # user, assistant, system
     content = Column(Text, nullable=False)
-    tokens = Column(Integer, default=0)
+    tokens = Column(Integer, default=0)  # 本条消息占用的上下文 token 数（含格式开销）
+    cumulative_tokens = Column(Integer, default=0, nullable=False)  # 会话内截至本条的 token 累计
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     def __repr__(self):
@@ -1,23 +1,44 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, BigInteger, UniqueConstraint, LargeBinary, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
 from ..db.database import Base
 
 class DashboardStats(Base):
+    """按天汇总的统计数据，由 services.rollups 维护"""
     __tablename__ = "dashboard_stats"
+    __table_args__ = (
+        UniqueConstraint("stat_type", "stat_date", "dimension", name="uq_dashboard_stats_type_date_dimension"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    stat_type = Column(String(50), nullable=False)  # visits, users, conversion, etc.
+    stat_type = Column(String(50), nullable=False)  # visits, active_users, activity, tool_usage, etc.
+    dimension = Column(String(100), nullable=False, default="", server_default="")  # 细分维度，如活动类型、工具ID
     stat_value = Column(BigInteger, default=0)
-    stat_date = Column(DateTime(timezone=True), server_default=func.now())
+    stat_date = Column(DateTime(timezone=True), server_default=func.now())  # 统计日期（UTC零点）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     def __repr__(self):
         return f"<DashboardStats(type='{self.stat_type}', value={self.stat_value})>"
 
+class ActivitySketch(Base):
+    """每日活跃用户的 HyperLogLog 草图，合并后可得任意窗口的去重用户数"""
+    __tablename__ = "activity_sketches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sketch_date = Column(DateTime(timezone=True), nullable=False, unique=True, index=True)  # 统计日期（UTC零点）
+    sketch = Column(LargeBinary, nullable=False)  # HyperLogLog.to_bytes()
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<ActivitySketch(date='{self.sketch_date}')>"
+
 class UserActivity(Base):
     __tablename__ = "user_activities"
+    __table_args__ = (
+        Index("ix_user_activities_created_type", "created_at", "activity_type"),
+        Index("ix_user_activities_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Boolean, Text, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -6,6 +6,9 @@ from ..db.database import Base
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        Index("ix_files_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
@@ -14,6 +17,8 @@ class File(Base):
     file_size = Column(Integer, nullable=False)
     file_type = Column(String(50), nullable=False)
     mime_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=True, index=True)  # 为空表示旧版独立存储的文件
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     is_public = Column(Boolean, default=False)
     download_count = Column(Integer, default=0)
@@ -24,4 +29,58 @@ class File(Base):
     user = relationship("User", backref="files")
     
     def __repr__(self):
-        return f"<File(filename='{self.filename}', user_id={self.user_id})>"
\ No newline at end of file
+        return f"<File(filename='{self.filename}', user_id={self.user_id})>"
+
+class Blob(Base):
+    """按SHA-256内容寻址的文件存储，多个 File 记录可共享同一份内容"""
+    __tablename__ = "blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), unique=True, index=True, nullable=False)
+    storage_path = Column(String(500), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<Blob(content_hash='{self.content_hash}', ref_count={self.ref_count})>"
+
+class UploadSession(Base):
+    """分块上传会话，完成后转为 File 记录"""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    upload_id = Column(String(64), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    original_name = Column(String(255), nullable=False)
+    file_type = Column(String(50), nullable=False)
+    mime_type = Column(String(100), nullable=True)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    temp_path = Column(String(500), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+    
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def chunk_length(self, index: int) -> int:
+        """第 index 个分块的字节数（最后一块可能较短）"""
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+    
+    def __repr__(self):
+        return f"<UploadSession(upload_id='{self.upload_id}', user_id={self.user_id})>"
+
+class UploadChunk(Base):
+    """上传会话中已写入磁盘的分块，每块一行以避免并发上传时覆盖彼此的进度"""
+    __tablename__ = "upload_chunks"
+    __table_args__ = (
+        UniqueConstraint("session_id", "chunk_index", name="uq_upload_chunks_session_index"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -6,6 +6,9 @@ from ..db.database import Base
 
 class Tool(Base):
     __tablename__ = "tools"
+    __table_args__ = (
+        Index("ix_tools_active_public_usage", "is_active", "is_public", "usage_count"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     tool_id = Column(String(100), unique=True, index=True, nullable=False)
@@ -29,12 +32,24 @@ class Tool(Base):
 
 class ToolUsage(Base):
     __tablename__ = "tool_usage"
+    __table_args__ = (
+        Index("ix_tool_usage_user_created", "user_id", "created_at"),
+        Index("ix_tool_usage_status_id", "status", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     tool_id = Column(Integer, ForeignKey("tools.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     usage_data = Column(JSON, nullable=True)  # 使用数据
     result_data = Column(JSON, nullable=True)  # 结果数据
+    job_id = Column(String(32), unique=True, index=True, nullable=True)  # 后台任务ID
+    status = Column(String(20), nullable=False, default="done", server_default="done")  # queued, running, done, failed
+    error = Column(Text, nullable=True)  # 失败原因
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")  # 已开始执行的次数
+    cached = Column(Boolean, nullable=False, default=False, server_default="0")  # 结果取自缓存，未实际执行
+    queued_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # 关联用户
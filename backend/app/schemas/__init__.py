@@ -7,6 +7,7 @@ class BaseResponse(BaseModel):
     success: bool = True
     message: str = "操作成功"
     data: Optional[Any] = None
+    next_cursor: Optional[str] = None  # 列表接口的下一页游标，没有更多数据时为空
 
 # 用户相关模型
 class UserBase(BaseModel):
@@ -62,6 +63,7 @@ class FileResponse(FileBase):
     id: int
     user_id: int
     file_path: str
+    content_hash: Optional[str] = None
     download_count: int
     is_public: bool
     created_at: datetime
@@ -69,6 +71,29 @@ class FileResponse(FileBase):
     class Config:
         from_attributes = True
 
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    file_size: int = Field(..., ge=1)
+    mime_type: Optional[str] = Field(None, max_length=100)
+    chunk_size: Optional[int] = None
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    file_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int]
+    received_ranges: List[List[int]]  # 已接收的字节区间 [start, end)
+    missing_chunks: List[int]
+    bytes_received: int
+
+class UploadCompleteRequest(BaseModel):
+    sha256: Optional[str] = Field(None, min_length=64, max_length=64)  # 可选，用于校验合并后的文件
+
+class ShareRequest(BaseModel):
+    expires_in: Optional[int] = Field(None, ge=60)  # 有效期（秒），超过上限时按上限处理
+
 # 聊天相关模型
 class ChatMessageBase(BaseModel):
     role: str = Field(..., pattern="^(user|assistant|system)$")
@@ -77,6 +102,9 @@ class ChatMessageBase(BaseModel):
 class ChatMessageCreate(ChatMessageBase):
     session_id: int
 
+class ChatStreamRequest(BaseModel):  # 流式对话的用户输入（SSE 请求体或 WebSocket 消息）
+    content: str = Field(..., min_length=1)
+
 class ChatMessageResponse(ChatMessageBase):
     id: int
     session_id: int
@@ -139,11 +167,36 @@ class ToolUsageCreate(ToolUsageBase):
 
 class ToolUsageResponse(ToolUsageBase):
     id: int
+    job_id: Optional[str] = None
+    status: str = "done"
+    cached: bool = False
+    error: Optional[str] = None
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class ToolJobResponse(BaseModel):  # 后台任务状态，status 为 done 时 result_data 为结果
+    job_id: str
+    tool_id: int
+    status: str
+    cached: bool = False
+    error: Optional[str] = None
+    attempts: int
+    result_data: Optional[Dict[str, Any]] = None
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class ToolBatchRequest(BaseModel):  # 批量使用工具，每项与单次使用的输入相同
+    inputs: List[Dict[str, Any]] = Field(..., min_length=1)
+
 # 仪表板相关模型
 class DashboardStatsResponse(BaseModel):
     total_visits: int
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import async_engine
+from ..models.dashboard import UserActivity
+
+logger = logging.getLogger(__name__)
+
+class RequestInfo(NamedTuple):
+    """当前请求的客户端信息，由中间件写入"""
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+
+request_info: ContextVar[Optional[RequestInfo]] = ContextVar("request_info", default=None)
+
+def serialize_activity_data(data: Any) -> Optional[str]:
+    """活动附加数据统一存为JSON"""
+    if data is None or isinstance(data, str):
+        return data
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+class ActivityQueue:
+    """
+    用户活动批量写入队列
+
+    事件先进入有界队列，后台任务攒够 batch_size 条或等待 flush_interval 毫秒后用 executemany
+    一次插入。队列满时最多等待 enqueue_timeout 毫秒（背压），仍无空位则丢弃并计数。
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval_ms: int, enqueue_timeout_ms: int):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(
+        self,
+        user_id: int,
+        activity_type: str,
+        activity_data: Any = None,
+        created_at: Optional[datetime] = None
+    ) -> bool:
+        """记录一条活动，返回是否成功入队"""
+        if self._queue is None:
+            metrics.inc("activity.dropped")
+            return False
+
+        info = request_info.get() or RequestInfo(None, None)
+        event = {
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "activity_data": serialize_activity_data(activity_data),
+            "ip_address": info.ip_address,
+            "user_agent": info.user_agent[:500] if info.user_agent else None,
+            "created_at": created_at or datetime.now(timezone.utc),
+        }
+
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(event), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                metrics.inc("activity.dropped")
+                return False
+        metrics.inc("activity.enqueued")
+        metrics.set_gauge("activity.queue_depth", self._queue.qsize())
+        return True
+
+    async def _fill_batch(self) -> None:
+        """等待第一条事件，再在 flush_interval 内尽量凑满一批（停止时未写入的部分由 stop 写入）"""
+        self._batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            try:
+                self._batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            async with async_engine.begin() as connection:
+                await connection.execute(UserActivity.__table__.insert(), batch)
+        except Exception as e:
+            metrics.inc("activity.failed", len(batch))
+            logger.error(f"写入用户活动失败（{len(batch)} 条）: {str(e)}")
+            return
+        metrics.inc("activity.inserted", len(batch))
+        metrics.observe("activity.flush", time.perf_counter() - started)
+
+    async def _run(self) -> None:
+        while True:
+            await self._fill_batch()
+            metrics.set_gauge("activity.queue_depth", self._queue.qsize())
+            await self._write(self._batch)
+            self._batch = []
+
+    def start(self) -> None:
+        """创建队列并启动后台写入任务"""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._batch = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止接收新事件，写完当前批次和队列中剩余的事件"""
+        queue, self._queue = self._queue, None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if queue is None:
+            return
+        pending = self._batch
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        self._batch = []
+        for start in range(0, len(pending), self.batch_size):
+            await self._write(pending[start:start + self.batch_size])
+        metrics.set_gauge("activity.queue_depth", 0)
+
+# 全局活动队列
+activity_queue = ActivityQueue(
+    settings.ACTIVITY_QUEUE_SIZE,
+    settings.ACTIVITY_BATCH_SIZE,
+    settings.ACTIVITY_FLUSH_INTERVAL_MS,
+    settings.ACTIVITY_ENQUEUE_TIMEOUT_MS
+)
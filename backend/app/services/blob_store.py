@@ -0,0 +1,152 @@
+import os
+import uuid
+from typing import NamedTuple, Optional
+
+import aiofiles.os
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import AsyncSessionLocal
+from ..models.file import Blob
+from .file_storage import remove_file_quietly
+
+# 去重指标：逻辑字节为所有引用的文件大小之和，物理字节为实际占用的磁盘大小
+LOGICAL_BYTES = "storage.logical_bytes"
+PHYSICAL_BYTES = "storage.physical_bytes"
+
+class ReleasedBlob(NamedTuple):
+    """引用归零、待删除的文件：提交前移到 pending_path，提交后由 finish_release 删除或恢复"""
+    storage_path: str
+    pending_path: str
+    size: int
+
+def blob_path(content_hash: str) -> str:
+    """内容哈希对应的存储路径，按前两级哈希前缀分目录避免单目录文件过多"""
+    return os.path.join(settings.BLOB_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+def publish_dedup_metrics() -> None:
+    """根据逻辑/物理字节数更新去重率和节省的字节数"""
+    logical = metrics.get_gauge(LOGICAL_BYTES)
+    physical = metrics.get_gauge(PHYSICAL_BYTES)
+    metrics.set_gauge("storage.bytes_saved", logical - physical)
+    metrics.set_gauge("storage.dedup_ratio", round(logical / physical, 4) if physical else 1.0)
+
+async def refresh_storage_metrics() -> None:
+    """从数据库重新统计去重指标（启动时调用）"""
+    async with AsyncSessionLocal() as db:
+        physical, logical = (await db.execute(
+            select(
+                func.coalesce(func.sum(Blob.size), 0),
+                func.coalesce(func.sum(Blob.size * Blob.ref_count), 0)
+            )
+        )).one()
+    metrics.set_gauge(PHYSICAL_BYTES, physical)
+    metrics.set_gauge(LOGICAL_BYTES, logical)
+    publish_dedup_metrics()
+
+async def _acquire_existing(db: AsyncSession, content_hash: str) -> Optional[Blob]:
+    """已存在相同内容时增加引用计数"""
+    blob = await db.scalar(select(Blob).where(Blob.content_hash == content_hash))
+    if not blob:
+        return None
+    result = await db.execute(
+        update(Blob).where(Blob.id == blob.id).values(ref_count=Blob.ref_count + 1)
+    )
+    # 期间被并发删除时按新内容处理
+    return blob if result.rowcount else None
+
+async def store_blob(db: AsyncSession, temp_path: str, content_hash: str, size: int) -> Blob:
+    """
+    将已写入磁盘的临时文件存入内容寻址存储，返回引用计数已加一的 Blob
+
+    内容已存在时直接删除临时文件；否则移动到 blob_path。不提交事务，
+    由调用方与 File 记录一起提交。
+    """
+    blob = await _acquire_existing(db, content_hash)
+    if blob is None:
+        path = blob_path(content_hash)
+        try:
+            # 使用保存点，并发上传相同内容导致唯一约束冲突时只回滚本次插入
+            async with db.begin_nested():
+                blob = Blob(content_hash=content_hash, storage_path=path, size=size, ref_count=1)
+                db.add(blob)
+        except IntegrityError:
+            blob = await _acquire_existing(db, content_hash)
+            if blob is None:
+                raise
+
+    if os.path.exists(blob.storage_path):
+        await remove_file_quietly(temp_path)
+        metrics.inc("storage.dedup_hits")
+    else:
+        # 先写入数据库行再移动文件，与 release_blob 的移走在同一行锁下串行
+        await _move_into_place(temp_path, blob.storage_path)
+        metrics.add_gauge(PHYSICAL_BYTES, blob.size)
+
+    metrics.add_gauge(LOGICAL_BYTES, blob.size)
+    publish_dedup_metrics()
+    return blob
+
+async def _move_into_place(temp_path: str, path: str) -> None:
+    # 分片目录可能刚被 finish_release 清理掉，重建后重试
+    for attempt in range(3):
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            await aiofiles.os.replace(temp_path, path)
+            return
+        except FileNotFoundError:
+            if attempt == 2 or not os.path.exists(temp_path):
+                raise
+
+async def _remove_empty_dirs(path: str) -> None:
+    """删除文件后清理变空的两级分片目录"""
+    for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+        try:
+            await aiofiles.os.rmdir(directory)
+        except OSError:
+            return  # 目录非空或已被删除
+
+async def release_blob(db: AsyncSession, blob_id: int) -> Optional[ReleasedBlob]:
+    """
+    减少引用计数，归零时删除 Blob 记录，返回待删除的文件
+
+    文件在提交前（仍持有该行的写锁）从存储路径移开，并发上传的相同内容会放入新文件而不会误认为已存在；
+    调用方提交事务后调用 finish_release 删除，提交失败时由它移回原处，数据库不会引用已删除的文件。
+    """
+    await db.execute(
+        update(Blob).where(Blob.id == blob_id).values(ref_count=Blob.ref_count - 1)
+    )
+    blob = await db.scalar(select(Blob).where(Blob.id == blob_id).execution_options(populate_existing=True))
+    if not blob:
+        return None
+
+    metrics.add_gauge(LOGICAL_BYTES, -blob.size)
+    released = None
+    if blob.ref_count <= 0:
+        await db.execute(delete(Blob).where(Blob.id == blob_id))
+        released = ReleasedBlob(blob.storage_path, f"{blob.storage_path}.deleting-{uuid.uuid4().hex}", blob.size)
+        try:
+            await aiofiles.os.replace(released.storage_path, released.pending_path)
+        except FileNotFoundError:
+            pass
+        metrics.add_gauge(PHYSICAL_BYTES, -blob.size)
+    publish_dedup_metrics()
+    return released
+
+async def finish_release(released: Optional[ReleasedBlob], committed: bool) -> None:
+    """事务提交后删除 release_blob 移开的文件；未提交（回滚）时把文件移回存储路径"""
+    if released is None:
+        return
+    if committed:
+        await remove_file_quietly(released.pending_path)
+        await _remove_empty_dirs(released.storage_path)
+        return
+    try:
+        await aiofiles.os.replace(released.pending_path, released.storage_path)
+    except FileNotFoundError:
+        pass
+    metrics.add_gauge(PHYSICAL_BYTES, released.size)
+    publish_dedup_metrics()
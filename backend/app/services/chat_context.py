@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.chat import ChatMessage
+from .token_counter import context_budget, message_tokens, messages_tokens
+
+def new_chat_message(session_pk: int, role: str, content: str, model: Optional[str] = None) -> ChatMessage:
+    """
+    创建消息并计算 token 数
+
+    cumulative_tokens 为会话内截至本条的 token 累计，插入时由数据库在同一语句中取当前最大值相加。
+    同一次 flush 中不要添加同一会话的多条消息，否则它们会读到相同的累计值。
+    """
+    tokens = message_tokens(content, model)
+    previous = select(func.coalesce(func.max(ChatMessage.cumulative_tokens), 0)).where(
+        ChatMessage.session_id == session_pk
+    ).scalar_subquery()
+    return ChatMessage(
+        session_id=session_pk,
+        role=role,
+        content=content,
+        tokens=tokens,
+        cumulative_tokens=previous + tokens
+    )
+
+async def build_context(
+    db: AsyncSession,
+    session_pk: int,
+    model: Optional[str] = None,
+    pending: Optional[List[Dict[str, str]]] = None
+) -> List[Dict[str, str]]:
+    """
+    组装发给模型的消息：在预算内的最近历史消息，加上尚未保存的 pending 消息
+
+    按 (session_id, cumulative_tokens) 索引倒序扫描，只读取能放进预算的那一段后缀，不加载完整历史。
+    """
+    pending = pending or []
+    budget = context_budget(model) - messages_tokens(pending, model)
+    if budget <= 0:
+        return pending
+
+    # 消息 m 及其之后的总量 = 最新累计值 - (m 的累计值 - m 的 token 数)，不超过预算即可放入
+    floor = select(func.max(ChatMessage.cumulative_tokens) - budget).where(
+        ChatMessage.session_id == session_pk
+    ).scalar_subquery()
+    rows = (await db.execute(
+        select(ChatMessage.role, ChatMessage.content).where(
+            ChatMessage.session_id == session_pk,
+            ChatMessage.cumulative_tokens > floor,
+            ChatMessage.cumulative_tokens - ChatMessage.tokens >= floor
+        ).order_by(ChatMessage.cumulative_tokens.desc())
+    )).all()
+
+    history = [{"role": role, "content": content} for role, content in reversed(rows)]
+    return history + pending
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import threading
+import unicodedata
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.cache import LRUTTLCache
+from ..core.config import settings
+from ..core.metrics import metrics
+from .tokenizer import cjk_ngrams, is_cjk, split_runs
+
+# 缓存键：(模型, 规范化后完整对话的哈希)
+CacheKey = Tuple[str, str]
+
+def normalize_text(text: str) -> str:
+    """全角转半角并合并空白，格式差异不影响命中"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+def history_hash(messages: List[Dict[str, str]]) -> str:
+    """规范化对话历史的哈希"""
+    data = json.dumps(
+        [[m.get("role", ""), normalize_text(m.get("content", ""))] for m in messages],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def text_features(text: str) -> List[str]:
+    """相似度特征：中文按单字和双字切分，拉丁单词取整词和字符三元组"""
+    features: List[str] = []
+    for run in split_runs(normalize_text(text)):
+        if is_cjk(run):
+            features.extend(run)
+            features.extend(cjk_ngrams(run, 2))
+        else:
+            features.append(run)
+            padded = f"#{run}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+def embed(text: str, dim: int) -> Optional[np.ndarray]:
+    """特征哈希得到的单位向量（本地计算，不调用模型），没有特征时返回 None"""
+    features = text_features(text)
+    if not features:
+        return None
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+    # 高位决定符号，减小哈希冲突带来的偏差
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+    vector = np.bincount(hashes % dim, weights=signs, minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+class _VectorIndex:
+    """
+    单个模型的近似问题索引
+
+    每行对应一个缓存项：最后一条用户消息的向量，以及之前对话的哈希。只有前文完全相同的缓存项才参与
+    相似度比较。删除时用最后一行填补空位，矩阵保持紧凑。
+    """
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((16, dim), dtype=np.float32)
+        self.prefixes = np.zeros(16, dtype=np.int64)
+        self.keys: List[CacheKey] = []
+        self.rows: Dict[CacheKey, int] = {}
+
+    @staticmethod
+    def _prefix_id(prefix: str) -> int:
+        return int(prefix[:15], 16)
+
+    def add(self, key: CacheKey, prefix: str, vector: np.ndarray) -> None:
+        if key in self.rows:
+            self.remove(key)
+        row = len(self.keys)
+        if row == len(self.vectors):
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+            self.prefixes = np.concatenate([self.prefixes, np.zeros_like(self.prefixes)])
+        self.vectors[row] = vector
+        self.prefixes[row] = self._prefix_id(prefix)
+        self.keys.append(key)
+        self.rows[key] = row
+
+    def remove(self, key: CacheKey) -> None:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            self.prefixes[row] = self.prefixes[last]
+            self.keys[row] = self.keys[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+
+    def search(self, prefix: str, vector: np.ndarray, threshold: float) -> Optional[CacheKey]:
+        size = len(self.keys)
+        if not size:
+            return None
+        scores = self.vectors[:size] @ vector
+        scores[self.prefixes[:size] != self._prefix_id(prefix)] = -1.0
+        best = int(np.argmax(scores))
+        return self.keys[best] if scores[best] >= threshold else None
+
+class CompletionCache:
+    """
+    对话回复缓存
+
+    完全相同的对话（按模型和规范化历史）直接命中；开启语义匹配时，前文相同且最后一条用户消息足够相似的
+    对话也视为命中。缓存项按 TTL 过期、按 LRU 淘汰，相似度索引随之更新。
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        semantic: bool = False,
+        threshold: float = 0.9,
+        dim: int = 1024,
+        disabled_models: Optional[List[str]] = None
+    ):
+        self.semantic = semantic
+        self.threshold = threshold
+        self.dim = dim
+        self.disabled_models = set(disabled_models or [])
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, _VectorIndex] = {}
+        self._entries = LRUTTLCache(max_size, ttl, name="chat_completion", on_evict=self._forget)
+
+    def enabled_for(self, model: str) -> bool:
+        return self._entries.max_size > 0 and model not in self.disabled_models
+
+    def _forget(self, key: CacheKey, value: str) -> None:
+        with self._lock:
+            index = self._indexes.get(key[0])
+            if index is not None:
+                index.remove(key)
+
+    def _record(self, outcome: str) -> None:
+        metrics.inc(f"chat.cache.{outcome}")
+        hits = metrics.get_counter("chat.cache.exact_hits") + metrics.get_counter("chat.cache.semantic_hits")
+        total = hits + metrics.get_counter("chat.cache.misses")
+        metrics.set_gauge("chat.cache.hit_rate", round(hits / total, 4) if total else 0.0)
+
+    def _semantic_input(self, messages: List[Dict[str, str]]) -> Optional[Tuple[str, np.ndarray]]:
+        """语义匹配只针对以用户消息结尾的对话：(前文哈希, 最后一条消息的向量)"""
+        if not self.semantic or not messages or messages[-1].get("role") != "user":
+            return None
+        vector = embed(messages[-1].get("content", ""), self.dim)
+        if vector is None:
+            return None
+        return history_hash(messages[:-1]), vector
+
+    def get(self, model: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """查找缓存的回复，未命中或该模型不使用缓存时返回 None"""
+        if not self.enabled_for(model):
+            metrics.inc("chat.cache.bypassed")
+            return None
+
+        reply = self._entries.get((model, history_hash(messages)))
+        if reply is not None:
+            self._record("exact_hits")
+            return reply
+
+        semantic_input = self._semantic_input(messages)
+        if semantic_input is not None:
+            with self._lock:
+                index = self._indexes.get(model)
+                key = index.search(*semantic_input, self.threshold) if index is not None else None
+            # 在索引锁之外读取：过期项被移除时会回调 _forget
+            reply = self._entries.get(key) if key is not None else None
+            if reply is not None:
+                self._record("semantic_hits")
+                return reply
+
+        self._record("misses")
+        return None
+
+    def set(self, model: str, messages: List[Dict[str, str]], reply: str) -> None:
+        """缓存一条完整回复"""
+        if not reply or not self.enabled_for(model):
+            return
+        key = (model, history_hash(messages))
+        self._entries.set(key, reply)
+        semantic_input = self._semantic_input(messages)
+        if semantic_input is not None and key in self._entries:
+            with self._lock:
+                index = self._indexes.get(model)
+                if index is None:
+                    index = self._indexes[model] = _VectorIndex(self.dim)
+                index.add(key, *semantic_input)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# 全局对话回复缓存
+completion_cache = CompletionCache(
+    max_size=settings.CHAT_CACHE_MAX_SIZE,
+    ttl=settings.CHAT_CACHE_TTL,
+    semantic=settings.CHAT_CACHE_SEMANTIC,
+    threshold=settings.CHAT_CACHE_SEMANTIC_THRESHOLD,
+    dim=settings.CHAT_CACHE_EMBEDDING_DIM,
+    disabled_models=settings.CHAT_CACHE_DISABLED_MODELS
+)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Optional, Tuple, Type
+
+from sqlalchemy import bindparam
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+class CounterBuffer:
+    """
+    写回缓冲计数器
+
+    热点行的 `col = col + 1` 先在内存中累加，每隔 flush_interval 毫秒或累计 flush_threshold 次后
+    在一个事务中批量写入，避免每次请求都争抢同一行（SQLite 下为整库写锁）。
+    读取到的计数最多落后一个刷新周期。只应在事件循环线程中调用。
+    """
+
+    def __init__(self, flush_interval_ms: int, flush_threshold: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[Tuple[Type, str], Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._count = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    def increment(self, model: Type, column: str, row_id: int, delta: int = 1) -> None:
+        """累加 model.column（按主键 id 定位行）"""
+        self._pending[(model, column)][row_id] += delta
+        self._count += 1
+        metrics.inc("counters.increments")
+        metrics.set_gauge("counters.pending", self._count)
+        if self._count >= self.flush_threshold and self._wakeup is not None:
+            self._wakeup.set()
+
+    def pending(self, model: Type, column: str, row_id: int) -> int:
+        """尚未写入数据库的增量"""
+        return self._pending.get((model, column), {}).get(row_id, 0)
+
+    async def flush(self) -> int:
+        """将累积的增量在一个事务中写入数据库，返回更新的行数"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            self._count = 0
+            metrics.set_gauge("counters.pending", 0)
+
+            started = time.perf_counter()
+            rows = 0
+            try:
+                async with async_engine.begin() as connection:
+                    for (model, column), deltas in batch.items():
+                        table = model.__table__
+                        stmt = table.update().where(
+                            table.c.id == bindparam("row_id")
+                        ).values({column: table.c[column] + bindparam("delta")})
+                        params = [{"row_id": row_id, "delta": delta} for row_id, delta in deltas.items() if delta]
+                        if params:
+                            await connection.execute(stmt, params)
+                            rows += len(params)
+            except BaseException:
+                # 写入失败或被取消时把增量放回，下次重试
+                for (model, column), deltas in batch.items():
+                    for row_id, delta in deltas.items():
+                        self._pending[(model, column)][row_id] += delta
+                        self._count += 1
+                metrics.set_gauge("counters.pending", self._count)
+                raise
+            metrics.inc("counters.flushes")
+            metrics.observe("counters.flush", time.perf_counter() - started)
+            return rows
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"计数器写入失败: {str(e)}")
+
+    def start(self) -> None:
+        """启动后台刷新任务"""
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写入剩余增量"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# 全局计数器缓冲
+counter_buffer = CounterBuffer(settings.COUNTER_FLUSH_INTERVAL_MS, settings.COUNTER_FLUSH_THRESHOLD)
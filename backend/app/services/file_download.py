@@ -0,0 +1,169 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+from ..core.config import settings
+
+class RangeNotSatisfiable(Exception):
+    """请求的字节范围超出文件大小"""
+
+def make_etag(content_hash: Optional[str], fallback: str) -> str:
+    """有内容哈希时返回强ETag，否则返回基于记录信息的弱ETag"""
+    if content_hash:
+        return f'"{content_hash}"'
+    return f'W/"{fallback}"'
+
+def to_http_date(value: Optional[datetime]) -> Optional[str]:
+    """转换为HTTP日期格式，SQLite返回的时间不带时区，按UTC处理"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """解析HTTP日期，格式错误时返回None"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _strip_weak(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较"""
+    if header.strip() == "*":
+        return True
+    target = _strip_weak(etag)
+    return any(_strip_weak(tag.strip()) == target for tag in header.split(","))
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[str]) -> bool:
+    """判断条件请求是否可直接返回304（If-None-Match 优先于 If-Modified-Since）"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    since = parse_http_date(request.headers.get("if-modified-since"))
+    modified = parse_http_date(last_modified)
+    return since is not None and modified is not None and modified <= since
+
+def if_range_matches(request: Request, etag: str, last_modified: Optional[str]) -> bool:
+    """If-Range 使用强比较，不匹配时忽略 Range 返回完整内容"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not etag.startswith("W/") and if_range == etag
+    return last_modified is not None and parse_http_date(if_range) == parse_http_date(last_modified)
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单个字节范围，返回 [start, end) 区间
+
+    无 Range、格式无法识别或包含多个范围时返回None（按完整内容响应）；
+    范围超出文件大小时抛出 RangeNotSatisfiable。
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, sep, end_text = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_text == "":
+            # 后缀范围：最后 N 个字节
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size
+        start = int(start_text)
+        end = int(end_text) + 1 if end_text else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size)
+
+async def iter_file_range(path: str, start: int, end: int, chunk_size: int = None) -> AsyncIterator[bytes]:
+    """按块读取文件的 [start, end) 区间"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    async with aiofiles.open(path, "rb") as source:
+        await source.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = await source.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+def content_disposition(filename: str) -> str:
+    """附件文件名，非ASCII文件名使用 RFC 5987 编码"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def not_modified_response(etag: str, last_modified: Optional[str], cache_control: str) -> Response:
+    """304响应，不读取磁盘"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return Response(status_code=304, headers=headers)
+
+def file_range_response(
+    request: Request,
+    path: str,
+    size: int,
+    filename: str,
+    media_type: str,
+    etag: str,
+    last_modified: Optional[str],
+    cache_control: str
+) -> Response:
+    """
+    带 ETag/Last-Modified 的文件响应，支持 Range 和 If-Range
+
+    调用方应先用 is_not_modified 处理条件请求。
+    """
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Content-Disposition": content_disposition(filename),
+    }
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        start, end, status_code = 0, size, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    headers["Content-Length"] = str(end - start)
+
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, List, Tuple
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from sqlalchemy import delete, select
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import AsyncSessionLocal
+from ..models.file import UploadSession, UploadChunk
+
+logger = logging.getLogger(__name__)
+
+# multipart 表单中除文件内容外的额外开销上限（边界、头部、其他字段）
+MULTIPART_OVERHEAD = 64 * 1024
+
+# 分块上传允许的最小块大小（最后一块除外）
+MIN_SESSION_CHUNK_SIZE = 256 * 1024
+
+class FileTooLargeError(Exception):
+    """上传内容超过大小限制"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"文件大小超过限制 ({max_size // (1024*1024)}MB)")
+
+class ChunkSizeError(Exception):
+    """分块实际长度与会话约定的长度不一致"""
+
+    def __init__(self, expected: int, received: int):
+        self.expected = expected
+        self.received = received
+        super().__init__(f"分块大小不正确：应为 {expected} 字节，实际收到 {received} 字节")
+
+async def limit_stream(stream: AsyncIterator[bytes], max_size: int) -> AsyncIterator[bytes]:
+    """
+    转发请求体，收到的字节超过 max_size 加 multipart 开销时抛出 FileTooLargeError
+
+    按实际收到的字节计数而不是 Content-Length，分块传输编码的请求同样在超限时停止读取。
+    """
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > max_size + MULTIPART_OVERHEAD:
+            raise FileTooLargeError(max_size)
+        yield chunk
+
+async def save_upload_stream(
+    upload: UploadFile,
+    destination: str,
+    max_size: int = None,
+    chunk_size: int = None
+) -> Tuple[int, str]:
+    """
+    将上传文件分块写入磁盘，边写边计算SHA-256
+
+    超过大小限制时立即停止并删除已写入的部分，抛出 FileTooLargeError。
+    返回 (文件大小, 十六进制SHA-256)。
+    """
+    max_size = max_size or settings.MAX_FILE_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    digest = hashlib.sha256()
+    file_size = 0
+
+    try:
+        async with aiofiles.open(destination, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise FileTooLargeError(max_size)
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        # 失败或被取消时清理不完整的文件
+        if os.path.exists(destination):
+            await aiofiles.os.remove(destination)
+        raise
+
+    return file_size, digest.hexdigest()
+
+async def allocate_part_file(path: str, size: int) -> None:
+    """创建分块上传的临时文件并预设长度，各分块随后按偏移量直接写入"""
+    async with aiofiles.open(path, "wb") as part:
+        await part.truncate(size)
+
+async def write_chunk_stream(
+    stream: AsyncIterator[bytes],
+    path: str,
+    offset: int,
+    expected_size: int
+) -> int:
+    """
+    将请求体流按偏移量写入临时文件，不在内存中拼接整块
+
+    长度超过或不足 expected_size 时抛出 ChunkSizeError；已写入的字节会在重传时被覆盖。
+    """
+    received = 0
+    async with aiofiles.open(path, "r+b") as part:
+        await part.seek(offset)
+        async for data in stream:
+            if not data:
+                continue
+            received += len(data)
+            if received > expected_size:
+                raise ChunkSizeError(expected_size, received)
+            await part.write(data)
+    if received != expected_size:
+        raise ChunkSizeError(expected_size, received)
+    return received
+
+def hash_file(path: str, chunk_size: int = None) -> str:
+    """分块读取文件计算SHA-256（阻塞调用，应放在线程中执行）"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for data in iter(lambda: source.read(chunk_size), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+def chunk_ranges(indices: Iterable[int], chunk_size: int, total_size: int) -> List[Tuple[int, int]]:
+    """将已接收的分块序号合并为连续的字节区间 [start, end)"""
+    ranges: List[Tuple[int, int]] = []
+    for index in sorted(set(indices)):
+        start = index * chunk_size
+        end = min(start + chunk_size, total_size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+async def remove_file_quietly(path: str) -> None:
+    """删除文件，不存在时忽略"""
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def sweep_stale_uploads(ttl: int = None) -> int:
+    """清理闲置超过 ttl 秒的上传会话及其临时文件，返回清理的会话数"""
+    ttl = ttl or settings.UPLOAD_SESSION_TTL
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+
+    async with AsyncSessionLocal() as db:
+        stale = (await db.execute(
+            select(UploadSession.id, UploadSession.temp_path).where(
+                UploadSession.updated_at < cutoff
+            )
+        )).all()
+        if stale:
+            session_ids = [row.id for row in stale]
+            await db.execute(delete(UploadChunk).where(UploadChunk.session_id.in_(session_ids)))
+            await db.execute(delete(UploadSession).where(UploadSession.id.in_(session_ids)))
+            await db.commit()
+        active_paths = set((await db.scalars(select(UploadSession.temp_path))).all())
+
+    for row in stale:
+        await remove_file_quietly(row.temp_path)
+
+    # 清理没有对应会话的残留临时文件（例如会话记录创建失败）
+    orphans = 0
+    expire_before = time.time() - ttl
+    for entry in await asyncio.to_thread(lambda: list(os.scandir(settings.UPLOAD_TEMP_DIR))):
+        if entry.is_file() and entry.path not in active_paths and entry.stat().st_mtime < expire_before:
+            await remove_file_quietly(entry.path)
+            orphans += 1
+
+    if stale or orphans:
+        metrics.inc("uploads.sessions_swept", len(stale))
+        logger.info(f"清理了 {len(stale)} 个过期上传会话，{orphans} 个残留临时文件")
+    return len(stale)
+
+async def run_upload_sweeper(interval: int = None) -> None:
+    """后台定期清理过期的分块上传"""
+    interval = interval or settings.UPLOAD_SWEEP_INTERVAL
+    while True:
+        try:
+            await sweep_stale_uploads()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"清理过期上传失败: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,160 @@
+import hashlib
+import math
+import struct
+from typing import Iterable, Optional, Set
+
+import numpy as np
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+_EXACT = b"E"
+_REGISTERS = b"H"
+
+def precision_for_error(error_rate: float) -> int:
+    """按目标相对标准误差（1.04/√m）选择寄存器位数"""
+    if error_rate <= 0:
+        return MAX_PRECISION
+    precision = math.ceil(math.log2((1.04 / error_rate) ** 2))
+    return max(MIN_PRECISION, min(MAX_PRECISION, precision))
+
+def _hash64(value: int) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+def _alpha(m: int) -> float:
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+class HyperLogLog:
+    """
+    可合并的 HyperLogLog 去重计数
+
+    元素数不超过 exact_threshold 时直接保存原始ID（精确模式），超过后转为 2^precision 个寄存器，
+    相对标准误差约 1.04/√m。两个草图合并后等价于对并集计数，因此每日草图可合并出任意窗口的去重数。
+    """
+
+    def __init__(self, precision: int, exact_threshold: int = 0):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision 必须在 {MIN_PRECISION}-{MAX_PRECISION} 之间")
+        self.precision = precision
+        self.exact_threshold = exact_threshold
+        self._items: Optional[Set[int]] = set() if exact_threshold > 0 else None
+        self._registers: Optional[np.ndarray] = None if exact_threshold > 0 else self._empty_registers()
+
+    @property
+    def m(self) -> int:
+        return 1 << self.precision
+
+    @property
+    def is_exact(self) -> bool:
+        return self._items is not None
+
+    @property
+    def standard_error(self) -> float:
+        """当前计数的相对标准误差，精确模式为 0"""
+        return 0.0 if self.is_exact else 1.04 / math.sqrt(self.m)
+
+    def _empty_registers(self) -> np.ndarray:
+        return np.zeros(self.m, dtype=np.uint8)
+
+    def _add_hash(self, hashed: int) -> None:
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - remainder.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def _to_registers(self) -> None:
+        items, self._items = self._items, None
+        self._registers = self._empty_registers()
+        for item in items:
+            self._add_hash(_hash64(item))
+
+    def add(self, value: int) -> None:
+        if self._items is not None:
+            self._items.add(int(value))
+            if len(self._items) > self.exact_threshold:
+                self._to_registers()
+            return
+        self._add_hash(_hash64(value))
+
+    def update(self, values: Iterable[int]) -> None:
+        for value in values:
+            self.add(value)
+
+    def _fold(self, precision: int) -> np.ndarray:
+        """把寄存器降到较低的 precision（被舍弃的索引位变为前导位）"""
+        shift = self.precision - precision
+        if shift == 0:
+            return self._registers
+        registers = self._registers.reshape(1 << precision, 1 << shift)
+        low = np.arange(1 << shift, dtype=np.uint32)
+        # 低位索引非零时秩由其前导零决定，为零时在原秩基础上加 shift
+        low_bits = np.zeros_like(low)
+        nonzero = low > 0
+        low_bits[nonzero] = np.floor(np.log2(low[nonzero])).astype(np.uint32) + 1
+        ranks = np.where(
+            low > 0,
+            (shift - low_bits + 1).astype(np.uint8),
+            np.where(registers[:, 0] > 0, registers[:, 0] + shift, 0)[:, None]
+        )
+        ranks = np.where(registers > 0, ranks, 0)
+        return ranks.max(axis=1).astype(np.uint8)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """合并另一个草图（原地），精度不同时按较低精度合并"""
+        if other._items is not None:
+            self.update(other._items)
+            return self
+        if self._items is not None:
+            items, self._items = self._items, None
+            self.precision = min(self.precision, other.precision)
+            self._registers = other._fold(self.precision).copy()
+            self.update(items)
+            return self
+        precision = min(self.precision, other.precision)
+        self._registers = np.maximum(self._fold(precision), other._fold(precision))
+        self.precision = precision
+        return self
+
+    def count(self) -> int:
+        if self._items is not None:
+            return len(self._items)
+        m = self.m
+        estimate = _alpha(m) * m * m / float(np.sum(np.ldexp(1.0, -self._registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self._registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时用线性计数修正
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def to_bytes(self) -> bytes:
+        if self._items is not None:
+            return _EXACT + struct.pack(f">B{len(self._items)}Q", self.precision, *sorted(self._items))
+        return _REGISTERS + bytes([self.precision]) + self._registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, exact_threshold: int = 0) -> "HyperLogLog":
+        mode, precision = data[:1], data[1]
+        sketch = cls(precision, exact_threshold)
+        if mode == _EXACT:
+            items = struct.unpack(f">{(len(data) - 2) // 8}Q", data[2:])
+            sketch._items = set()
+            sketch._registers = None
+            if exact_threshold <= 0:
+                sketch._to_registers()
+            sketch.update(items)
+        elif mode == _REGISTERS:
+            sketch._items = None
+            sketch._registers = np.frombuffer(data[2:], dtype=np.uint8).copy()
+        else:
+            raise ValueError("无法识别的草图格式")
+        return sketch
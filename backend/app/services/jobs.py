@@ -0,0 +1,610 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import AsyncSessionLocal
+from ..models.file import File
+from ..models.tool import Tool, ToolUsage
+from .tool_cache import ResultKey, result_key, tool_result_cache
+from .tool_executors import ToolInputError, run_tool, run_tool_batch
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+# running 状态超过执行超时再加该时间（秒）仍未结束，视为执行它的进程已退出
+RECOVERY_GRACE = 60
+RECOVERY_INTERVAL = 60
+
+# 批量执行中一个待执行的不同输入：(缓存键, 执行用的输入, 对应的输入序号)
+BatchGroup = Tuple[Optional[ResultKey], Dict[str, Any], List[int]]
+
+class Job(NamedTuple):
+    """已认领、待执行的任务"""
+    id: int
+    job_id: str
+    tool_pk: int
+    tool_id: str
+    tool_name: str
+    config: Dict[str, Any]
+    user_id: int
+    input_data: Dict[str, Any]
+    queued_at: Optional[datetime]
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite 读出的时间不带时区
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _file_pk(file_id: Any) -> int:
+    try:
+        return int(file_id)
+    except (TypeError, ValueError):
+        raise ToolInputError("file_id 无效")
+
+# 执行时由 file_id 对应的文件填入的字段，客户端提交的同名字段一律丢弃（否则可以读取服务器上的任意文件）
+FILE_FIELDS = ("file_path", "file_name", "mime_type")
+
+def _user_input(input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """客户端提交的输入，去掉只能由服务端填入的文件字段"""
+    return {key: value for key, value in input_data.items() if key not in FILE_FIELDS}
+
+def _with_file(input_data: Dict[str, Any], file: File) -> Dict[str, Any]:
+    """执行用的输入：附上文件路径等信息"""
+    return {**_user_input(input_data), "file_path": file.file_path, "file_name": file.original_name, "mime_type": file.mime_type}
+
+async def find_input_file(db: AsyncSession, user_id: int, file_id: Any) -> File:
+    """工具输入中 file_id 对应的文件，只能使用自己的文件"""
+    file_pk = _file_pk(file_id)
+    file = await db.scalar(select(File).where(File.id == file_pk, File.user_id == user_id))
+    if file is None:
+        raise ToolInputError("文件不存在")
+    return file
+
+async def get_job(db: AsyncSession, job_id: str, user_id: int) -> Optional[ToolUsage]:
+    return await db.scalar(
+        select(ToolUsage).where(ToolUsage.job_id == job_id, ToolUsage.user_id == user_id)
+    )
+
+class JobEngine:
+    """
+    工具后台任务引擎
+
+    任务就是 status 为 queued 的 ToolUsage 记录，保存在数据库中，服务重启后继续执行。调度任务按提交顺序
+    以条件更新认领任务（多个服务进程不会重复执行同一任务），遵守每个工具的并发上限，在进程池中执行。
+    执行中断（重启、工作进程崩溃）的任务重新排队，超过 max_attempts 次后标记为失败。
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        tool_concurrency: int,
+        timeout: float,
+        max_attempts: int,
+        poll_interval: float,
+        batch_size: int
+    ):
+        self.workers = workers
+        self.tool_concurrency = tool_concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # 名额计数：队列任务和批量执行的每一批都占用一个，直到工作进程中的函数实际结束（超时后仍占用）
+        self._busy = 0  # 占用的工作进程数
+        self._running: Dict[int, int] = {}  # 工具ID -> 本进程中该工具占用的名额
+        self._slot_waiters: Set[asyncio.Event] = set()  # 等待空闲名额的批量执行
+        self._inflight: Dict[int, asyncio.Task] = {}  # ToolUsage.id -> 执行任务
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+
+    def tool_limit(self, config: Optional[Dict[str, Any]]) -> int:
+        return int((config or {}).get("max_concurrency") or self.tool_concurrency)
+
+    def tool_timeout(self, config: Optional[Dict[str, Any]]) -> float:
+        return float((config or {}).get("timeout") or self.timeout)
+
+    def tool_batch_size(self, config: Optional[Dict[str, Any]]) -> int:
+        return max(int((config or {}).get("batch_size") or self.batch_size), 1)
+
+    def _acquire(self, tool_pk: int) -> None:
+        self._busy += 1
+        self._running[tool_pk] = self._running.get(tool_pk, 0) + 1
+        metrics.set_gauge("jobs.workers_busy", self._busy)
+
+    def _release(self, tool_pk: int) -> None:
+        self._busy -= 1
+        self._running[tool_pk] -= 1
+        metrics.set_gauge("jobs.workers_busy", self._busy)
+        for event in self._slot_waiters:
+            event.set()
+        self.notify()
+
+    def _release_when_done(self, future: Optional[asyncio.Future], tool_pk: int) -> None:
+        """工作进程中的函数结束后释放名额；超时或取消时函数仍在运行，进程结束前继续占用"""
+        if future is None or future.done():
+            self._release(tool_pk)
+            return
+
+        def done(finished: asyncio.Future) -> None:
+            if not finished.cancelled():
+                finished.exception()  # 已不再等待结果，避免未获取异常的警告
+            self._release(tool_pk)
+
+        future.add_done_callback(done)
+
+    async def _claim_slot(self, tool_pk: int, limit: int) -> None:
+        """等待进程池和该工具都有空闲名额后占用一个（与队列调度共用计数）"""
+        while self._busy >= self.workers or self._running.get(tool_pk, 0) >= limit:
+            event = asyncio.Event()
+            self._slot_waiters.add(event)
+            try:
+                await event.wait()
+            finally:
+                self._slot_waiters.discard(event)
+        self._acquire(tool_pk)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn：工作进程不继承事件循环、数据库连接等状态
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self) -> None:
+        """创建进程池并启动调度任务"""
+        self._pool = self._new_pool()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止调度，正在执行的任务重新排队，下次启动时继续"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        interrupted = list(self._inflight)
+        tasks = list(self._inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if interrupted:
+            # 正常停止不计入执行次数
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(ToolUsage)
+                    .where(ToolUsage.id.in_(interrupted), ToolUsage.status == RUNNING)
+                    .values(status=QUEUED, started_at=None, attempts=ToolUsage.attempts - 1)
+                )
+                await db.commit()
+            logger.info(f"{len(interrupted)} 个执行中的工具任务已重新排队")
+        if self._pool is not None:
+            # 已在工作进程中运行的函数无法中断，不等待其结束
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def notify(self) -> None:
+        """有新任务或空出执行名额时唤醒调度"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def submit(self, db: AsyncSession, tool: Tool, user_id: int, input_data: Dict[str, Any]) -> ToolUsage:
+        """
+        提交任务，返回排队中的 ToolUsage 记录
+
+        相同工具、配置和输入的结果仍在缓存中时不再执行，直接记录一条已完成并标记 cached 的记录。
+        """
+        input_data = _user_input(input_data)
+        file_hash = None
+        if input_data.get("file_id") is not None:
+            file_hash = (await find_input_file(db, user_id, input_data["file_id"])).content_hash
+        now = datetime.now(timezone.utc)
+        usage = ToolUsage(
+            tool_id=tool.id,
+            user_id=user_id,
+            usage_data=input_data,
+            job_id=uuid.uuid4().hex,
+            status=QUEUED,
+            queued_at=now
+        )
+        cached = tool_result_cache.get(result_key(tool.tool_id, tool.config, input_data, file_hash), tool.config)
+        if cached is not None:
+            usage.status = DONE
+            usage.cached = True
+            usage.result_data = cached
+            usage.started_at = usage.finished_at = now
+        db.add(usage)
+        await db.commit()
+        await db.refresh(usage)
+        if cached is not None:
+            metrics.inc("jobs.cached")
+            return usage
+        metrics.inc("jobs.submitted")
+        self.notify()
+        return usage
+
+    async def run_batch(
+        self,
+        db: AsyncSession,
+        tool: Tool,
+        user_id: int,
+        inputs: List[Dict[str, Any]]
+    ) -> List[ToolUsage]:
+        """
+        批量执行工具，返回与 inputs 一一对应、均已结束的 ToolUsage 记录
+
+        不经过任务队列：命中缓存的输入直接取结果，相同的输入只执行一次，其余按 batch_size 分批，在进程池中
+        并行执行（同时执行的批数不超过工具并发上限）。单项失败只记录在该项，全部记录在一个事务中写入。
+
+        db 只用于查询输入引用的文件，之后即关闭以归还连接（执行可能长达执行超时），记录用新的会话写入。
+        """
+        started = time.perf_counter()
+        config = tool.config or {}
+        inputs = [_user_input(input_data) for input_data in inputs]
+        now = datetime.now(timezone.utc)
+        usages = [
+            ToolUsage(
+                tool_id=tool.id,
+                user_id=user_id,
+                usage_data=input_data,
+                job_id=uuid.uuid4().hex,
+                status=FAILED,
+                cached=False,
+                attempts=0,
+                queued_at=now
+            )
+            for input_data in inputs
+        ]
+
+        files = await self._batch_files(db, user_id, inputs)
+        await db.close()
+        pending: Dict[Any, BatchGroup] = {}  # 缓存键（无法缓存时用序号）-> 待执行的输入
+        for i, (input_data, usage) in enumerate(zip(inputs, usages)):
+            file = None
+            if input_data.get("file_id") is not None:
+                try:
+                    file = files.get(_file_pk(input_data["file_id"]))
+                except ToolInputError as e:
+                    usage.error, usage.finished_at = str(e), now
+                    continue
+                if file is None:
+                    usage.error, usage.finished_at = "文件不存在", now
+                    continue
+            key = result_key(tool.tool_id, config, input_data, file.content_hash if file else None)
+            cached = tool_result_cache.get(key, config)
+            if cached is not None:
+                usage.status, usage.cached, usage.result_data = DONE, True, cached
+                usage.started_at = usage.finished_at = now
+                continue
+            group = i if key is None else key
+            if group not in pending:
+                pending[group] = (key, _with_file(input_data, file) if file else input_data, [])
+            pending[group][2].append(i)
+
+        groups = list(pending.values())
+        size = self.tool_batch_size(config)
+        limit = self.tool_limit(config)
+
+        async def run_chunk(chunk: List[BatchGroup]) -> None:
+            await self._claim_slot(tool.id, limit)
+            chunk_started = datetime.now(timezone.utc)
+            outcomes = await self._run_chunk(tool, config, [input_data for _, input_data, _ in chunk])
+            finished = datetime.now(timezone.utc)
+            for (key, _, indices), (ok, output) in zip(chunk, outcomes):
+                result = None
+                if ok:
+                    result = {"tool_id": tool.tool_id, "result": output, "status": "success"}
+                    tool_result_cache.set(key, config, result)
+                for n, i in enumerate(indices):
+                    usage = usages[i]
+                    usage.status = DONE if ok else FAILED
+                    usage.result_data = result
+                    usage.error = None if ok else output
+                    usage.cached = n > 0  # 同批次中重复的输入共用第一次的结果
+                    usage.attempts = 1 if n == 0 else 0
+                    usage.started_at, usage.finished_at = chunk_started, finished
+
+        await asyncio.gather(*(run_chunk(groups[i:i + size]) for i in range(0, len(groups), size)))
+
+        async with AsyncSessionLocal() as db:
+            db.add_all(usages)
+            await db.commit()
+
+        done = sum(usage.status == DONE for usage in usages)
+        metrics.inc("jobs.batches")
+        metrics.inc("jobs.batch_items", len(usages))
+        metrics.inc("jobs.cached", sum(bool(usage.cached) for usage in usages))
+        metrics.inc("jobs.completed", done)
+        metrics.inc("jobs.failed", len(usages) - done)
+        metrics.observe("jobs.batch_run", time.perf_counter() - started)
+        return usages
+
+    async def _batch_files(self, db: AsyncSession, user_id: int, inputs: List[Dict[str, Any]]) -> Dict[int, File]:
+        """一次查出批量输入引用的文件（只包括自己的文件）"""
+        file_pks = set()
+        for input_data in inputs:
+            try:
+                if input_data.get("file_id") is not None:
+                    file_pks.add(_file_pk(input_data["file_id"]))
+            except ToolInputError:
+                pass
+        if not file_pks:
+            return {}
+        files = await db.scalars(select(File).where(File.id.in_(file_pks), File.user_id == user_id))
+        return {file.id: file for file in files}
+
+    async def _run_chunk(self, tool: Tool, config: Dict[str, Any], inputs: List[Dict[str, Any]]) -> List[Tuple[bool, Any]]:
+        """
+        在一个工作进程中执行一批输入，整批超时、工作进程异常退出或其他错误时这一批的每项都记为失败
+
+        调用前须已占用名额（_claim_slot），工作进程中的函数结束后释放。
+        """
+        pool = self._pool
+        future = None
+        try:
+            future = asyncio.get_running_loop().run_in_executor(pool, run_tool_batch, tool.tool_id, tool.name, inputs)
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.tool_timeout(config))
+        except asyncio.TimeoutError:
+            error = "任务执行超时"
+        except BrokenProcessPool:
+            metrics.inc("jobs.worker_crashes")
+            logger.error(f"工具 {tool.tool_id} 的批量任务工作进程异常退出")
+            if self._pool is pool:
+                self._pool = self._new_pool()
+            error = "工作进程异常退出"
+        except Exception as e:
+            # 结果无法序列化等意外错误：只影响这一批，其余批次照常返回
+            logger.error(f"工具 {tool.tool_id} 的批量任务执行失败: {type(e).__name__}: {str(e)}")
+            error = f"{type(e).__name__}: {str(e)}"
+        finally:
+            self._release_when_done(future, tool.id)
+        return [(False, error)] * len(inputs)
+
+    async def watch(self, job_id: str, user_id: int) -> AsyncIterator[ToolUsage]:
+        """逐次返回任务状态的变化，直到任务结束（任务不存在时直接结束）"""
+        last = None
+        event = asyncio.Event()
+        try:
+            while True:
+                # 先登记再读取，读取之后发生的变化不会错过；其他进程执行的任务靠定时重读
+                event.clear()
+                self._watchers.setdefault(job_id, set()).add(event)
+                async with AsyncSessionLocal() as db:
+                    job = await get_job(db, job_id, user_id)
+                if job is None:
+                    return
+                if (job.status, job.attempts) != last:
+                    last = (job.status, job.attempts)
+                    yield job
+                if job.status in FINISHED:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(event)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    async def wait(self, job_id: str, user_id: int, timeout: float) -> Optional[ToolUsage]:
+        """等待任务结束，最多 timeout 秒，返回最新状态"""
+        latest = None
+
+        async def follow() -> None:
+            nonlocal latest
+            async with aclosing(self.watch(job_id, user_id)) as updates:
+                async for job in updates:
+                    latest = job
+
+        try:
+            await asyncio.wait_for(follow(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return latest
+
+    def _changed(self, job_id: str) -> None:
+        for event in self._watchers.pop(job_id, ()):
+            event.set()
+
+    async def _run(self) -> None:
+        last_recovery: Optional[float] = None
+        while True:
+            self._wakeup.clear()
+            try:
+                if last_recovery is None or time.monotonic() - last_recovery >= RECOVERY_INTERVAL:
+                    await self._recover()
+                    last_recovery = time.monotonic()
+                await self._dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.inc("jobs.dispatch_errors")
+                logger.error(f"调度工具任务失败: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self) -> None:
+        """在空闲名额内按提交顺序认领任务，跳过已达并发上限的工具"""
+        saturated: Set[int] = set()
+        while self._busy < self.workers:
+            async with AsyncSessionLocal() as db:
+                query = (
+                    select(
+                        ToolUsage.id, ToolUsage.job_id, ToolUsage.tool_id, ToolUsage.user_id,
+                        ToolUsage.usage_data, ToolUsage.queued_at,
+                        Tool.tool_id.label("tool_key"), Tool.name, Tool.config
+                    )
+                    .join(Tool, Tool.id == ToolUsage.tool_id)
+                    .where(ToolUsage.status == QUEUED)
+                )
+                if saturated:
+                    query = query.where(ToolUsage.tool_id.notin_(saturated))
+                rows = (await db.execute(
+                    query.order_by(ToolUsage.id).limit(self.workers - self._busy)
+                )).all()
+                if not rows:
+                    return
+
+                for row in rows:
+                    if self._busy >= self.workers:
+                        return
+                    limit = self.tool_limit(row.config)
+                    if self._running.get(row.tool_id, 0) >= limit:
+                        saturated.add(row.tool_id)
+                        continue
+                    claimed = await db.execute(
+                        update(ToolUsage)
+                        .where(ToolUsage.id == row.id, ToolUsage.status == QUEUED)
+                        .values(
+                            status=RUNNING,
+                            started_at=datetime.now(timezone.utc),
+                            attempts=ToolUsage.attempts + 1
+                        )
+                    )
+                    await db.commit()
+                    if claimed.rowcount != 1:
+                        continue  # 已被其他进程认领
+
+                    job = Job(
+                        row.id, row.job_id, row.tool_id, row.tool_key, row.name,
+                        row.config or {}, row.user_id, row.usage_data or {}, _as_utc(row.queued_at)
+                    )
+                    self._acquire(job.tool_pk)
+                    if self._running[job.tool_pk] >= limit:
+                        saturated.add(job.tool_pk)
+                    self._inflight[job.id] = asyncio.create_task(self._execute(job))
+                    metrics.inc("jobs.started")
+                    metrics.set_gauge("jobs.running", len(self._inflight))
+                    if job.queued_at is not None:
+                        metrics.observe("jobs.wait", (datetime.now(timezone.utc) - job.queued_at).total_seconds())
+                    self._changed(job.job_id)
+
+    async def _prepare_input(self, job: Job) -> Tuple[Dict[str, Any], Optional[str]]:
+        """把输入中的 file_id 解析为文件路径（提交之后文件可能已被删除），同时返回文件内容哈希"""
+        if job.input_data.get("file_id") is None:
+            return _user_input(job.input_data), None
+        async with AsyncSessionLocal() as db:
+            file = await find_input_file(db, job.user_id, job.input_data["file_id"])
+        return _with_file(job.input_data, file), file.content_hash
+
+    async def _execute(self, job: Job) -> None:
+        started = time.perf_counter()
+        pool = self._pool
+        future = None
+        status, result, error = FAILED, None, None
+        try:
+            input_data, file_hash = await self._prepare_input(job)
+            # 超时后工作进程中的函数仍会运行到结束，名额在 finally 中等到它结束才释放
+            future = asyncio.get_running_loop().run_in_executor(pool, run_tool, job.tool_id, job.tool_name, input_data)
+            output = await asyncio.wait_for(asyncio.shield(future), timeout=self.tool_timeout(job.config))
+            status, result = DONE, {"tool_id": job.tool_id, "result": output, "status": "success"}
+            tool_result_cache.set(result_key(job.tool_id, job.config, job.input_data, file_hash), job.config, result)
+        except asyncio.TimeoutError:
+            error = "任务执行超时"
+        except ToolInputError as e:
+            error = str(e)
+        except BrokenProcessPool:
+            # 工作进程异常退出（如内存不足被终止）：重建进程池，任务按中断处理
+            metrics.inc("jobs.worker_crashes")
+            logger.error(f"工具任务 {job.job_id} 的工作进程异常退出")
+            if self._pool is pool:
+                self._pool = self._new_pool()
+            status = None
+        except Exception as e:
+            logger.error(f"工具任务 {job.job_id} 执行失败: {type(e).__name__}: {str(e)}")
+            error = f"{type(e).__name__}: {str(e)}"
+        finally:
+            self._release_when_done(future, job.tool_pk)
+            self._inflight.pop(job.id, None)
+            metrics.set_gauge("jobs.running", len(self._inflight))
+
+        if status is None:
+            await self._interrupted([job.id])
+        else:
+            await self._finish(job.id, status, result, error)
+            metrics.inc("jobs.completed" if status == DONE else "jobs.failed")
+            metrics.observe("jobs.run", time.perf_counter() - started)
+        self._changed(job.job_id)
+        self.notify()
+
+    async def _finish(self, usage_id: int, status: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ToolUsage)
+                .where(ToolUsage.id == usage_id, ToolUsage.status == RUNNING)
+                .values(status=status, result_data=result, error=error, finished_at=datetime.now(timezone.utc))
+            )
+            await db.commit()
+
+    async def _interrupted(self, usage_ids: List[int]) -> None:
+        """中断的任务重新排队，已达 max_attempts 次的标记为失败"""
+        async with AsyncSessionLocal() as db:
+            base = update(ToolUsage).where(ToolUsage.id.in_(usage_ids), ToolUsage.status == RUNNING)
+            failed = await db.execute(
+                base.where(ToolUsage.attempts >= self.max_attempts).values(
+                    status=FAILED,
+                    error="任务多次执行中断",
+                    finished_at=datetime.now(timezone.utc)
+                )
+            )
+            requeued = await db.execute(base.values(status=QUEUED, started_at=None))
+            await db.commit()
+        metrics.inc("jobs.failed", failed.rowcount)
+        metrics.inc("jobs.requeued", requeued.rowcount)
+
+    async def _recover(self) -> None:
+        """找出执行进程已退出的任务（running 且超时未结束）"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=RECOVERY_GRACE)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(ToolUsage.id, ToolUsage.job_id, ToolUsage.started_at, Tool.config)
+                .join(Tool, Tool.id == ToolUsage.tool_id)
+                .where(ToolUsage.status == RUNNING, ToolUsage.started_at < cutoff)
+            )).all()
+        now = datetime.now(timezone.utc)
+        stale = [
+            row for row in rows
+            if row.id not in self._inflight
+            and _as_utc(row.started_at) + timedelta(seconds=self.tool_timeout(row.config) + RECOVERY_GRACE) < now
+        ]
+        if not stale:
+            return
+        logger.warning(f"发现 {len(stale)} 个执行中断的工具任务")
+        await self._interrupted([row.id for row in stale])
+        for row in stale:
+            self._changed(row.job_id)
+
+# 全局工具任务引擎
+job_engine = JobEngine(
+    workers=settings.JOB_WORKERS,
+    tool_concurrency=settings.JOB_TOOL_CONCURRENCY,
+    timeout=settings.JOB_TIMEOUT,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    batch_size=settings.TOOL_BATCH_SIZE
+)
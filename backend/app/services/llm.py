@@ -0,0 +1,327 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from .completion_cache import completion_cache
+
+logger = logging.getLogger(__name__)
+
+# 可重试的上游状态码：限流和服务端临时错误
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class ChatBackendError(Exception):
+    """模型服务调用失败"""
+
+class CircuitOpenError(ChatBackendError):
+    """熔断中，请求未发出"""
+
+class _RetryableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def backend_enabled() -> bool:
+    """是否配置了模型服务（未配置或仍为示例值时使用模拟回复）"""
+    key = settings.OPENAI_API_KEY
+    return bool(key) and not key.startswith("your-")
+
+def mock_reply(content: str) -> str:
+    return f"这是AI助手对您的消息 '{content}' 的回复。"
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 failure_threshold 次后断开 reset_timeout 秒，期间请求直接失败；到期后放行一个试探请求，
+    成功则恢复，失败则重新断开。只应在事件循环线程中使用。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_started = None
+        # 试探请求被取消等未能回报结果时，超过 reset_timeout 后允许再次试探
+        if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+            return False
+        self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started = None
+        metrics.set_gauge("llm.circuit_open", 0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                metrics.inc("llm.circuit_opened")
+                logger.warning(f"模型服务连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+            metrics.set_gauge("llm.circuit_open", 1)
+
+class LLMClient:
+    """
+    OpenAI 兼容接口的共享客户端
+
+    复用一个 httpx.AsyncClient（长连接池），按目标主机限制并发；连接失败、超时、429 和 5xx 按带抖动的
+    指数退避重试（流式请求只在收到第一段输出之前重试），连续失败时熔断。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        max_connections: int,
+        max_keepalive: int,
+        keepalive_expiry: float,
+        connect_timeout: float,
+        read_timeout: float,
+        max_concurrency: int,
+        max_retries: int,
+        backoff_ms: int,
+        max_backoff_ms: int,
+        breaker_failures: int,
+        breaker_reset: float
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff_ms / 1000
+        self.max_backoff = max_backoff_ms / 1000
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=self.limits,
+                timeout=self.timeout
+            )
+        return self._client
+
+    def start(self) -> None:
+        """创建连接池"""
+        self.client
+
+    async def stop(self) -> None:
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.max_concurrency)
+        return slot
+
+    def _delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """全抖动指数退避；上游给出 Retry-After 时不早于该时间"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    async def _open(self, payload: dict, stream: bool) -> httpx.Response:
+        """发出一次请求，返回 2xx 响应（stream 时响应体未读取，由调用方关闭）"""
+        if not self.breaker.allow():
+            metrics.inc("llm.rejected")
+            raise CircuitOpenError("模型服务暂不可用，请稍后重试")
+
+        metrics.inc("llm.requests")
+        started = time.perf_counter()
+        try:
+            request = self.client.build_request("POST", "/chat/completions", json=payload)
+            response = await self.client.send(request, stream=stream)
+        except httpx.TransportError as e:
+            self.breaker.record_failure()
+            metrics.inc("llm.errors")
+            raise _RetryableError(f"{type(e).__name__}: {str(e)}")
+        metrics.observe("llm.request", time.perf_counter() - started)
+
+        if response.status_code < 400:
+            self.breaker.record_success()
+            return response
+
+        await response.aclose()
+        metrics.inc("llm.errors")
+        if response.status_code in RETRYABLE_STATUS:
+            self.breaker.record_failure()
+            raise _RetryableError(
+                f"HTTP {response.status_code}",
+                _parse_retry_after(response.headers.get("retry-after"))
+            )
+        # 其他 4xx 是请求本身的问题，上游可用
+        self.breaker.record_success()
+        raise ChatBackendError(f"模型服务返回 {response.status_code}")
+
+    async def _retry_wait(self, attempt: int, error: _RetryableError) -> None:
+        if attempt >= self.max_retries:
+            logger.error(f"调用模型服务失败（已重试 {self.max_retries} 次）: {str(error)}")
+            raise ChatBackendError("模型服务暂不可用")
+        metrics.inc("llm.retries")
+        await asyncio.sleep(self._delay(attempt, error.retry_after))
+
+    async def complete(self, model: str, messages: List[Dict[str, str]]) -> str:
+        """非流式生成，返回完整回复"""
+        payload = {"model": model, "messages": messages}
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._slot(self.client.base_url.host):
+                    response = await self._open(payload, stream=False)
+                break
+            except _RetryableError as e:
+                await self._retry_wait(attempt, e)
+        try:
+            content = response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            metrics.inc("llm.errors")
+            raise ChatBackendError(f"无法解析模型服务响应: {str(e)}")
+        metrics.observe("llm.complete", time.perf_counter() - started)
+        return content or ""
+
+    async def stream(self, model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        流式生成，逐段返回增量文本
+
+        并发名额在整个流期间占用；关闭生成器即中止上游请求。
+        """
+        payload = {"model": model, "messages": messages, "stream": True}
+        for attempt in range(self.max_retries + 1):
+            async with self._slot(self.client.base_url.host):
+                try:
+                    response = await self._open(payload, stream=True)
+                except _RetryableError as e:
+                    error = e
+                else:
+                    try:
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                # 不提前退出：读完响应体（之后只剩结尾），连接才能放回连接池复用
+                                continue
+                            try:
+                                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                            except (ValueError, KeyError, IndexError, TypeError) as e:
+                                raise ChatBackendError(f"无法解析模型服务响应: {str(e)}")
+                            if delta:
+                                yield delta
+                    except httpx.TransportError as e:
+                        # 已输出部分内容，不能重试
+                        self.breaker.record_failure()
+                        metrics.inc("llm.errors")
+                        logger.error(f"模型服务流式响应中断: {str(e)}")
+                        raise ChatBackendError("模型服务响应中断")
+                    finally:
+                        await response.aclose()
+                    return
+            await self._retry_wait(attempt, error)
+
+# 全局模型服务客户端
+llm_client = LLMClient(
+    settings.OPENAI_API_BASE,
+    settings.OPENAI_API_KEY,
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    max_keepalive=settings.LLM_MAX_KEEPALIVE,
+    keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+    read_timeout=settings.LLM_READ_TIMEOUT,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY_PER_HOST,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_ms=settings.LLM_RETRY_BACKOFF_MS,
+    max_backoff_ms=settings.LLM_RETRY_MAX_BACKOFF_MS,
+    breaker_failures=settings.LLM_BREAKER_FAILURES,
+    breaker_reset=settings.LLM_BREAKER_RESET_SECONDS
+)
+
+async def _mock_stream(messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """模拟模型逐字输出"""
+    delay = settings.CHAT_MOCK_TOKEN_DELAY_MS / 1000
+    for char in mock_reply(messages[-1]["content"]):
+        if delay:
+            await asyncio.sleep(delay)
+        yield char
+
+async def _caching_stream(model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """转发上游输出，完整结束后写入缓存（中途关闭的不缓存）"""
+    parts: List[str] = []
+    async with aclosing(llm_client.stream(model, messages)) as deltas:
+        async for delta in deltas:
+            parts.append(delta)
+            yield delta
+    completion_cache.set(model, messages, "".join(parts))
+
+async def _cached_stream(reply: str) -> AsyncIterator[str]:
+    yield reply
+
+async def complete_chat(model: str, messages: List[Dict[str, str]]) -> str:
+    """生成完整回复（优先使用缓存），未配置模型服务时返回模拟回复"""
+    if not backend_enabled():
+        return mock_reply(messages[-1]["content"])
+    reply = completion_cache.get(model, messages)
+    if reply is None:
+        reply = await llm_client.complete(model, messages)
+        completion_cache.set(model, messages, reply)
+    return reply
+
+def stream_chat(model: str, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """
+    流式生成回复，未配置模型服务时模拟逐字输出
+
+    调用方停止迭代（如客户端断开）时关闭该生成器即可中止上游请求。命中缓存时一次返回完整回复。
+    """
+    if not backend_enabled():
+        return _mock_stream(messages)
+    reply = completion_cache.get(model, messages)
+    if reply is not None:
+        return _cached_stream(reply)
+    return _caching_stream(model, messages)
@@ -0,0 +1,111 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, String, and_, literal, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+Cursor = Tuple[Optional[datetime], int]
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+def encode_cursor(value: Optional[datetime], row_id: int) -> str:
+    """把排序键 (时间, id) 编码为不透明游标"""
+    data = json.dumps([value.isoformat() if value is not None else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).rstrip(b"=").decode()
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (datetime.fromisoformat(value) if value is not None else None, int(row_id))
+    except (ValueError, TypeError):
+        raise InvalidCursor("分页游标无效")
+
+def page_cursor(cursor: Optional[str] = None) -> Optional[Cursor]:
+    """查询参数 cursor 的依赖项，无效时返回400"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _bind_value(db: AsyncSession, value: datetime) -> Any:
+    # SQLite 以文本保存时间：server_default 写入的值没有微秒部分，而绑定参数总会带上 ".000000"，
+    # 直接比较会把同一时刻判为不等。这里按读出的值还原成存储时的文本格式再比较。
+    if db.bind.dialect.name != "sqlite":
+        return value
+    text = value.strftime("%Y-%m-%d %H:%M:%S")
+    if value.microsecond:
+        text += f".{value.microsecond:06d}"
+    return literal(text, String)
+
+def apply_keyset(
+    db: AsyncSession,
+    query: Select,
+    column: Any,
+    id_column: Any,
+    cursor: Optional[Cursor],
+    descending: bool = False,
+    nullable: bool = False
+) -> Select:
+    """
+    按 (column, id) 排序，并从游标之后开始取
+
+    nullable 为 True 时空值始终排在最后（与方向无关，各数据库一致），游标落在空值区时只按 id 继续；
+    该排序键无法由索引提供，不可能为空的列应保持默认值。
+    """
+    order = [
+        column.desc() if descending else column.asc(),
+        id_column.desc() if descending else id_column.asc()
+    ]
+    if nullable:
+        order.insert(0, column.is_(None))
+    query = query.order_by(*order)
+    if cursor is None:
+        return query
+
+    value, row_id = cursor
+    after_id = id_column < row_id if descending else id_column > row_id
+    if value is None:
+        return query.where(column.is_(None), after_id)
+
+    value = _bind_value(db, value)
+    conditions = [
+        column < value if descending else column > value,
+        and_(column == value, after_id)
+    ]
+    if nullable:
+        conditions.append(column.is_(None))
+    return query.where(or_(*conditions))
+
+async def fetch_page(
+    db: AsyncSession,
+    query: Select,
+    column: Any,
+    id_column: Any,
+    cursor: Optional[Cursor] = None,
+    limit: int = 100,
+    skip: int = 0,
+    descending: bool = False,
+    nullable: bool = False
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    取一页记录，返回 (记录, next_cursor)
+
+    传入游标时按键集定位并忽略 skip；否则沿用 offset 分页。两种方式都会在还有下一页时返回 next_cursor。
+    """
+    query = apply_keyset(db, query, column, id_column, cursor, descending, nullable)
+    if cursor is None and skip:
+        query = query.offset(skip)
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+
+    next_cursor = None
+    if limit > 0 and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, column.key), last.id)
+    return rows, next_cursor
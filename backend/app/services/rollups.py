@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import async_engine
+from ..models.dashboard import DashboardStats, ActivitySketch, UserActivity
+from ..models.tool import ToolUsage
+from .hyperloglog import HyperLogLog, precision_for_error
+
+logger = logging.getLogger(__name__)
+
+# 汇总类型
+STAT_VISITS = "visits"  # 每日登录次数
+STAT_ACTIVE_USERS = "active_users"  # 每日活跃用户数（由当天草图计数）
+STAT_ACTIVITY = "activity"  # 每日各类活动次数，dimension 为活动类型
+STAT_TOOL_USAGE = "tool_usage"  # 每日各工具使用次数，dimension 为工具ID
+STAT_WATERMARK = "rollup_watermark"  # 已汇总到的源表最大ID，dimension 为汇总目标（源表名或草图表名）
+
+WATERMARK_DATE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_compact_lock: Optional[asyncio.Lock] = None
+
+def to_day(value: Any) -> datetime:
+    """将 date()/日期字符串转换为当天UTC零点"""
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+def day_start(days_ago: int = 0) -> datetime:
+    """若干天前的UTC零点"""
+    return to_day(datetime.now(timezone.utc)) - timedelta(days=days_ago)
+
+async def upsert_stats(connection: AsyncConnection, rows: List[Dict[str, Any]], additive: bool) -> None:
+    """
+    写入汇总行：additive 为 True 时累加到已有值，否则覆盖
+
+    SQLite 和 PostgreSQL 使用 INSERT ... ON CONFLICT，其他数据库逐行更新或插入。
+    """
+    if not rows:
+        return
+    table = DashboardStats.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        value = table.c.stat_value + stmt.excluded.stat_value if additive else stmt.excluded.stat_value
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["stat_type", "stat_date", "dimension"],
+            set_={"stat_value": value}
+        )
+        await connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        value = table.c.stat_value + row["stat_value"] if additive else row["stat_value"]
+        result = await connection.execute(
+            update(table).where(
+                table.c.stat_type == row["stat_type"],
+                table.c.stat_date == row["stat_date"],
+                table.c.dimension == row["dimension"]
+            ).values(stat_value=value)
+        )
+        if not result.rowcount:
+            await connection.execute(table.insert(), [row])
+
+def stat_row(stat_type: str, stat_date: datetime, value: int, dimension: str = "") -> Dict[str, Any]:
+    return {"stat_type": stat_type, "stat_date": stat_date, "dimension": dimension, "stat_value": value}
+
+async def get_watermark(connection: AsyncConnection, source: str) -> int:
+    value = await connection.scalar(
+        select(DashboardStats.stat_value).where(
+            DashboardStats.stat_type == STAT_WATERMARK,
+            DashboardStats.dimension == source
+        )
+    )
+    return value or 0
+
+async def _compact_activities(connection: AsyncConnection, batch_size: int) -> int:
+    """汇总新增的用户活动，返回处理的行数"""
+    watermark = await get_watermark(connection, UserActivity.__tablename__)
+    high = await connection.scalar(select(func.max(UserActivity.id)))
+    if not high or high <= watermark:
+        return 0
+    high = min(high, watermark + batch_size)
+
+    activity_day = func.date(UserActivity.created_at)
+    counts = (await connection.execute(
+        select(activity_day, UserActivity.activity_type, func.count()).where(
+            UserActivity.id > watermark,
+            UserActivity.id <= high
+        ).group_by(activity_day, UserActivity.activity_type)
+    )).all()
+
+    rows = []
+    for day, activity_type, count in counts:
+        day = to_day(day)
+        rows.append(stat_row(STAT_ACTIVITY, day, count, activity_type))
+        if activity_type == "login":
+            rows.append(stat_row(STAT_VISITS, day, count))
+    await upsert_stats(connection, rows, additive=True)
+    await upsert_stats(connection, [stat_row(STAT_WATERMARK, WATERMARK_DATE, high, UserActivity.__tablename__)], additive=False)
+    return high - watermark
+
+def new_sketch() -> HyperLogLog:
+    return HyperLogLog(
+        precision_for_error(settings.ACTIVE_USERS_ERROR_RATE),
+        settings.ACTIVE_USERS_EXACT_THRESHOLD
+    )
+
+def load_sketch(data: bytes) -> HyperLogLog:
+    return HyperLogLog.from_bytes(data, settings.ACTIVE_USERS_EXACT_THRESHOLD)
+
+async def _compact_sketches(connection: AsyncConnection, batch_size: int) -> int:
+    """把新增活动的用户加入当天的草图，并以草图计数更新每日活跃用户数，返回处理的行数"""
+    source = ActivitySketch.__tablename__
+    watermark = await get_watermark(connection, source)
+    high = await connection.scalar(select(func.max(UserActivity.id)))
+    if not high or high <= watermark:
+        return 0
+    high = min(high, watermark + batch_size)
+
+    activity_day = func.date(UserActivity.created_at)
+    pairs = (await connection.execute(
+        select(activity_day, UserActivity.user_id).where(
+            UserActivity.id > watermark,
+            UserActivity.id <= high
+        ).distinct()
+    )).all()
+
+    users: Dict[datetime, List[int]] = {}
+    for day, user_id in pairs:
+        users.setdefault(to_day(day), []).append(user_id)
+
+    table = ActivitySketch.__table__
+    existing = {}
+    if users:
+        result = await connection.execute(
+            select(table.c.id, table.c.sketch_date, table.c.sketch).where(table.c.sketch_date.in_(list(users)))
+        )
+        existing = {to_day(row.sketch_date): row for row in result}
+
+    inserts, updates, active_rows = [], [], []
+    for day, user_ids in users.items():
+        row = existing.get(day)
+        sketch = load_sketch(row.sketch) if row is not None else new_sketch()
+        sketch.update(user_ids)
+        if row is not None:
+            updates.append({"sketch_id": row.id, "sketch": sketch.to_bytes()})
+        else:
+            inserts.append({"sketch_date": day, "sketch": sketch.to_bytes()})
+        active_rows.append(stat_row(STAT_ACTIVE_USERS, day, sketch.count()))
+
+    if inserts:
+        await connection.execute(table.insert(), inserts)
+    if updates:
+        await connection.execute(
+            table.update().where(table.c.id == bindparam("sketch_id")).values(
+                sketch=bindparam("sketch"), updated_at=func.now()
+            ),
+            updates
+        )
+    active_rows.append(stat_row(STAT_WATERMARK, WATERMARK_DATE, high, source))
+    await upsert_stats(connection, active_rows, additive=False)
+    return high - watermark
+
+async def merge_sketches(connection: Any, start: datetime, end: Optional[datetime] = None) -> HyperLogLog:
+    """合并 [start, end) 内每日草图，得到窗口内的去重用户草图（connection 可为会话或连接）"""
+    query = select(ActivitySketch.sketch).where(ActivitySketch.sketch_date >= start)
+    if end is not None:
+        query = query.where(ActivitySketch.sketch_date < end)
+    merged = new_sketch()
+    for data in (await connection.execute(query)).scalars():
+        merged.merge(load_sketch(data))
+    return merged
+
+async def _compact_tool_usage(connection: AsyncConnection, batch_size: int) -> int:
+    """汇总新增的工具使用记录，返回处理的行数"""
+    watermark = await get_watermark(connection, ToolUsage.__tablename__)
+    high = await connection.scalar(select(func.max(ToolUsage.id)))
+    if not high or high <= watermark:
+        return 0
+    high = min(high, watermark + batch_size)
+
+    usage_day = func.date(ToolUsage.created_at)
+    counts = (await connection.execute(
+        select(usage_day, ToolUsage.tool_id, func.count()).where(
+            ToolUsage.id > watermark,
+            ToolUsage.id <= high
+        ).group_by(usage_day, ToolUsage.tool_id)
+    )).all()
+
+    rows = [stat_row(STAT_TOOL_USAGE, to_day(day), count, str(tool_id)) for day, tool_id, count in counts]
+    await upsert_stats(connection, rows, additive=True)
+    await upsert_stats(connection, [stat_row(STAT_WATERMARK, WATERMARK_DATE, high, ToolUsage.__tablename__)], additive=False)
+    return high - watermark
+
+async def compact_rollups(batch_size: int = None) -> int:
+    """
+    将上次汇总之后新增的原始记录累加到 dashboard_stats
+
+    每批在一个事务中同时更新汇总值和水位，重复执行不会重复计数。返回处理的原始记录数。
+    """
+    global _compact_lock
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    if _compact_lock is None:
+        _compact_lock = asyncio.Lock()
+
+    total = 0
+    async with _compact_lock:
+        started = time.perf_counter()
+        while True:
+            async with async_engine.begin() as connection:
+                processed = await _compact_activities(connection, batch_size)
+                processed += await _compact_sketches(connection, batch_size)
+                processed += await _compact_tool_usage(connection, batch_size)
+            if not processed:
+                break
+            total += processed
+        if total:
+            metrics.inc("rollups.rows_compacted", total)
+            metrics.observe("rollups.compact", time.perf_counter() - started)
+    return total
+
+async def run_rollup_compactor(interval: int = None) -> None:
+    """后台定期汇总统计数据（启动时先补齐历史数据）"""
+    interval = interval or settings.ROLLUP_INTERVAL
+    while True:
+        try:
+            await compact_rollups()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"汇总统计数据失败: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,423 @@
+import logging
+from typing import List, Optional, Tuple, Iterable, Dict
+
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models import Tool, File, ChatSession, ChatMessage
+from .tokenizer import QueryTerm, tokenize, tokenize_query
+
+logger = logging.getLogger(__name__)
+
+# 索引的文档类型
+DOC_TOOL = "tool"
+DOC_FILE = "file"
+DOC_SESSION = "session"
+DOC_MESSAGE = "message"
+DOC_TYPES = (DOC_TOOL, DOC_FILE, DOC_SESSION, DOC_MESSAGE)
+
+# (文档ID, 所属用户ID, 标题, 正文)
+Document = Tuple[int, Optional[int], str, str]
+
+# 索引格式版本，分词规则变化时需要重建索引
+INDEX_FORMAT_VERSION = 2
+META_TABLE = "search_index_meta"
+
+def index_signature() -> str:
+    """当前分词配置的签名"""
+    return f"v{INDEX_FORMAT_VERSION};ngram={settings.SEARCH_CJK_NGRAM}"
+
+def tokenize_document(value: Optional[str]) -> str:
+    """生成写入索引的文本：分词结果以空格连接，中日韩文本以 n-gram 形式写入"""
+    return " ".join(tokenize(value)) if value else ""
+
+class SearchBackend:
+    """全文索引后端基类"""
+
+    def create_schema(self, connection: Connection) -> bool:
+        """创建索引结构，返回是否为新建"""
+        raise NotImplementedError
+
+    def drop_schema(self, connection: Connection) -> None:
+        """删除索引结构"""
+        raise NotImplementedError
+
+    def upsert(self, connection: Connection, doc_type: str, documents: List[Document]) -> None:
+        """写入或替换文档"""
+        raise NotImplementedError
+
+    def delete(self, connection: Connection, doc_type: str, doc_ids: List[int]) -> None:
+        """删除文档"""
+        raise NotImplementedError
+
+    def search(
+        self,
+        connection: Connection,
+        doc_type: str,
+        terms: List[QueryTerm],
+        owner_id: Optional[int],
+        limit: int,
+        title_only: bool = False
+    ) -> List[Tuple[int, float]]:
+        """检索文档，返回 (文档ID, 相关性分数)，分数越大越相关；各条件之间为 AND"""
+        raise NotImplementedError
+
+class SQLiteFTS5Backend(SearchBackend):
+    """SQLite FTS5 索引，每种文档一张虚拟表，rowid 即源表主键"""
+
+    # 标题权重高于正文，owner 列只用于过滤
+    BM25_WEIGHTS = "10.0, 1.0, 0.0"
+
+    def table(self, doc_type: str) -> str:
+        return f"search_fts_{doc_type}"
+
+    def create_schema(self, connection: Connection) -> bool:
+        created = False
+        for doc_type in DOC_TYPES:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": self.table(doc_type)}
+            ).first()
+            if not exists:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE {self.table(doc_type)} "
+                    "USING fts5(title, body, owner, tokenize = 'unicode61')"
+                ))
+                created = True
+        return created
+
+    def drop_schema(self, connection: Connection) -> None:
+        for doc_type in DOC_TYPES:
+            connection.execute(text(f"DROP TABLE IF EXISTS {self.table(doc_type)}"))
+
+    def upsert(self, connection: Connection, doc_type: str, documents: List[Document]) -> None:
+        if not documents:
+            return
+        self.delete(connection, doc_type, [doc[0] for doc in documents])
+        connection.execute(
+            text(
+                f"INSERT INTO {self.table(doc_type)} (rowid, title, body, owner) "
+                "VALUES (:doc_id, :title, :body, :owner)"
+            ),
+            [
+                {"doc_id": doc_id, "title": title, "body": body, "owner": owner_token(owner_id)}
+                for doc_id, owner_id, title, body in documents
+            ]
+        )
+
+    def delete(self, connection: Connection, doc_type: str, doc_ids: List[int]) -> None:
+        if not doc_ids:
+            return
+        connection.execute(
+            text(f"DELETE FROM {self.table(doc_type)} WHERE rowid = :doc_id"),
+            [{"doc_id": doc_id} for doc_id in doc_ids]
+        )
+
+    def build_match(self, terms: List[QueryTerm], owner_id: Optional[int], title_only: bool = False) -> str:
+        """构造 FTS5 MATCH 表达式"""
+        phrases = []
+        for term in terms:
+            # 短语内的 token 必须连续出现，即中日韩 n-gram 还原为原字符串
+            phrase = '"{}"'.format(" ".join(term.tokens).replace('"', '""'))
+            phrases.append(phrase + "*" if term.prefix else phrase)
+        columns = "{title}" if title_only else "{title body}"
+        expression = f"{columns}: ({' AND '.join(phrases)})"
+        if owner_id is not None:
+            expression = f'owner: "{owner_token(owner_id)}" AND {expression}'
+        return expression
+
+    def search(self, connection, doc_type, terms, owner_id, limit, title_only=False):
+        if not terms:
+            return []
+        rows = connection.execute(
+            text(
+                f"SELECT rowid, bm25({self.table(doc_type)}, {self.BM25_WEIGHTS}) AS rank "
+                f"FROM {self.table(doc_type)} WHERE {self.table(doc_type)} MATCH :match "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {"match": self.build_match(terms, owner_id, title_only), "limit": limit}
+        ).all()
+        # bm25() 越小越相关，取反使分数越大越相关
+        return [(row.rowid, -row.rank) for row in rows]
+
+class PostgresTSVectorBackend(SearchBackend):
+    """PostgreSQL tsvector 索引，所有文档共用一张表并建立 GIN 索引"""
+
+    TABLE = "search_documents"
+
+    def create_schema(self, connection: Connection) -> bool:
+        exists = connection.execute(
+            text("SELECT to_regclass(:name)"), {"name": self.TABLE}
+        ).scalar()
+        if exists:
+            return False
+        connection.execute(text(
+            f"""
+            CREATE TABLE {self.TABLE} (
+                doc_type VARCHAR(20) NOT NULL,
+                doc_id INTEGER NOT NULL,
+                owner_id INTEGER,
+                title TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL DEFAULT '',
+                tsv tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('simple', title), 'A') ||
+                    setweight(to_tsvector('simple', body), 'B')
+                ) STORED,
+                PRIMARY KEY (doc_type, doc_id)
+            )
+            """
+        ))
+        connection.execute(text(f"CREATE INDEX ix_{self.TABLE}_tsv ON {self.TABLE} USING GIN (tsv)"))
+        connection.execute(text(f"CREATE INDEX ix_{self.TABLE}_owner ON {self.TABLE} (doc_type, owner_id)"))
+        return True
+
+    def drop_schema(self, connection: Connection) -> None:
+        connection.execute(text(f"DROP TABLE IF EXISTS {self.TABLE}"))
+
+    def upsert(self, connection: Connection, doc_type: str, documents: List[Document]) -> None:
+        if not documents:
+            return
+        connection.execute(
+            text(
+                f"INSERT INTO {self.TABLE} (doc_type, doc_id, owner_id, title, body) "
+                "VALUES (:doc_type, :doc_id, :owner_id, :title, :body) "
+                "ON CONFLICT (doc_type, doc_id) DO UPDATE SET "
+                "owner_id = EXCLUDED.owner_id, title = EXCLUDED.title, body = EXCLUDED.body"
+            ),
+            [
+                {"doc_type": doc_type, "doc_id": doc_id, "owner_id": owner_id, "title": title, "body": body}
+                for doc_id, owner_id, title, body in documents
+            ]
+        )
+
+    def delete(self, connection: Connection, doc_type: str, doc_ids: List[int]) -> None:
+        if not doc_ids:
+            return
+        connection.execute(
+            text(f"DELETE FROM {self.TABLE} WHERE doc_type = :doc_type AND doc_id = :doc_id"),
+            [{"doc_type": doc_type, "doc_id": doc_id} for doc_id in doc_ids]
+        )
+
+    def build_tsquery(self, terms: List[QueryTerm], title_only: bool = False) -> str:
+        """构造 tsquery 表达式；短语使用 <-> 要求相邻，标题检索限定权重 A"""
+        weight = "A" if title_only else ""
+        clauses = []
+        for term in terms:
+            lexemes = ["'{}'".format(token.replace("'", "''").replace("\\", "")) for token in term.tokens]
+            if term.prefix:
+                clauses.append(f"{lexemes[0]}:*{weight}")
+            else:
+                suffix = f":{weight}" if weight else ""
+                clauses.append("(" + " <-> ".join(lexeme + suffix for lexeme in lexemes) + ")")
+        return " & ".join(clauses)
+
+    def search(self, connection, doc_type, terms, owner_id, limit, title_only=False):
+        if not terms:
+            return []
+        tsquery = self.build_tsquery(terms, title_only)
+        owner_filter = "AND owner_id = :owner_id" if owner_id is not None else ""
+        rows = connection.execute(
+            text(
+                f"SELECT doc_id, ts_rank_cd(tsv, query) AS rank "
+                f"FROM {self.TABLE}, to_tsquery('simple', :tsquery) AS query "
+                f"WHERE doc_type = :doc_type {owner_filter} AND tsv @@ query "
+                "ORDER BY rank DESC LIMIT :limit"
+            ),
+            {"tsquery": tsquery, "doc_type": doc_type, "owner_id": owner_id, "limit": limit}
+        ).all()
+        return [(row.doc_id, float(row.rank)) for row in rows]
+
+# 按数据库方言注册的后端
+SEARCH_BACKENDS: Dict[str, SearchBackend] = {
+    "sqlite": SQLiteFTS5Backend(),
+    "postgresql": PostgresTSVectorBackend(),
+}
+
+def get_search_backend(dialect_name: str) -> Optional[SearchBackend]:
+    """获取当前数据库对应的索引后端"""
+    return SEARCH_BACKENDS.get(dialect_name)
+
+def owner_token(owner_id: Optional[int]) -> str:
+    """用户ID在索引中的表示"""
+    return f"u{owner_id}" if owner_id is not None else ""
+
+# ---------- 文档构造 ----------
+
+def tool_document(tool: Tool) -> Optional[Document]:
+    """工具文档；未启用或未公开的工具不进入索引"""
+    if not tool.is_active or not tool.is_public:
+        return None
+    body = " ".join(filter(None, [tool.description, tool.category]))
+    return (tool.id, None, tokenize_document(tool.name), tokenize_document(body))
+
+def file_document(file: File) -> Optional[Document]:
+    """文件文档"""
+    return (file.id, file.user_id, tokenize_document(file.original_name), tokenize_document(file.file_type))
+
+def session_document(session: ChatSession) -> Optional[Document]:
+    """会话文档；软删除的会话不进入索引"""
+    if not session.is_active:
+        return None
+    return (session.id, session.user_id, tokenize_document(session.title), "")
+
+def message_document(message: ChatMessage, owner_id: Optional[int]) -> Optional[Document]:
+    """聊天消息文档"""
+    return (message.id, owner_id, "", tokenize_document(message.content))
+
+# ---------- 增量维护 ----------
+
+def _apply(connection: Connection, doc_type: str, doc_id: int, document: Optional[Document]) -> None:
+    backend = get_search_backend(connection.dialect.name)
+    if backend is None:
+        return
+    if document is None:
+        backend.delete(connection, doc_type, [doc_id])
+    else:
+        backend.upsert(connection, doc_type, [document])
+
+def _remove(connection: Connection, doc_type: str, doc_id: int) -> None:
+    backend = get_search_backend(connection.dialect.name)
+    if backend is not None:
+        backend.delete(connection, doc_type, [doc_id])
+
+@event.listens_for(Tool, "after_insert")
+@event.listens_for(Tool, "after_update")
+def _index_tool(mapper, connection, target):
+    _apply(connection, DOC_TOOL, target.id, tool_document(target))
+
+@event.listens_for(File, "after_insert")
+@event.listens_for(File, "after_update")
+def _index_file(mapper, connection, target):
+    _apply(connection, DOC_FILE, target.id, file_document(target))
+
+@event.listens_for(ChatSession, "after_insert")
+@event.listens_for(ChatSession, "after_update")
+def _index_session(mapper, connection, target):
+    _apply(connection, DOC_SESSION, target.id, session_document(target))
+
+@event.listens_for(ChatMessage, "after_insert")
+@event.listens_for(ChatMessage, "after_update")
+def _index_message(mapper, connection, target):
+    owner_id = connection.execute(
+        select(ChatSession.user_id).where(ChatSession.id == target.session_id)
+    ).scalar()
+    _apply(connection, DOC_MESSAGE, target.id, message_document(target, owner_id))
+
+@event.listens_for(Tool, "after_delete")
+def _unindex_tool(mapper, connection, target):
+    _remove(connection, DOC_TOOL, target.id)
+
+@event.listens_for(File, "after_delete")
+def _unindex_file(mapper, connection, target):
+    _remove(connection, DOC_FILE, target.id)
+
+@event.listens_for(ChatSession, "after_delete")
+def _unindex_session(mapper, connection, target):
+    _remove(connection, DOC_SESSION, target.id)
+
+@event.listens_for(ChatMessage, "after_delete")
+def _unindex_message(mapper, connection, target):
+    _remove(connection, DOC_MESSAGE, target.id)
+
+async def remove_documents(db: AsyncSession, doc_type: str, doc_ids: Iterable[int]) -> None:
+    """批量删除文档（用于绕过ORM事件的批量DELETE语句）"""
+    doc_ids = list(doc_ids)
+
+    def run(sync_session):
+        connection = sync_session.connection()
+        backend = get_search_backend(connection.dialect.name)
+        if backend is not None:
+            backend.delete(connection, doc_type, doc_ids)
+
+    await db.run_sync(run)
+
+# ---------- 构建与查询 ----------
+
+def rebuild_search_index(connection: Connection, batch_size: int = 1000) -> None:
+    """从源数据表全量重建索引"""
+    backend = get_search_backend(connection.dialect.name)
+    if backend is None:
+        return
+
+    def load(doc_type, statement, build):
+        batch = []
+        for row in connection.execute(statement.execution_options(yield_per=batch_size)):
+            document = build(row)
+            if document is not None:
+                batch.append(document)
+            if len(batch) >= batch_size:
+                backend.upsert(connection, doc_type, batch)
+                batch = []
+        backend.upsert(connection, doc_type, batch)
+
+    load(DOC_TOOL, select(Tool.id, Tool.name, Tool.description, Tool.category, Tool.is_active, Tool.is_public), tool_document)
+    load(DOC_FILE, select(File.id, File.user_id, File.original_name, File.file_type), file_document)
+    load(DOC_SESSION, select(ChatSession.id, ChatSession.user_id, ChatSession.title, ChatSession.is_active), session_document)
+    load(
+        DOC_MESSAGE,
+        select(ChatMessage.id, ChatMessage.content, ChatSession.user_id).join(
+            ChatSession, ChatMessage.session_id == ChatSession.id
+        ),
+        lambda row: message_document(row, row.user_id)
+    )
+
+def ensure_search_index(connection: Connection) -> None:
+    """创建索引结构，首次创建或分词配置变化时回填已有数据"""
+    backend = get_search_backend(connection.dialect.name)
+    if backend is None:
+        logger.warning(f"数据库 {connection.dialect.name} 暂不支持全文搜索索引")
+        return
+    
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {META_TABLE} (meta_key VARCHAR(50) PRIMARY KEY, meta_value VARCHAR(200))"
+    ))
+    stored = connection.execute(
+        text(f"SELECT meta_value FROM {META_TABLE} WHERE meta_key = 'signature'")
+    ).scalar()
+    signature = index_signature()
+    if stored is not None and stored != signature:
+        logger.info(f"分词配置已变化 ({stored} -> {signature})，重建全文搜索索引")
+        backend.drop_schema(connection)
+    
+    if backend.create_schema(connection) or stored != signature:
+        logger.info("正在构建全文搜索索引...")
+        rebuild_search_index(connection)
+        connection.execute(text(f"DELETE FROM {META_TABLE} WHERE meta_key = 'signature'"))
+        connection.execute(
+            text(f"INSERT INTO {META_TABLE} (meta_key, meta_value) VALUES ('signature', :signature)"),
+            {"signature": signature}
+        )
+
+async def search_documents(
+    db: AsyncSession,
+    doc_type: str,
+    query: str,
+    owner_id: Optional[int] = None,
+    limit: int = 20,
+    title_only: bool = False
+) -> Optional[List[Tuple[int, float]]]:
+    """检索文档，返回按相关性排序的 (文档ID, 分数)；不支持全文搜索时返回 None"""
+    terms = tokenize_query(query)
+
+    def run(sync_session):
+        connection = sync_session.connection()
+        backend = get_search_backend(connection.dialect.name)
+        if backend is None:
+            return None
+        return backend.search(connection, doc_type, terms, owner_id, limit, title_only)
+
+    return await db.run_sync(run)
+
+def normalize_scores(scores: List[float]) -> List[float]:
+    """
+    把一个结果集的 BM25/ts_rank 分数除以其中的最高分，映射到 0-1 区间
+
+    各类文档的索引统计（文档数、平均长度）不同，原始分数跨类型不可比较；
+    归一化后每类最相关的结果都是 1，合并时按各自的相对相关性排序。
+    """
+    top = max(scores, default=0.0)
+    if top <= 0:
+        return [0.0] * len(scores)
+    return [max(score, 0.0) / top for score in scores]
@@ -0,0 +1,211 @@
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from . import sentiment_lexicon as lexicon
+
+# 本模块在工具进程池中运行，只依赖 NumPy，不导入配置等应用状态。
+
+# 汉字（扩展A、常用、兼容汉字）
+CJK_CHARS = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+BOUNDARIES = ",.;:?!，。；：？！、…\n"
+EXCLAMATIONS = "!！"
+
+NEGATION_WINDOW = 3  # 否定词影响其后几个词
+NEGATION_SCALE = -0.75  # 被否定的情感词反转并减弱
+CONTRAST_BEFORE = 0.5  # 转折词之前的情感权重
+CONTRAST_AFTER = 1.5  # 转折词之后的情感权重
+EXCLAMATION_BOOST = 0.3  # 每个感叹号增加的情感强度，最多计 3 个
+NORMALIZATION = 15.0  # score = s / sqrt(s^2 + NORMALIZATION)
+LABEL_THRESHOLD = 0.05
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "sentiment_samples.json")
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """把词表编译为前缀树形式的正则，匹配时不必逐个尝试所有词，且总是取最长的词"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+class SentimentAnalyzer:
+    """
+    基于词典的中英文情感分析
+
+    文本切分为词（中文按词典最长匹配，其余汉字逐字；英文按整词）后映射为词表编号，整批文本的编号拼接为一个数组。
+    否定（其后 NEGATION_WINDOW 个词内、同一分句）、程度副词（紧邻的前一个词）、转折和感叹号的影响都以数组
+    运算求出，每个文本的得分由按文本编号加权的 bincount 汇总，相当于稀疏的词频矩阵乘以词典权重向量。
+    """
+
+    def __init__(
+        self,
+        words: Mapping[str, float],
+        negators: Iterable[str],
+        intensifiers: Mapping[str, float],
+        contrasts: Iterable[str]
+    ):
+        negators, contrasts = list(negators), list(contrasts)
+        vocabulary = ["", *dict.fromkeys([*words, *negators, *intensifiers, *contrasts, *BOUNDARIES])]
+        self.index = {token: i for i, token in enumerate(vocabulary)}
+        size = len(vocabulary)
+        self.weights = np.zeros(size)
+        self.amplifiers = np.ones(size)
+        self.negators = np.zeros(size, dtype=bool)
+        self.contrasts = np.zeros(size, dtype=bool)
+        self.boundaries = np.zeros(size, dtype=bool)
+        self.exclamations = np.zeros(size, dtype=bool)
+        for word, weight in words.items():
+            self.weights[self.index[word]] = weight
+        for word, amplifier in intensifiers.items():
+            self.amplifiers[self.index[word]] = amplifier
+        self.negators[[self.index[word] for word in negators]] = True
+        self.contrasts[[self.index[word] for word in contrasts]] = True
+        self.boundaries[[self.index[char] for char in BOUNDARIES]] = True
+        self.boundaries |= self.contrasts
+        self.exclamations[[self.index[char] for char in EXCLAMATIONS]] = True
+
+        cjk_terms = [token for token in vocabulary if token and re.match(f"[{CJK_CHARS}]", token)]
+        self.pattern = re.compile(
+            f"{_trie_pattern(cjk_terms)}|[a-z]+(?:'[a-z]+)?|[{CJK_CHARS}]|[{re.escape(BOUNDARIES)}]"
+        )
+
+    def encode(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """切分文本，返回 (所有词的编号, 每个文本的词数)；词表以外的词编号为 0"""
+        findall = self.pattern.findall
+        get = self.index.get
+        ids: List[int] = []
+        lengths = np.empty(len(texts), dtype=np.int64)
+        for i, text in enumerate(texts):
+            tokens = findall(text.lower())
+            ids.extend(map(get, tokens, repeat(0)))
+            lengths[i] = len(tokens)
+        return np.asarray(ids, dtype=np.int64), lengths
+
+    def score(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """批量计算情感得分，返回每个文本的 score（-1 ~ 1）、积极和消极强度"""
+        n = len(texts)
+        ids, lengths = self.encode(texts)
+        if not len(ids):
+            zeros = np.zeros(n)
+            return {"score": zeros, "positive": zeros, "negative": zeros}
+
+        position = np.arange(len(ids))
+        doc = np.repeat(np.arange(n), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        doc_start = np.repeat(offsets, lengths)
+
+        # 分句起点：文本开头或上一个分隔符
+        is_boundary = self.boundaries[ids]
+        clause_start = np.maximum.accumulate(np.where(is_boundary | (position == doc_start), position, 0))
+
+        # 否定：同一分句中前 NEGATION_WINDOW 个词内有否定词
+        last_negator = np.maximum.accumulate(np.where(self.negators[ids], position, -1))
+        previous_negator = np.concatenate(([-1], last_negator[:-1]))
+        negated = (previous_negator >= clause_start) & (position - previous_negator <= NEGATION_WINDOW)
+
+        # 程度副词：紧邻的前一个词（不跨分句）
+        amplifier = np.concatenate(([1.0], self.amplifiers[ids[:-1]]))
+        amplifier[position == clause_start] = 1.0
+
+        contribution = self.weights[ids] * amplifier * np.where(negated, NEGATION_SCALE, 1.0)
+
+        # 转折：最后一个转折词之前的内容减弱，之后的加强
+        contrast_position = np.where(self.contrasts[ids], position, -1)
+        nonempty = lengths > 0
+        last_contrast = np.full(n, -1)
+        last_contrast[nonempty] = np.maximum.reduceat(contrast_position, offsets[nonempty])
+        token_contrast = last_contrast[doc]
+        contribution *= np.where(
+            token_contrast >= doc_start,
+            np.where(position < token_contrast, CONTRAST_BEFORE, CONTRAST_AFTER),
+            1.0
+        )
+
+        total = np.bincount(doc, weights=contribution, minlength=n)
+        positive = np.bincount(doc, weights=np.maximum(contribution, 0.0), minlength=n)
+        negative = np.bincount(doc, weights=np.maximum(-contribution, 0.0), minlength=n)
+        exclamations = np.minimum(np.bincount(doc, weights=self.exclamations[ids], minlength=n), 3)
+        total += np.sign(total) * exclamations * EXCLAMATION_BOOST
+        return {
+            "score": total / np.sqrt(total ** 2 + NORMALIZATION),
+            "positive": positive,
+            "negative": negative,
+        }
+
+    def analyze(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """批量分析，返回每个文本的情感倾向（positive / negative / neutral）和得分"""
+        result = self.score(texts)
+        labels = np.where(
+            result["score"] >= LABEL_THRESHOLD, "positive",
+            np.where(result["score"] <= -LABEL_THRESHOLD, "negative", "neutral")
+        )
+        return [
+            {
+                "label": str(label),
+                "score": round(float(score), 4),
+                "positive": round(float(positive), 4),
+                "negative": round(float(negative), 4),
+            }
+            for label, score, positive, negative in zip(labels, result["score"], result["positive"], result["negative"])
+        ]
+
+@lru_cache(maxsize=None)
+def default_analyzer() -> SentimentAnalyzer:
+    """内置中英文词典的分析器（每个进程创建一次）"""
+    return SentimentAnalyzer(
+        {**lexicon.POSITIVE_ZH, **lexicon.NEGATIVE_ZH, **lexicon.POSITIVE_EN, **lexicon.NEGATIVE_EN},
+        [*lexicon.NEGATORS_ZH, *lexicon.NEGATORS_EN],
+        {**lexicon.INTENSIFIERS_ZH, **lexicon.INTENSIFIERS_EN},
+        [*lexicon.CONTRASTS_ZH, *lexicon.CONTRASTS_EN]
+    )
+
+def load_samples(path: str = SAMPLES_PATH) -> List[Dict[str, str]]:
+    """内置的标注样本：[{"text", "label", "lang"}]"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def evaluate(analyzer: SentimentAnalyzer, samples: List[Dict[str, str]], repeat_to: int = 20000) -> Dict[str, Any]:
+    """在标注样本上计算准确率（总体和分语言），并把样本重复到 repeat_to 条测量单核吞吐量"""
+    predicted = [item["label"] for item in analyzer.analyze([sample["text"] for sample in samples])]
+    correct = np.array([p == sample["label"] for p, sample in zip(predicted, samples)])
+    by_lang = {}
+    for lang in sorted({sample["lang"] for sample in samples}):
+        mask = np.array([sample["lang"] == lang for sample in samples])
+        by_lang[lang] = round(float(correct[mask].mean()), 4)
+
+    texts = [sample["text"] for sample in samples] * max(repeat_to // len(samples), 1)
+    started = time.perf_counter()
+    analyzer.analyze(texts)
+    elapsed = time.perf_counter() - started
+    return {
+        "samples": len(samples),
+        "accuracy": round(float(correct.mean()), 4),
+        "accuracy_by_lang": by_lang,
+        "errors": [
+            {"text": sample["text"], "label": sample["label"], "predicted": p}
+            for p, sample in zip(predicted, samples) if p != sample["label"]
+        ],
+        "benchmark_texts": len(texts),
+        "texts_per_second": round(len(texts) / elapsed),
+    }
+
+if __name__ == "__main__":
+    # 准确率和吞吐量检查：python -m app.services.sentiment
+    print(json.dumps(evaluate(default_analyzer(), load_samples()), ensure_ascii=False, indent=2))
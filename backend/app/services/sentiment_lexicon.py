@@ -0,0 +1,113 @@
+# 情感分析词典：词 -> 情感强度（正为积极，负为消极，约 -4 ~ 4）
+# 中文词在文本中按最长匹配查找，英文按整词（小写）匹配。
+
+POSITIVE_ZH = {
+    # 强烈
+    "完美": 3.5, "太棒了": 3.5, "超赞": 3.5, "极好": 3.5, "绝佳": 3.5, "惊艳": 3.2, "震撼": 2.8,
+    "卓越": 3.0, "杰出": 3.0, "一流": 3.0, "顶级": 3.0, "出色": 3.0, "优秀": 3.0, "精彩": 3.0,
+    "热爱": 3.2, "喜爱": 3.0, "最爱": 3.2, "爱死": 3.5, "五星": 3.0, "好评": 2.8, "强烈推荐": 3.5,
+    "物超所值": 3.2, "超值": 3.0, "赞不绝口": 3.5, "无可挑剔": 3.5, "非常满意": 3.5, "十分满意": 3.5,
+    "幸福": 3.0, "开心": 2.8, "高兴": 2.8, "快乐": 2.8, "愉快": 2.6, "兴奋": 2.6, "激动": 2.2,
+    "感动": 2.6, "感谢": 2.4, "谢谢": 2.0, "感激": 2.6, "惊喜": 3.0,
+    # 一般
+    "好": 2.0, "不错": 2.2, "很好": 2.8, "挺好": 2.4, "好用": 2.6, "好吃": 2.6, "好看": 2.4,
+    "好听": 2.4, "好评如潮": 3.5, "满意": 2.6, "喜欢": 2.6, "推荐": 2.0, "值得": 2.0, "划算": 2.2,
+    "实惠": 2.0, "便宜": 1.2, "赞": 2.6, "棒": 2.8, "厉害": 2.4, "牛": 2.2, "给力": 2.6, "靠谱": 2.4,
+    "漂亮": 2.4, "美丽": 2.4, "美味": 2.6, "可口": 2.4, "新鲜": 1.8, "舒服": 2.4, "舒适": 2.4,
+    "方便": 2.0, "便捷": 2.0, "快捷": 1.8, "流畅": 2.2, "顺畅": 2.0, "稳定": 1.8, "清晰": 1.8,
+    "耐用": 2.0, "结实": 1.8, "精致": 2.4, "专业": 2.0, "高效": 2.2, "及时": 1.8, "迅速": 1.8,
+    "热情": 2.2, "耐心": 2.2, "周到": 2.4, "细心": 2.2, "友好": 2.2, "礼貌": 1.8, "贴心": 2.6,
+    "放心": 2.2, "安心": 2.2, "省心": 2.4, "轻松": 1.8, "温馨": 2.2, "干净": 2.0, "整洁": 2.0,
+    "成功": 2.2, "进步": 1.8, "优质": 2.6, "好玩": 2.4, "有趣": 2.2, "实用": 2.0, "优惠": 1.8,
+    "支持": 1.6, "期待": 1.4, "希望": 1.0, "认可": 2.0, "信赖": 2.4, "信任": 2.0, "值": 1.8,
+    "正品": 1.8, "没问题": 1.8, "无可厚非": 0.8, "满分": 3.2, "好极了": 3.5, "真香": 2.6,
+    "顺利": 2.0, "收获": 1.8, "清楚": 1.4, "合适": 1.6, "合身": 1.8, "喜出望外": 3.2, "心满意足": 3.0, "称心": 2.6,
+}
+
+NEGATIVE_ZH = {
+    # 强烈
+    "垃圾": -3.5, "恶心": -3.2, "差劲": -3.0, "糟糕": -3.0, "糟透": -3.5, "极差": -3.5, "太差": -3.2,
+    "坑爹": -3.2, "骗子": -3.5, "欺骗": -3.2, "诈骗": -3.5, "上当": -3.0, "愤怒": -3.0, "气愤": -3.0,
+    "讨厌": -2.8, "厌恶": -3.0, "痛恨": -3.5, "后悔": -2.8, "绝望": -3.2, "崩溃": -3.0, "痛苦": -3.0,
+    "差评": -3.0, "一星": -2.8, "假货": -3.2, "劣质": -3.2, "坑人": -3.2, "无语": -2.2, "气死": -3.2,
+    "非常失望": -3.5, "太失望": -3.5, "再也不": -2.6, "千万别": -3.0, "千万不要": -3.0, "退货": -2.2,
+    "投诉": -2.6, "可恶": -3.0, "恐怖": -2.6, "可怕": -2.6, "悲伤": -2.6, "伤心": -2.6, "难过": -2.6,
+    # 一般
+    "差": -2.4, "不好": -2.4, "不行": -2.2, "失望": -2.8, "不满": -2.6, "不满意": -2.8, "难用": -2.6,
+    "难吃": -2.8, "难看": -2.4, "难听": -2.4, "难受": -2.4, "生气": -2.6, "郁闷": -2.2, "烦": -2.0,
+    "烦人": -2.4, "麻烦": -1.8, "贵": -1.4, "太贵": -2.2, "慢": -1.6, "太慢": -2.4, "卡": -1.6,
+    "卡顿": -2.4, "死机": -2.8, "闪退": -2.8, "故障": -2.4, "毛病": -2.0, "问题": -1.2, "缺陷": -2.2,
+    "破": -1.8, "破损": -2.4, "坏": -2.2, "坏了": -2.4, "损坏": -2.4, "脏": -2.2, "臭": -2.4,
+    "吵": -1.8, "粗糙": -2.2, "敷衍": -2.6, "冷漠": -2.4, "态度差": -3.0, "不耐烦": -2.4,
+    "不靠谱": -2.6, "不值": -2.4, "浪费": -2.4, "无聊": -2.0, "乏味": -2.0, "失败": -2.4, "错误": -1.8,
+    "担心": -1.6, "担忧": -1.6, "害怕": -2.2, "焦虑": -2.2, "委屈": -2.2, "遗憾": -2.0, "可惜": -1.8,
+    "不舒服": -2.4, "不方便": -2.0, "不稳定": -2.2, "不清楚": -1.4, "模糊": -1.6, "延迟": -1.6,
+    "拖延": -2.0, "迟到": -1.6, "缺货": -1.6, "少发": -2.4, "漏发": -2.4, "发错": -2.4, "不推荐": -2.8,
+    "别买": -3.0, "不值得": -2.6, "坑": -2.4, "忽悠": -2.8, "虚假": -2.8, "夸大": -2.2, "欠": -1.2,
+    "不给力": -2.4, "辣鸡": -3.2, "一般般": -0.8, "凑合": -0.6, "还行": 0.8, "一般": -0.4,
+}
+
+POSITIVE_EN = {
+    "amazing": 3.2, "awesome": 3.2, "excellent": 3.2, "fantastic": 3.2, "outstanding": 3.2,
+    "perfect": 3.2, "perfectly": 3.0, "superb": 3.2, "wonderful": 3.0, "brilliant": 3.0, "incredible": 3.0, "love": 3.0,
+    "loved": 3.0, "loves": 3.0, "lovely": 2.6, "great": 2.8, "delightful": 2.8, "impressive": 2.6,
+    "good": 2.0, "nice": 1.8, "fine": 1.0, "okay": 0.6, "ok": 0.6, "decent": 1.2, "solid": 1.6,
+    "like": 1.4, "liked": 1.6, "likes": 1.4, "enjoy": 2.2, "enjoyed": 2.2, "enjoyable": 2.2,
+    "happy": 2.6, "glad": 2.2, "pleased": 2.4, "satisfied": 2.4, "satisfying": 2.2, "thrilled": 3.0,
+    "excited": 2.4, "exciting": 2.4, "fun": 2.2, "beautiful": 2.6, "pretty": 1.6, "gorgeous": 3.0,
+    "recommend": 2.2, "recommended": 2.2, "worth": 1.8, "worthwhile": 2.0, "valuable": 2.0,
+    "useful": 2.0, "helpful": 2.2, "reliable": 2.2, "fast": 1.6, "quick": 1.4, "smooth": 1.8,
+    "easy": 1.6, "convenient": 1.8, "comfortable": 2.0, "clean": 1.6, "fresh": 1.4, "tasty": 2.4,
+    "delicious": 2.8, "friendly": 2.2, "polite": 1.8, "professional": 1.8, "efficient": 2.0,
+    "best": 3.0, "better": 1.6, "favorite": 2.4, "favourite": 2.4, "thanks": 1.8, "thank": 1.8,
+    "grateful": 2.4, "appreciate": 2.2, "appreciated": 2.2, "win": 2.0, "success": 2.2,
+    "successful": 2.2, "flawless": 3.2, "stunning": 3.0, "superior": 2.4, "terrific": 3.0,
+    "positive": 1.8, "pleasant": 2.2, "cool": 1.6, "wow": 2.2, "bargain": 1.8, "affordable": 1.6,
+    "sturdy": 1.8, "durable": 1.8, "intuitive": 1.8, "charming": 2.2, "cheerful": 2.2, "joy": 2.8,
+}
+
+NEGATIVE_EN = {
+    "terrible": -3.2, "horrible": -3.2, "awful": -3.2, "worst": -3.4, "disgusting": -3.2,
+    "hate": -3.0, "hated": -3.0, "hates": -3.0, "useless": -2.8, "garbage": -3.0, "trash": -3.0,
+    "scam": -3.4, "fraud": -3.4, "fake": -2.6, "broken": -2.6, "broke": -2.2, "defective": -2.8,
+    "bad": -2.4, "poor": -2.2, "poorly": -2.2, "worse": -2.4, "disappointed": -2.6,
+    "disappointing": -2.6, "disappointment": -2.6, "annoying": -2.2, "annoyed": -2.2, "angry": -2.6,
+    "upset": -2.2, "sad": -2.2, "unhappy": -2.4, "frustrated": -2.4, "frustrating": -2.4,
+    "slow": -1.6, "expensive": -1.4, "overpriced": -2.4, "boring": -2.0, "dull": -1.8, "ugly": -2.4,
+    "dirty": -2.2, "rude": -2.6, "unhelpful": -2.2, "unreliable": -2.4, "crash": -2.4,
+    "crashes": -2.4, "crashed": -2.4, "bug": -1.6, "buggy": -2.2, "bugs": -1.6, "problem": -1.4,
+    "problems": -1.4, "issue": -1.0, "issues": -1.0, "fail": -2.2, "failed": -2.2, "fails": -2.2,
+    "failure": -2.4, "waste": -2.4, "wasted": -2.4, "refund": -1.6, "return": -0.6, "regret": -2.6,
+    "complain": -2.0, "complaint": -2.0, "mess": -2.0, "nightmare": -3.0, "pathetic": -3.0,
+    "ridiculous": -2.2, "lame": -2.0, "mediocre": -1.4, "meh": -1.0, "sucks": -2.8, "suck": -2.8,
+    "stupid": -2.4, "painful": -2.2, "hard": -0.8, "difficult": -1.2, "confusing": -1.6,
+    "late": -1.2, "delay": -1.4, "delayed": -1.6, "missing": -1.6, "damaged": -2.4, "cheap": -0.6,
+    "lousy": -2.6, "inferior": -2.2, "scary": -2.0, "afraid": -1.8, "worried": -1.8, "sorry": -1.0,
+    "unfortunately": -1.4, "avoid": -2.2, "misleading": -2.4, "noisy": -1.6,
+}
+
+# 否定词：使其后几个词内的情感词反转并减弱
+NEGATORS_ZH = ["不", "没", "没有", "无", "非", "别", "未", "不是", "并不", "从不", "从没", "毫不", "绝不", "不太", "不怎么", "不够"]
+NEGATORS_EN = [
+    "not", "no", "never", "none", "nothing", "neither", "nor", "without", "hardly", "barely",
+    "dont", "don't", "doesnt", "doesn't", "didnt", "didn't", "isnt", "isn't", "wasnt", "wasn't",
+    "arent", "aren't", "werent", "weren't", "cant", "can't", "cannot", "couldnt", "couldn't",
+    "wont", "won't", "wouldnt", "wouldn't", "shouldnt", "shouldn't", "aint", "ain't",
+]
+
+# 程度副词：放大（或减弱）紧随其后的情感词
+INTENSIFIERS_ZH = {
+    "很": 1.4, "非常": 1.7, "十分": 1.7, "特别": 1.7, "太": 1.6, "超": 1.6, "超级": 1.8, "极": 1.8,
+    "极其": 1.9, "相当": 1.5, "真": 1.4, "真的": 1.4, "挺": 1.3, "蛮": 1.3, "更": 1.3,
+    "最": 1.8, "巨": 1.7, "贼": 1.6, "有点": 0.7, "有些": 0.7, "稍微": 0.6, "略": 0.6, "比较": 0.9,
+}
+INTENSIFIERS_EN = {
+    "very": 1.5, "really": 1.4, "so": 1.4, "extremely": 1.9, "incredibly": 1.8, "super": 1.6,
+    "totally": 1.5, "absolutely": 1.7, "completely": 1.6, "highly": 1.6, "truly": 1.4, "too": 1.3,
+    "most": 1.5, "quite": 1.2, "fairly": 0.9, "somewhat": 0.7, "slightly": 0.6,
+    "kinda": 0.8, "little": 0.8, "bit": 0.8,
+}
+
+# 转折词：之后的内容比之前更能代表整体情感
+CONTRASTS_ZH = ["但", "但是", "可是", "不过", "然而", "只是"]
+CONTRASTS_EN = ["but", "however"]
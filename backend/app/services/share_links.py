@@ -0,0 +1,111 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from ..core.metrics import metrics
+
+# 分享链接签名密钥，由 SECRET_KEY 派生，与登录令牌的签名相互独立
+_signing_key = hmac.new(settings.SECRET_KEY.encode(), b"share-link", hashlib.sha256).digest()
+
+class InvalidShareToken(Exception):
+    """分享令牌无效、过期或已撤销"""
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _sign(body: str) -> str:
+    return _b64encode(hmac.new(_signing_key, body.encode(), hashlib.sha256).digest())
+
+class ShareDenylist:
+    """
+    已撤销的分享令牌（进程内）
+
+    按令牌ID或文件撤销；每条记录只保留到对应令牌过期为止，因此体积与有效期内的撤销数量成正比。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, float] = {}  # 令牌ID -> 记录过期时间
+        self._files: Dict[int, tuple] = {}  # 文件ID -> (撤销时间, 记录过期时间)
+
+    def revoke_token(self, token_id: str, expires_at: float) -> None:
+        """撤销单个令牌"""
+        with self._lock:
+            self._prune()
+            self._tokens[token_id] = expires_at
+
+    def revoke_file(self, file_id: int) -> None:
+        """撤销该文件此前签发的所有令牌"""
+        now = time.time()
+        with self._lock:
+            self._prune()
+            self._files[file_id] = (now, now + settings.SHARE_LINK_MAX_TTL)
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        with self._lock:
+            if payload["j"] in self._tokens:
+                return True
+            entry = self._files.get(payload["f"])
+            return entry is not None and payload["i"] <= entry[0]
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._tokens = {k: v for k, v in self._tokens.items() if v > now}
+        self._files = {k: v for k, v in self._files.items() if v[1] > now}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tokens) + len(self._files)
+
+# 全局撤销列表
+share_denylist = ShareDenylist()
+
+def create_share_token(file: Any, expires_in: Optional[int] = None) -> Dict[str, Any]:
+    """
+    签发分享令牌
+
+    令牌中带有内容哈希和下载所需的元数据，访问时按哈希定位存储的文件，不查询数据库，也不暴露存储路径。
+    旧版独立存储的文件（不在内容寻址存储中）没有哈希，访问时按文件ID读取记录。
+    """
+    expires_in = min(expires_in or settings.SHARE_LINK_TTL, settings.SHARE_LINK_MAX_TTL)
+    now = time.time()
+    payload = {
+        "f": file.id,
+        "h": file.content_hash if file.blob_id else None,
+        "n": file.original_name,
+        "m": file.mime_type,
+        "s": file.file_size,
+        "i": round(now, 3),
+        "e": int(now + expires_in),
+        "j": secrets.token_hex(8),
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode())
+    return {"token": f"{body}.{_sign(body)}", "payload": payload}
+
+def verify_share_token(token: str) -> Dict[str, Any]:
+    """校验签名、有效期和撤销状态，返回令牌内容"""
+    body, sep, signature = token.partition(".")
+    if not sep or not hmac.compare_digest(signature, _sign(body)):
+        metrics.inc("share.rejected")
+        raise InvalidShareToken("分享链接无效")
+    try:
+        payload = json.loads(_b64decode(body))
+    except ValueError:
+        metrics.inc("share.rejected")
+        raise InvalidShareToken("分享链接无效")
+    if payload["e"] <= time.time():
+        metrics.inc("share.expired")
+        raise InvalidShareToken("分享链接已过期")
+    if share_denylist.is_revoked(payload):
+        metrics.inc("share.revoked")
+        raise InvalidShareToken("分享链接已被取消")
+    return payload
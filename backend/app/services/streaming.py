@@ -0,0 +1,72 @@
+import asyncio
+import json
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Optional, TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+_END = object()
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # 关闭 Nginx 缓冲，事件到达即转发
+}
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """格式化一条 Server-Sent Event，data 以 JSON 发送"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+async def wait_for_disconnect(request: Request) -> None:
+    """请求体读完后阻塞到客户端断开"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def cancel_on_disconnect(request: Request, items: AsyncIterator[T]) -> AsyncIterator[T]:
+    """
+    转发 items，客户端断开时立即取消 items
+
+    items 在独立任务中迭代，由断开监听直接取消：不必等下一次写入失败才发现断开，也不依赖
+    响应对象关闭本生成器（写入失败后它可能只是被丢弃）。
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def produce() -> None:
+        try:
+            async with aclosing(items):
+                async for item in items:
+                    await queue.put((item, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put((_END, e))
+            return
+        await queue.put((_END, None))
+
+    producer = asyncio.create_task(produce())
+    watcher = asyncio.create_task(wait_for_disconnect(request))
+    watcher.add_done_callback(lambda _: producer.cancel())
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            await asyncio.wait({get, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if get.done():
+                item, error = get.result()
+            else:
+                get.cancel()
+                if queue.empty():
+                    return  # 已因客户端断开而取消
+                item, error = queue.get_nowait()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        watcher.cancel()
+        producer.cancel()
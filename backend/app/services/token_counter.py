@@ -0,0 +1,74 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from ..core.config import settings
+from .tokenizer import CJK_PATTERN
+
+try:
+    import tiktoken
+except ImportError:  # 可选依赖，未安装时按字符估算
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# 每条消息的角色、分隔符开销（OpenAI 聊天格式约 3~4 个 token）
+MESSAGE_OVERHEAD = 4
+
+# 各模型的上下文窗口（token），未列出的按 DEFAULT_CONTEXT_WINDOW
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "claude-3-sonnet": 200000,
+    "claude-3-opus": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+CJK_CHAR = re.compile(f"[{CJK_PATTERN}]")
+
+@lru_cache(maxsize=32)
+def _encoding(model: str):
+    """模型对应的 tiktoken 编码，不可用时返回 None"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # 编码表首次使用需要下载，离线环境下退回估算
+        logger.warning(f"无法加载 tiktoken 编码，改为估算 token 数: {str(e)}")
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """估算 token 数：中日韩字符每字约 1 个，其余约 4 个字符 1 个"""
+    cjk = len(CJK_CHAR.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """文本的 token 数"""
+    if not text:
+        return 0
+    encoding = _encoding(model or settings.DEFAULT_AI_MODEL)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def message_tokens(content: str, model: Optional[str] = None) -> int:
+    """一条消息占用的上下文 token 数（含格式开销）"""
+    return count_tokens(content, model) + MESSAGE_OVERHEAD
+
+def messages_tokens(messages: List[Dict[str, str]], model: Optional[str] = None) -> int:
+    return sum(message_tokens(m["content"], model) for m in messages)
+
+def context_budget(model: Optional[str] = None) -> int:
+    """可用于历史消息的 token 数：上下文窗口减去预留的回复长度，并受 CHAT_MAX_CONTEXT_TOKENS 限制"""
+    window = MODEL_CONTEXT_WINDOWS.get(model or settings.DEFAULT_AI_MODEL, DEFAULT_CONTEXT_WINDOW)
+    budget = window - settings.CHAT_REPLY_TOKENS
+    if settings.CHAT_MAX_CONTEXT_TOKENS > 0:
+        budget = min(budget, settings.CHAT_MAX_CONTEXT_TOKENS)
+    return max(budget, 0)
@@ -0,0 +1,61 @@
+import re
+from typing import List, NamedTuple
+
+from ..core.config import settings
+
+# 中日韩字符：汉字、日文假名、韩文
+CJK_PATTERN = (
+    "\u3040-\u30ff"  # 平假名、片假名
+    "\u3400-\u4dbf"  # 汉字扩展A
+    "\u4e00-\u9fff"  # 常用汉字
+    "\uac00-\ud7af"  # 韩文音节
+    "\uf900-\ufaff"  # 兼容汉字
+)
+
+# 连续的中日韩字符，或连续的拉丁字母/数字
+TOKEN_RUN = re.compile(f"[{CJK_PATTERN}]+|[^\\W{CJK_PATTERN}]+")
+CJK_RUN = re.compile(f"^[{CJK_PATTERN}]+$")
+
+class QueryTerm(NamedTuple):
+    """查询条件：tokens 需在索引中连续出现；prefix 为 True 时按前缀匹配单个 token"""
+    tokens: List[str]
+    prefix: bool
+
+def is_cjk(run: str) -> bool:
+    """判断是否为中日韩字符串"""
+    return bool(CJK_RUN.match(run))
+
+def split_runs(text: str) -> List[str]:
+    """将文本切分为中日韩字符串和拉丁单词，统一转为小写"""
+    return TOKEN_RUN.findall(text.lower()) if text else []
+
+def cjk_ngrams(run: str, n: int) -> List[str]:
+    """中日韩字符串的 n-gram 序列"""
+    if len(run) <= n:
+        return [run]
+    return [run[i:i + n] for i in range(len(run) - n + 1)]
+
+def tokenize(text: str, n: int = None) -> List[str]:
+    """文档分词：中日韩文本按字符 n-gram 切分，拉丁文本按单词切分"""
+    n = n or settings.SEARCH_CJK_NGRAM
+    tokens: List[str] = []
+    for run in split_runs(text):
+        if not is_cjk(run):
+            tokens.append(run)
+            continue
+        tokens.extend(cjk_ngrams(run, n))
+        # 追加末尾的短后缀，使短于 n 的查询在字符串末尾也能前缀命中
+        for size in range(min(n, len(run)) - 1, 0, -1):
+            tokens.append(run[-size:])
+    return tokens
+
+def tokenize_query(query: str, n: int = None) -> List[QueryTerm]:
+    """查询分词：长度不小于 n 的中日韩字符串生成连续 n-gram 短语，其余按前缀匹配"""
+    n = n or settings.SEARCH_CJK_NGRAM
+    terms: List[QueryTerm] = []
+    for run in split_runs(query):
+        if is_cjk(run) and len(run) >= n:
+            terms.append(QueryTerm(cjk_ngrams(run, n), False))
+        else:
+            terms.append(QueryTerm([run], True))
+    return terms
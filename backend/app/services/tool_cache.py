@@ -0,0 +1,68 @@
+import hashlib
+import json
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from ..core.cache import LRUTTLCache
+from ..core.config import settings
+
+# 缓存键：(工具ID, 配置版本, 输入哈希)
+ResultKey = Tuple[str, str, str]
+
+def _digest(data: Any) -> str:
+    """规范化 JSON（键排序、紧凑分隔符）的 SHA-256"""
+    text = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def config_version(config: Optional[Dict[str, Any]]) -> str:
+    """工具配置内容的哈希，配置修改后旧结果自然失效"""
+    return _digest(config or {})[:16]
+
+def result_key(
+    tool_id: str,
+    config: Optional[Dict[str, Any]],
+    input_data: Dict[str, Any],
+    file_hash: Optional[str] = None
+) -> Optional[ResultKey]:
+    """
+    工具结果的缓存键
+
+    输入引用文件时以文件内容的哈希代替 file_id，同一内容重新上传也能命中；文件没有内容哈希（旧数据）
+    时无法确认内容未变，返回 None 表示不缓存。
+    """
+    canonical = dict(input_data)
+    if canonical.get("file_id") is not None:
+        if not file_hash:
+            return None
+        del canonical["file_id"]
+        canonical["file_sha256"] = file_hash
+    return (tool_id, config_version(config), _digest(canonical))
+
+def result_ttl(config: Optional[Dict[str, Any]]) -> float:
+    """工具配置 cache_ttl（秒）覆盖默认缓存时间，0为不缓存"""
+    ttl = (config or {}).get("cache_ttl")
+    return float(settings.TOOL_CACHE_TTL if ttl is None else ttl)
+
+class ToolResultCache:
+    """工具结果缓存，按 LRU 淘汰，缓存时间可按工具配置"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self._entries = LRUTTLCache(max_size, ttl, name="tool_result")
+
+    def get(self, key: Optional[Hashable], config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if key is None or result_ttl(config) <= 0:
+            return None
+        return self._entries.get(key)
+
+    def set(self, key: Optional[Hashable], config: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        if key is None:
+            return
+        self._entries.set(key, result, result_ttl(config))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# 全局工具结果缓存
+tool_result_cache = ToolResultCache(settings.TOOL_CACHE_MAX_SIZE, settings.TOOL_CACHE_TTL)
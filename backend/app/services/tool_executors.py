@@ -0,0 +1,180 @@
+import csv
+import math
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from .sentiment import default_analyzer
+
+# 工具执行函数在后台任务的进程池中运行：参数和返回值必须可序列化，本模块也不应导入数据库、配置等应用状态。
+# 输入中的 file_id 由任务引擎在提交到进程池之前解析为 file_path（客户端传入的 file_path 等字段已丢弃）。
+ToolExecutor = Callable[[Dict[str, Any]], Any]
+# 批量执行函数：一次处理多个输入，返回每项的 (是否成功, 结果或错误信息)
+BatchExecutor = Callable[[List[Dict[str, Any]]], List[Tuple[bool, Any]]]
+
+EXECUTORS: Dict[str, ToolExecutor] = {}
+BATCH_EXECUTORS: Dict[str, BatchExecutor] = {}
+
+class ToolInputError(ValueError):
+    """工具输入无效"""
+
+def executor(tool_id: str) -> Callable[[ToolExecutor], ToolExecutor]:
+    """注册工具执行函数"""
+    def register(func: ToolExecutor) -> ToolExecutor:
+        EXECUTORS[tool_id] = func
+        return func
+    return register
+
+def batch_executor(tool_id: str) -> Callable[[BatchExecutor], BatchExecutor]:
+    """注册工具的批量执行函数（能整批处理时比逐项执行快）"""
+    def register(func: BatchExecutor) -> BatchExecutor:
+        BATCH_EXECUTORS[tool_id] = func
+        return func
+    return register
+
+def run_tool(tool_id: str, tool_name: str, input_data: Dict[str, Any]) -> Any:
+    """执行工具，没有专门实现的工具返回占位结果"""
+    func = EXECUTORS.get(tool_id)
+    if func is None:
+        return f"工具 {tool_name} 的处理结果"
+    return func(input_data)
+
+def run_tool_batch(tool_id: str, tool_name: str, inputs: List[Dict[str, Any]]) -> List[Tuple[bool, Any]]:
+    """
+    在一个工作进程中依次执行一批输入，返回每项的 (是否成功, 结果或错误信息)
+
+    单项失败不影响其他项；错误转为文本，避免异常对象跨进程序列化失败。
+    """
+    func = BATCH_EXECUTORS.get(tool_id)
+    if func is not None:
+        try:
+            return func(inputs)
+        except Exception:
+            pass  # 整批执行出错时改为逐项执行，只有出错的输入记为失败
+    results: List[Tuple[bool, Any]] = []
+    for input_data in inputs:
+        try:
+            results.append((True, run_tool(tool_id, tool_name, input_data)))
+        except ToolInputError as e:
+            results.append((False, str(e)))
+        except Exception as e:
+            results.append((False, f"{type(e).__name__}: {str(e)}"))
+    return results
+
+CSV_CHUNK_ROWS = 50000
+
+def _to_float(values: List[str]) -> np.ndarray:
+    """把一列文本转为浮点数，无法解析的记为 NaN"""
+    try:
+        return np.asarray(values, dtype=float)
+    except ValueError:
+        pass
+    try:
+        # 常见情况：数值列中有空值
+        return np.asarray([value if value.strip() else "nan" for value in values], dtype=float)
+    except ValueError:
+        pass
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            result[i] = float(value)
+        except ValueError:
+            pass
+    return result
+
+@executor("data-analysis")
+def analyze_csv(input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    CSV 数值列的描述统计
+
+    分块读取，内存占用与文件大小无关；每列统计非空数值的个数、均值、标准差、最小值和最大值。
+    """
+    path = input_data.get("file_path")
+    if not path or not os.path.exists(path):
+        raise ToolInputError("请通过 file_id 指定要分析的CSV文件")
+
+    with open(path, newline="", encoding=input_data.get("encoding", "utf-8"), errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            raise ToolInputError("文件为空或不是CSV格式")
+        width = len(header)
+        count = np.zeros(width)
+        total = np.zeros(width)
+        squares = np.zeros(width)
+        low = np.full(width, np.inf)
+        high = np.full(width, -np.inf)
+        rows = 0
+
+        while True:
+            chunk = [row for _, row in zip(range(CSV_CHUNK_ROWS), reader)]
+            if not chunk:
+                break
+            rows += len(chunk)
+            columns = list(zip(*(row if len(row) == width else (row + [""] * width)[:width] for row in chunk)))
+            values = np.stack([_to_float(column) for column in columns], axis=1)
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            count += present.sum(axis=0)
+            total += filled.sum(axis=0)
+            squares += (filled ** 2).sum(axis=0)
+            low = np.minimum(low, np.where(present, values, np.inf).min(axis=0))
+            high = np.maximum(high, np.where(present, values, -np.inf).max(axis=0))
+
+    columns = {}
+    for i, name in enumerate(header):
+        n = int(count[i])
+        if n == 0:
+            continue
+        mean = total[i] / n
+        variance = max(squares[i] / n - mean ** 2, 0.0) * n / (n - 1) if n > 1 else 0.0
+        columns[name] = {
+            "count": n,
+            "mean": round(float(mean), 6),
+            "std": round(math.sqrt(variance), 6),
+            "min": float(low[i]),
+            "max": float(high[i]),
+        }
+    return {"rows": rows, "columns": len(header), "numeric_columns": columns}
+
+SENTIMENT_MAX_TEXTS = 10000
+
+def _sentiment_texts(input_data: Dict[str, Any]) -> Tuple[List[str], bool]:
+    """情感分析的输入：text（单条）或 texts（多条），返回 (文本列表, 是否为单条)"""
+    if "texts" in input_data:
+        texts = input_data["texts"]
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise ToolInputError("texts 必须是字符串列表")
+        if len(texts) > SENTIMENT_MAX_TEXTS:
+            raise ToolInputError(f"一次最多分析 {SENTIMENT_MAX_TEXTS} 条文本")
+        return texts, False
+    text = input_data.get("text")
+    if not isinstance(text, str):
+        raise ToolInputError("请通过 text 提供要分析的文本")
+    return [text], True
+
+@executor("sentiment-analysis")
+def analyze_sentiment(input_data: Dict[str, Any]) -> Any:
+    """中英文文本的情感倾向（positive / negative / neutral）和得分"""
+    texts, single = _sentiment_texts(input_data)
+    results = default_analyzer().analyze(texts)
+    return results[0] if single else results
+
+@batch_executor("sentiment-analysis")
+def analyze_sentiment_batch(inputs: List[Dict[str, Any]]) -> List[Tuple[bool, Any]]:
+    """批量输入的文本合并为一次向量化计算"""
+    outcomes: List[Tuple[bool, Any]] = [(False, None)] * len(inputs)
+    parsed = []
+    for i, input_data in enumerate(inputs):
+        try:
+            parsed.append((i, *_sentiment_texts(input_data)))
+        except ToolInputError as e:
+            outcomes[i] = (False, str(e))
+    results = default_analyzer().analyze([text for _, texts, _ in parsed for text in texts])
+    offset = 0
+    for i, texts, single in parsed:
+        items = results[offset:offset + len(texts)]
+        offset += len(texts)
+        outcomes[i] = (True, items[0] if single else items)
+    return outcomes
@@ -1,14 +1,22 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
-import os
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
 from app.core.config import settings
-from app.db.database import init_db
+from app.core.metrics import metrics
+from app.core.security import password_executor
+from app.services.file_storage import MULTIPART_OVERHEAD, run_upload_sweeper
+from app.services.blob_store import refresh_storage_metrics
+from app.services.counters import counter_buffer
+from app.services.activity import activity_queue, request_info, RequestInfo
+from app.services.rollups import run_rollup_compactor, compact_rollups
+from app.services.llm import llm_client
+from app.services.jobs import job_engine
+from app.db.database import init_db, close_db
 from app.api import (
     auth_router,
     files_router,
@@ -46,6 +54,25 @@ async def lifespan(app: FastAPI):
         await init_default_data()
         logger.info("默认数据初始化完成")
         
+        # 统计去重存储指标
+        await refresh_storage_metrics()
+        
+        # 启动计数器和用户活动的批量写入任务
+        counter_buffer.start()
+        activity_queue.start()
+        
+        # 创建模型服务连接池
+        llm_client.start()
+        
+        # 启动工具后台任务调度（继续执行重启前未完成的任务）
+        job_engine.start()
+        
+        # 启动过期分块上传清理任务
+        upload_sweeper = asyncio.create_task(run_upload_sweeper())
+        
+        # 启动统计汇总任务
+        rollup_compactor = asyncio.create_task(run_rollup_compactor())
+        
         logger.info(f"服务启动成功，运行在 http://{settings.HOST}:{settings.PORT}")
         
         yield  # 应用运行中...
@@ -56,6 +83,19 @@ async def lifespan(app: FastAPI):
     
     # 关闭事件
     logger.info("正在关闭AI门户后端服务...")
+    for task in (upload_sweeper, rollup_compactor):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await job_engine.stop()
+    await counter_buffer.stop()
+    await activity_queue.stop()
+    await compact_rollups()
+    await llm_client.stop()
+    password_executor.shutdown(wait=False)
+    await close_db()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -68,6 +108,35 @@ app = FastAPI(
     lifespan=lifespan  # 使用新的生命周期管理
 )
 
+# 声明的请求体大小明显超限时，在读取请求体之前直接拒绝上传
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    content_length = request.headers.get("content-length", "")
+    if (
+        request.method in ("POST", "PUT")
+        and request.url.path.startswith("/api/v1/files/")
+        and content_length.isdigit()
+        and int(content_length) > settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    ):
+        return JSONResponse(
+            status_code=413,
+            content={
+                "success": False,
+                "message": f"文件大小超过限制 ({settings.MAX_FILE_SIZE // (1024*1024)}MB)",
+                "data": None
+            }
+        )
+    return await call_next(request)
+
+# 记录客户端IP和User-Agent，供活动日志使用
+@app.middleware("http")
+async def capture_request_info(request: Request, call_next):
+    request_info.set(RequestInfo(
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent")
+    ))
+    return await call_next(request)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -77,9 +146,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 挂载静态文件目录
-if os.path.exists(settings.UPLOAD_DIR):
-    app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+# 上传的文件不挂载为静态目录：下载一律经过鉴权的 /files/{id}/download 或签名分享链接，
+# 以免按内容哈希推算出的存储路径绕过权限、过期和撤销检查
 
 # 全局异常处理
 @app.exception_handler(HTTPException)
@@ -116,15 +184,15 @@ app.include_router(search_router, prefix="/api/v1")
 
 async def init_default_data():
     """初始化默认数据"""
-    from sqlalchemy.orm import Session
-    from app.db.database import SessionLocal
+    from sqlalchemy import select, func
+    from app.db.database import AsyncSessionLocal
     from app.models import Tool
     
-    db: Session = SessionLocal()
+    db = AsyncSessionLocal()
     
     try:
         # 检查是否已存在工具数据
-        existing_tools = db.query(Tool).count()
+        existing_tools = await db.scalar(select(func.count(Tool.id)))
         if existing_tools == 0:
             # 添加默认AI工具
             default_tools = [
@@ -181,14 +249,14 @@ async def init_default_data():
             for tool in default_tools:
                 db.add(tool)
             
-            db.commit()
+            await db.commit()
             logger.info(f"添加了 {len(default_tools)} 个默认AI工具")
     
     except Exception as e:
         logger.error(f"初始化默认数据失败: {str(e)}")
-        db.rollback()
+        await db.rollback()
     finally:
-        db.close()
+        await db.close()
 
 @app.get("/")
 async def root():
@@ -209,6 +277,11 @@ async def health_check():
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """运行指标"""
+    return metrics.snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     from datetime import datetime
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+import httpx
+import pytest
+
+# 测试使用独立的临时数据库和存储目录，必须在导入应用之前设置（配置在导入时读取）
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="ai-portal-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TEST_DIR}/test.db",
+    "UPLOAD_DIR": f"{TEST_DIR}/uploads",
+    "BLOB_DIR": f"{TEST_DIR}/blobs",
+    "UPLOAD_TEMP_DIR": f"{TEST_DIR}/uploads_tmp",
+    "LOG_FILE": f"{TEST_DIR}/logs/app.log",
+    "LOG_LEVEL": "WARNING",
+    "DEBUG": "false",
+    "OPENAI_API_KEY": "",
+    "MAX_FILE_SIZE": str(20 * 1024 * 1024),
+    "ALLOWED_FILE_TYPES": "txt,csv,pdf,bin",
+    "BCRYPT_ROUNDS": "4",
+    "CHAT_MOCK_TOKEN_DELAY_MS": "0",
+    "COUNTER_FLUSH_INTERVAL_MS": "100",
+    "ACTIVITY_FLUSH_INTERVAL_MS": "100",
+    "JOB_POLL_INTERVAL": "0.2",
+})
+sys.path.insert(0, BACKEND_DIR)
+
+# 基准测试的数据规模：BENCHMARK_SCALE=1 为请求中给出的完整规模，默认按 1% 运行以便随测试一起执行
+BENCHMARK_SCALE = float(os.getenv("BENCHMARK_SCALE", "0.01"))
+
+def bench_size(full: int, minimum: int = 1) -> int:
+    """按 BENCHMARK_SCALE 缩放基准测试的数据量"""
+    return max(int(full * BENCHMARK_SCALE), minimum)
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class LiveServer:
+    """在后台线程中用 uvicorn 运行应用（含 lifespan），测试通过真实的 HTTP 连接访问"""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.url = f"http://127.0.0.1:{port}"
+        # 客户端与服务在同一进程中，高并发时客户端可能隔几秒才复用连接，keep-alive 超时设长一些，
+        # 避免服务端关闭空闲连接与客户端发出请求同时发生
+        config = uvicorn.Config(
+            app, host="127.0.0.1", port=port, timeout_keep_alive=120, log_level=os.getenv("TEST_SERVER_LOG", "warning")
+        )
+        self.server = uvicorn.Server(config)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.server.serve(),), daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("测试服务启动失败")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(30)
+
+    def call(self, coroutine, timeout: float = 60):
+        """在服务的事件循环中执行协程（访问与应用共享事件循环的对象）"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+class FakeModelServer:
+    """
+    本地的 OpenAI 兼容模型服务（/v1/chat/completions），用于测试模型客户端和流式对话
+
+    tokens 按 token_delay 秒的间隔逐个输出；fail_next() 让之后的若干个请求返回错误状态码；
+    drop_after 不为 None 时流式输出该数量的 token 后断开连接。
+    记录收到的请求数、客户端连接、同时处理的请求数和被客户端中途断开的流。
+    """
+
+    def __init__(self):
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse, StreamingResponse
+        from starlette.routing import Route
+
+        self.tokens = ["你", "好", "，", "世", "界"]
+        self.token_delay = 0.0
+        self.drop_after: Optional[int] = None
+        self.failures = []  # [(状态码, Retry-After)]
+        self.requests = 0
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed_streams = 0
+        self.cancelled_streams = 0
+
+        async def completions(request):
+            self.requests += 1
+            self.connections.add(tuple(request.scope["client"]))
+            payload = await request.json()
+            if self.failures:
+                status_code, retry_after = self.failures.pop(0)
+                headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+                return JSONResponse({"error": {"message": "fake failure"}}, status_code=status_code, headers=headers)
+            if payload.get("stream"):
+                return StreamingResponse(self._stream(payload["model"]), media_type="text/event-stream")
+            self._enter()
+            try:
+                await asyncio.sleep(self.token_delay * len(self.tokens))
+            finally:
+                self.in_flight -= 1
+            return JSONResponse({"choices": [{"message": {"role": "assistant", "content": "".join(self.tokens)}}]})
+
+        self.live = LiveServer(Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])]), free_port())
+        self.url = f"{self.live.url}/v1"
+
+    def _enter(self) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    async def _stream(self, model: str):
+        self._enter()
+        try:
+            for index, token in enumerate(self.tokens):
+                if index == self.drop_after:
+                    raise ConnectionAbortedError("fake model dropped the connection")
+                await asyncio.sleep(self.token_delay)
+                chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": token}}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+            self.completed_streams += 1
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled_streams += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def fail_next(self, status_code: int, times: int = 1, retry_after: Optional[float] = None) -> None:
+        self.failures.extend([(status_code, retry_after)] * times)
+
+    def reset(self) -> None:
+        self.tokens = ["你", "好", "，", "世", "界"]
+        self.token_delay = 0.0
+        self.drop_after = None
+        self.failures = []
+        self.requests = self.in_flight = self.max_in_flight = 0
+        self.completed_streams = self.cancelled_streams = 0
+        self.connections = set()
+
+@pytest.fixture(scope="session")
+def fake_model_server():
+    fake = FakeModelServer()
+    fake.live.start()
+    yield fake
+    fake.live.stop()
+
+@pytest.fixture
+def fake_model(fake_model_server):
+    fake_model_server.reset()
+    return fake_model_server
+
+@pytest.fixture
+def small_pool(server):
+    """让服务使用只有一个连接、获取超时很短的连接池"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.core.config import settings
+    from app.db.database import AsyncSessionLocal, async_engine, get_async_database_url
+
+    engine = create_async_engine(get_async_database_url(settings.DATABASE_URL), pool_size=1, max_overflow=0, pool_timeout=3)
+    AsyncSessionLocal.configure(bind=engine)
+    yield engine
+    AsyncSessionLocal.configure(bind=async_engine)
+    server.call(engine.dispose())
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    """轮询直到 condition() 为真，超时返回 False"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+@pytest.fixture(scope="session")
+def server():
+    from main import app
+
+    live = LiveServer(app, free_port())
+    live.start()
+    yield live
+    live.stop()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def api_url(server) -> str:
+    return f"{server.url}/api/v1"
+
+@pytest.fixture
+def api(api_url):
+    with httpx.Client(base_url=api_url, timeout=60) as client:
+        yield client
+
+def register_user(api_url: str) -> Dict[str, str]:
+    """注册一个新用户并登录，返回认证请求头"""
+    name = f"u{uuid.uuid4().hex[:12]}"
+    with httpx.Client(base_url=api_url, timeout=60) as client:
+        response = client.post("/auth/register", json={"username": name, "email": f"{name}@example.com", "password": "secret1"})
+        assert response.status_code == 200, response.text
+        response = client.post("/auth/login", json={"username": name, "password": "secret1"})
+        assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+@pytest.fixture
+def auth_headers(api_url) -> Dict[str, str]:
+    return register_user(api_url)
+
+@pytest.fixture(scope="session")
+def sync_engine(server):
+    from app.db.database import engine
+
+    return engine
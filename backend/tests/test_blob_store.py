@@ -0,0 +1,47 @@
+import os
+import uuid
+
+from sqlalchemy import delete, select, text
+
+def upload(api, headers, content: bytes) -> dict:
+    response = api.post("/files/upload", files={"file": ("blob.txt", content, "text/plain")}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def blob_row(sync_engine, content_hash: str):
+    from app.models import Blob
+
+    with sync_engine.connect() as connection:
+        return connection.execute(select(Blob).where(Blob.content_hash == content_hash)).first()
+
+def test_shared_content_is_removed_with_the_last_reference(api, auth_headers, api_url, sync_engine):
+    from conftest import register_user
+
+    content = uuid.uuid4().hex.encode()
+    first = upload(api, auth_headers, content)
+    other_headers = register_user(api_url)
+    second = upload(api, other_headers, content)
+    assert first["file_path"] == second["file_path"]
+    assert blob_row(sync_engine, first["content_hash"]).ref_count == 2
+
+    assert api.delete(f"/files/{first['id']}", headers=auth_headers).status_code == 200
+    assert blob_row(sync_engine, first["content_hash"]).ref_count == 1
+    assert os.path.exists(second["file_path"])
+
+    assert api.delete(f"/files/{second['id']}", headers=other_headers).status_code == 200
+    assert blob_row(sync_engine, first["content_hash"]) is None
+    assert not os.path.exists(second["file_path"])
+
+def test_delete_file_with_missing_blob_row(api, auth_headers, sync_engine):
+    from app.models import Blob, File
+
+    file = upload(api, auth_headers, uuid.uuid4().hex.encode())
+    # 模拟记录不一致：文件仍引用已不存在的 Blob
+    with sync_engine.begin() as connection:
+        connection.execute(text("PRAGMA foreign_keys=OFF"))
+        connection.execute(delete(Blob).where(Blob.content_hash == file["content_hash"]))
+
+    response = api.delete(f"/files/{file['id']}", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    with sync_engine.connect() as connection:
+        assert connection.scalar(select(File.id).where(File.id == file["id"])) is None
@@ -0,0 +1,139 @@
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from conftest import wait_until
+
+@pytest.fixture
+def model_backend(server, fake_model, monkeypatch):
+    """让应用的模型客户端指向本地的模拟模型服务"""
+    from app.core.config import settings
+    from app.services import llm
+
+    client = llm.LLMClient(
+        fake_model.url,
+        "test-key",
+        max_connections=10,
+        max_keepalive=10,
+        keepalive_expiry=30.0,
+        connect_timeout=2.0,
+        read_timeout=10.0,
+        max_concurrency=10,
+        max_retries=0,
+        backoff_ms=10,
+        max_backoff_ms=100,
+        breaker_failures=100,
+        breaker_reset=1.0
+    )
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm, "llm_client", client)
+    yield fake_model
+    server.call(client.stop())
+
+def iter_events(response: httpx.Response):
+    """解析 SSE 响应，逐条返回 (事件类型, 数据)"""
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[5:])
+            event = None
+
+def create_session(api, headers) -> str:
+    return api.post("/chat/sessions", json={"title": "stream", "user_id": 0}, headers=headers).json()["data"]["session_id"]
+
+def list_messages(api, headers, session_id: str) -> list:
+    return api.get(f"/chat/sessions/{session_id}/messages", headers=headers).json()["data"]
+
+def test_stream_relays_tokens_as_they_arrive(api, auth_headers, model_backend):
+    model_backend.tokens = [f"t{i} " for i in range(10)]
+    model_backend.token_delay = 0.1
+    session_id = create_session(api, auth_headers)
+    content = f"你好 {uuid.uuid4().hex}"
+
+    events, arrivals = [], []
+    started = time.perf_counter()
+    with api.stream("POST", f"/chat/sessions/{session_id}/messages/stream", json={"content": content}, headers=auth_headers) as response:
+        assert response.status_code == 200
+        for event in iter_events(response):
+            events.append(event)
+            arrivals.append(time.perf_counter() - started)
+    total = time.perf_counter() - started
+
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["start"] + ["token"] * 10 + ["done"]
+    reply = "".join(data["delta"] for kind, data in events if kind == "token")
+    assert reply == "".join(model_backend.tokens)
+    # 第一个 token 在上游输出后立即转发，而不是等整个回复生成完
+    assert arrivals[1] < total / 3
+
+    done = events[-1][1]
+    assert done["user_message"]["content"] == content
+    assert done["ai_message"]["content"] == reply
+    saved = list_messages(api, auth_headers, session_id)
+    assert [(message["role"], message["content"]) for message in saved] == [("user", content), ("assistant", reply)]
+
+def test_disconnect_cancels_upstream(api, auth_headers, model_backend):
+    from app.core.metrics import metrics
+
+    model_backend.tokens = [f"t{i} " for i in range(50)]
+    model_backend.token_delay = 0.05
+    session_id = create_session(api, auth_headers)
+    cancelled = metrics.get_counter("chat.stream.cancelled")
+
+    received = 0
+    with api.stream("POST", f"/chat/sessions/{session_id}/messages/stream", json={"content": uuid.uuid4().hex}, headers=auth_headers) as response:
+        for kind, _ in iter_events(response):
+            received += kind == "token"
+            if received == 2:
+                break
+
+    # 客户端断开后上游请求随之中止，未完成的对话不保存
+    assert wait_until(lambda: model_backend.cancelled_streams == 1)
+    assert model_backend.completed_streams == 0
+    assert wait_until(lambda: metrics.get_counter("chat.stream.cancelled") == cancelled + 1)
+    assert list_messages(api, auth_headers, session_id) == []
+
+def test_upstream_failure_sends_error_event(api, auth_headers, model_backend):
+    model_backend.fail_next(400)
+    session_id = create_session(api, auth_headers)
+
+    with api.stream("POST", f"/chat/sessions/{session_id}/messages/stream", json={"content": uuid.uuid4().hex}, headers=auth_headers) as response:
+        events = list(iter_events(response))
+
+    assert [kind for kind, _ in events] == ["start", "error"]
+    assert list_messages(api, auth_headers, session_id) == []
+
+def test_slow_reply_does_not_hold_a_connection(api, api_url, auth_headers, model_backend, small_pool):
+    model_backend.token_delay = 0.5  # 非流式回复约 2.5 秒
+    session_id = create_session(api, auth_headers)
+
+    def send(content: str) -> httpx.Response:
+        return httpx.post(
+            f"{api_url}/chat/sessions/{session_id}/messages",
+            json={"role": "user", "content": content, "session_id": 0},
+            headers=auth_headers,
+            timeout=60
+        )
+
+    latencies = []
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        sends = [pool.submit(send, uuid.uuid4().hex) for _ in range(3)]
+        time.sleep(0.5)
+        # 等待模型回复期间，其他请求仍能拿到连接，不等到连接池超时
+        for _ in range(5):
+            started = time.perf_counter()
+            response = api.get("/chat/sessions", headers=auth_headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+        assert not any(future.done() for future in sends)
+        responses = [future.result() for future in sends]
+
+    assert max(latencies) < 1.0
+    assert all(response.status_code == 200 for response in responses), [response.text for response in responses]
+    assert len(list_messages(api, auth_headers, session_id)) == 6
@@ -0,0 +1,157 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import pytest
+from sqlalchemy import event, select, text
+
+from conftest import bench_size, percentile, register_user
+
+# 在 SQLite 中执行约数百毫秒的查询（占用 CPU）
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 2000000) SELECT count(*) FROM c"
+)
+# 等待 ms 毫秒的查询，模拟等锁、读盘等不占用 CPU 的慢查询（sleep_ms 由测试注册到每个连接）
+WAIT_QUERY = text("SELECT sleep_ms(:ms)")
+
+# 每个客户端两次请求之间的平均间隔（秒），使总请求速率低于测试环境的处理能力，
+# 延迟反映的是请求之间的相互阻塞，而不是 CPU 饱和后的排队
+THINK_TIME = 4.0
+
+def register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+@pytest.fixture(scope="module")
+def blocking_routes(server):
+    """
+    测试专用路由：与异步路由执行相同的查询，但使用同步 Session（改造前的写法），
+    用来对比查询阻塞事件循环时的表现
+    """
+    from main import app
+    from app.db.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+    from app.models import ChatSession
+
+    async def slow_async():
+        async with AsyncSessionLocal() as db:
+            return {"count": await db.scalar(SLOW_QUERY)}
+
+    async def slow_sync():
+        with SessionLocal() as db:
+            return {"count": db.scalar(SLOW_QUERY)}
+
+    async def wait_async(ms: int):
+        async with AsyncSessionLocal() as db:
+            return {"waited": await db.scalar(WAIT_QUERY, {"ms": ms})}
+
+    async def wait_sync(ms: int):
+        with SessionLocal() as db:
+            return {"waited": db.scalar(WAIT_QUERY, {"ms": ms})}
+
+    def sessions_query(user_id: int):
+        return (
+            select(ChatSession).where(ChatSession.user_id == user_id, ChatSession.is_active == True)
+            .order_by(ChatSession.updated_at.desc(), ChatSession.id.desc()).limit(50)
+        )
+
+    async def sessions_async(user_id: int):
+        async with AsyncSessionLocal() as db:
+            return {"count": len((await db.scalars(sessions_query(user_id))).all())}
+
+    async def sessions_sync(user_id: int):
+        with SessionLocal() as db:
+            return {"count": len(db.scalars(sessions_query(user_id)).all())}
+
+    paths = {
+        "/_test/slow-async": slow_async, "/_test/slow-sync": slow_sync,
+        "/_test/wait-async": wait_async, "/_test/wait-sync": wait_sync,
+        "/_test/sessions-async": sessions_async, "/_test/sessions-sync": sessions_sync,
+    }
+    for path, endpoint in paths.items():
+        app.add_api_route(path, endpoint, methods=["GET"])
+    # 重建连接池，使之后建立的连接都注册了 sleep_ms
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "connect", register_sleep)
+    engine.dispose()
+    server.call(async_engine.dispose())
+    yield
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "connect", register_sleep)
+    app.router.routes[:] = [route for route in app.router.routes if getattr(route, "path", None) not in paths]
+
+def health_latency_during(url: str, slow_path: str) -> tuple:
+    """慢查询执行期间请求 /health，返回 (慢查询耗时, /health 耗时)"""
+    result = {}
+
+    def run_slow():
+        started = time.perf_counter()
+        httpx.get(url + slow_path, timeout=60).raise_for_status()
+        result["slow"] = time.perf_counter() - started
+
+    thread = threading.Thread(target=run_slow)
+    thread.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    httpx.get(url + "/health", timeout=60).raise_for_status()
+    health = time.perf_counter() - started
+    thread.join()
+    return result["slow"], health
+
+def test_slow_query_does_not_block_other_requests(server, blocking_routes):
+    slow, health = health_latency_during(server.url, "/_test/slow-async")
+    assert slow > 0.2
+    assert health < slow / 2
+
+    # 对照：同步 Session 在查询期间阻塞事件循环，/health 要等慢查询结束
+    slow, health = health_latency_during(server.url, "/_test/slow-sync")
+    assert health > slow / 2
+
+async def measure(url: str, fast_path: str, slow_path: str, clients: int, requests_per_client: int) -> list:
+    """
+    clients 个并发客户端各自间隔随机时间依次发出请求，其中每 20 个客户端有 1 个请求慢查询，
+    返回其余客户端（普通请求）的所有耗时
+    """
+    latencies = []
+
+    async def client_loop(client: httpx.AsyncClient, path: str, record: bool):
+        for _ in range(requests_per_client):
+            await asyncio.sleep(random.uniform(0, 2 * THINK_TIME))
+            started = time.perf_counter()
+            response = await client.get(path)
+            if record:
+                latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        await asyncio.gather(*(
+            client_loop(client, slow_path, False) if i % 20 == 0 else client_loop(client, fast_path, True)
+            for i in range(clients)
+        ))
+    return latencies
+
+@pytest.mark.benchmark
+def test_concurrent_clients_p99(server, api_url, blocking_routes):
+    headers = register_user(api_url)
+    with httpx.Client(base_url=api_url, timeout=60) as api:
+        for i in range(50):
+            api.post("/chat/sessions", json={"title": f"s{i}", "user_id": 0}, headers=headers)
+        user_id = api.get("/auth/me", headers=headers).json()["data"]["id"]
+
+    # 改造前：会话列表查询和慢查询（等待 200ms）都用同步 Session；改造后：都用 AsyncSession
+    clients = 200
+    per_client = bench_size(100, 3)
+    results = {}
+    for mode in ("sync", "async"):
+        results[mode] = asyncio.run(measure(
+            server.url, f"/_test/sessions-{mode}?user_id={user_id}", f"/_test/wait-{mode}?ms=200", clients, per_client
+        ))
+    sync_latencies, async_latencies = results["sync"], results["async"]
+
+    for name, latencies in (("sync session", sync_latencies), ("async session", async_latencies)):
+        print(
+            f"\n{name}: {len(latencies)} requests from {clients} clients, "
+            f"p50={percentile(latencies, 0.5) * 1000:.1f}ms p99={percentile(latencies, 0.99) * 1000:.1f}ms"
+        )
+    assert percentile(async_latencies, 0.99) < min(percentile(sync_latencies, 0.99) / 2, 1.0)
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import select, text, update
+
+from conftest import bench_size, percentile
+
+TOOL_ID = "sentiment-analysis"
+
+def usage_count(sync_engine, tool_id: str = TOOL_ID) -> int:
+    with sync_engine.connect() as connection:
+        return connection.scalar(text("SELECT usage_count FROM tools WHERE tool_id = :tool_id"), {"tool_id": tool_id})
+
+def flush_counters(server) -> None:
+    from app.services.counters import counter_buffer
+
+    server.call(counter_buffer.flush())
+
+async def use_tool_concurrently(api_url: str, headers: dict, total: int) -> list:
+    """同时发出 total 个工具使用请求（10 种输入，其余命中结果缓存），返回各请求的状态码"""
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=api_url, timeout=120, limits=limits) as client:
+        responses = await asyncio.gather(*(
+            client.post(f"/ai-tools/{TOOL_ID}/use", json={"text": f"很好用 {i % 10}"}, headers=headers)
+            for i in range(total)
+        ))
+    return [response.status_code for response in responses]
+
+@pytest.mark.benchmark
+def test_concurrent_tool_uses_are_counted_exactly(server, api_url, auth_headers, sync_engine):
+    flush_counters(server)
+    before = usage_count(sync_engine)
+
+    total = 500
+    started = time.perf_counter()
+    statuses = asyncio.run(use_tool_concurrently(api_url, auth_headers, total))
+    print(f"\n{total} concurrent tool uses in {time.perf_counter() - started:.2f}s")
+    assert set(statuses) <= {200, 202}
+
+    flush_counters(server)
+    assert usage_count(sync_engine) == before + total
+
+async def increment_concurrently(tool_pk: int, total: int, buffered: bool) -> tuple:
+    """
+    在服务的事件循环中同时执行 total 次计数：改造前每次 UPDATE 并提交，改造后写入缓冲计数器。
+    返回 (各次耗时, 总耗时)
+    """
+    from app.db.database import AsyncSessionLocal
+    from app.models import Tool
+    from app.services.counters import counter_buffer
+
+    latencies = []
+
+    async def direct():
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Tool).where(Tool.id == tool_pk).values(usage_count=Tool.usage_count + 1))
+            await db.commit()
+
+    async def one():
+        started = time.perf_counter()
+        if buffered:
+            counter_buffer.increment(Tool, "usage_count", tool_pk)
+            await asyncio.sleep(0)
+        else:
+            await direct()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    if buffered:
+        await counter_buffer.flush()
+    return latencies, time.perf_counter() - started
+
+@pytest.mark.benchmark
+def test_counter_contention(server, sync_engine):
+    from app.models import Tool
+
+    with sync_engine.connect() as connection:
+        tool_pk = connection.scalar(select(Tool.id).where(Tool.tool_id == TOOL_ID))
+
+    total = bench_size(50_000, 500)
+    results = {}
+    for mode in ("direct", "buffered"):
+        flush_counters(server)
+        before = usage_count(sync_engine)
+        results[mode] = server.call(increment_concurrently(tool_pk, total, mode == "buffered"), timeout=600)
+        assert usage_count(sync_engine) == before + total
+
+    for mode, (latencies, elapsed) in results.items():
+        print(
+            f"\n{mode}: {total} concurrent increments in {elapsed:.2f}s, "
+            f"p50={percentile(latencies, 0.5) * 1000:.2f}ms p99={percentile(latencies, 0.99) * 1000:.2f}ms"
+        )
+    assert results["buffered"][1] < results["direct"][1] / 10
@@ -0,0 +1,74 @@
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+import httpx
+import pytest
+from sqlalchemy import insert
+
+from conftest import bench_size, percentile, register_user
+
+# 不含 login：注册后登录产生的活动异步写入，统计时单独扣除
+ACTIVITY_TYPES = ["tool_use", "file_upload", "chat", "page_view"]
+BURST_DAYS_AGO = 3  # 每 7 条活动中有 1 条落在这一天，使其成为最活跃的一天
+
+def generate_activities(user_id: int, count: int):
+    """生成 count 条最近 29 天内的活动"""
+    now = datetime.now(timezone.utc)
+    step = timedelta(days=29) / count
+    burst_day = now - timedelta(days=BURST_DAYS_AGO)
+    for index in range(count):
+        created_at = burst_day if index % 7 == 0 else now - step * index
+        yield {"user_id": user_id, "activity_type": ACTIVITY_TYPES[index % len(ACTIVITY_TYPES)], "created_at": created_at}
+
+def seed_user(api_url: str, sync_engine, count: int) -> dict:
+    """注册用户并直接写入 count 条活动，返回认证请求头"""
+    from app.models import UserActivity
+
+    headers = register_user(api_url)
+    user_id = httpx.get(f"{api_url}/auth/me", headers=headers).json()["data"]["id"]
+    rows = generate_activities(user_id, count)
+    with sync_engine.begin() as connection:
+        for _ in range(0, count, 10000):
+            connection.execute(insert(UserActivity), list(islice(rows, 10000)))
+    return headers
+
+def measure_stats(api_url: str, headers: dict, repeat: int = 10) -> tuple:
+    """请求 /dashboard/user/stats，返回 (最后一次的数据, 各次耗时, 单次请求的内存峰值)"""
+    latencies = []
+    with httpx.Client(base_url=api_url, timeout=60) as client:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get("/dashboard/user/stats", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            client.get("/dashboard/user/stats", headers=headers)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+    return response.json()["data"], latencies, peak
+
+@pytest.mark.benchmark
+def test_user_stats_for_heavy_user(api_url, sync_engine):
+    light_count, heavy_count = 100, bench_size(100_000, 20_000)
+    light = measure_stats(api_url, seed_user(api_url, sync_engine, light_count))
+    heavy = measure_stats(api_url, seed_user(api_url, sync_engine, heavy_count))
+
+    for count, (data, latencies, peak) in ((light_count, light), (heavy_count, heavy)):
+        logins = data["activity_breakdown"].pop("login", 0)
+        assert data["total_activities"] - logins == count
+        assert data["activity_breakdown"] == {activity_type: count // len(ACTIVITY_TYPES) for activity_type in ACTIVITY_TYPES}
+        assert data["most_active_day"] == (datetime.now(timezone.utc) - timedelta(days=BURST_DAYS_AGO)).date().isoformat()
+        print(
+            f"\n{count} activities: p50={percentile(latencies, 0.5) * 1000:.1f}ms "
+            f"p99={percentile(latencies, 0.99) * 1000:.1f}ms peak memory={peak / 1024:.0f}KB"
+        )
+
+    # 按分组聚合在数据库中计算，内存不随活动数增长；逐行读入时 2 万条活动约需数十MB
+    assert heavy[2] < light[2] + 1024 * 1024
+    assert percentile(heavy[1], 0.99) < 1.0
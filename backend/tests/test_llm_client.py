@@ -0,0 +1,148 @@
+import asyncio
+import time
+from contextlib import aclosing
+
+import pytest
+
+from app.core.metrics import metrics
+from app.services.llm import ChatBackendError, CircuitBreaker, CircuitOpenError, LLMClient
+
+MESSAGES = [{"role": "user", "content": "你好"}]
+
+def make_client(url: str, **overrides) -> LLMClient:
+    options = dict(
+        max_connections=10,
+        max_keepalive=10,
+        keepalive_expiry=30.0,
+        connect_timeout=2.0,
+        read_timeout=5.0,
+        max_concurrency=5,
+        max_retries=2,
+        backoff_ms=10,
+        max_backoff_ms=1000,
+        breaker_failures=3,
+        breaker_reset=0.3
+    )
+    options.update(overrides)
+    return LLMClient(url, "test-key", **options)
+
+def run(client: LLMClient, coroutine):
+    """在新的事件循环中执行，结束后关闭客户端的连接池"""
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await client.stop()
+
+    return asyncio.run(main())
+
+async def collect(client: LLMClient) -> str:
+    async with aclosing(client.stream("gpt-test", MESSAGES)) as deltas:
+        return "".join([delta async for delta in deltas])
+
+def test_complete_and_stream(fake_model):
+    client = make_client(fake_model.url)
+    assert run(client, client.complete("gpt-test", MESSAGES)) == "你好，世界"
+    client = make_client(fake_model.url)
+    assert run(client, collect(client)) == "你好，世界"
+    assert fake_model.completed_streams == 1
+
+def test_retries_with_retry_after(fake_model):
+    fake_model.fail_next(503, times=2, retry_after=0.2)
+    client = make_client(fake_model.url)
+    retries = metrics.get_counter("llm.retries")
+
+    started = time.perf_counter()
+    assert run(client, client.complete("gpt-test", MESSAGES)) == "你好，世界"
+    # 每次重试前至少等待上游给出的 Retry-After
+    assert time.perf_counter() - started >= 0.4
+    assert fake_model.requests == 3
+    assert metrics.get_counter("llm.retries") - retries == 2
+
+def test_gives_up_after_max_retries(fake_model):
+    fake_model.fail_next(502, times=3)
+    client = make_client(fake_model.url, breaker_failures=10)
+    with pytest.raises(ChatBackendError):
+        run(client, client.complete("gpt-test", MESSAGES))
+    assert fake_model.requests == 3
+
+def test_client_errors_are_not_retried(fake_model):
+    fake_model.fail_next(400)
+    client = make_client(fake_model.url)
+    with pytest.raises(ChatBackendError):
+        run(client, client.complete("gpt-test", MESSAGES))
+    assert fake_model.requests == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_circuit_breaker_opens_and_recovers(fake_model):
+    fake_model.fail_next(500, times=3)
+    client = make_client(fake_model.url, max_retries=0)
+    opened = metrics.get_counter("llm.circuit_opened")
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ChatBackendError):
+                await client.complete("gpt-test", MESSAGES)
+        # 熔断期间请求不发往上游
+        with pytest.raises(CircuitOpenError):
+            await client.complete("gpt-test", MESSAGES)
+        assert fake_model.requests == 3
+        await asyncio.sleep(0.35)
+        # 到期后放行试探请求，成功即恢复
+        return await client.complete("gpt-test", MESSAGES)
+
+    assert run(client, scenario()) == "你好，世界"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert metrics.get_counter("llm.circuit_opened") - opened == 1
+    assert metrics.get_gauge("llm.circuit_open") == 0
+
+def test_reuses_pooled_connections(fake_model):
+    client = make_client(fake_model.url)
+
+    async def scenario():
+        for _ in range(10):
+            await client.complete("gpt-test", MESSAGES)
+            await collect(client)
+
+    run(client, scenario())
+    assert fake_model.requests == 20
+    assert len(fake_model.connections) == 1
+
+def test_limits_concurrency_per_host(fake_model):
+    fake_model.token_delay = 0.02
+    client = make_client(fake_model.url, max_concurrency=3)
+
+    async def scenario():
+        return await asyncio.gather(*(collect(client) for _ in range(10)))
+
+    assert run(client, scenario()) == ["你好，世界"] * 10
+    assert fake_model.max_in_flight == 3
+    assert len(fake_model.connections) == 3
+
+def test_stream_is_not_retried_after_output(fake_model):
+    fake_model.drop_after = 2
+    client = make_client(fake_model.url)
+    received = []
+
+    async def scenario():
+        async with aclosing(client.stream("gpt-test", MESSAGES)) as deltas:
+            async for delta in deltas:
+                received.append(delta)
+
+    with pytest.raises(ChatBackendError):
+        run(client, scenario())
+    # 已输出部分内容，上游断开后不再重试
+    assert received == ["你", "好"]
+    assert fake_model.requests == 1
+
+def test_records_latency_and_error_metrics(fake_model):
+    fake_model.fail_next(503)
+    client = make_client(fake_model.url)
+    before = metrics.snapshot()
+
+    run(client, client.complete("gpt-test", MESSAGES))
+    after = metrics.snapshot()
+    assert metrics.get_counter("llm.requests") - before["counters"].get("llm.requests", 0) == 2
+    assert metrics.get_counter("llm.errors") - before["counters"].get("llm.errors", 0) == 1
+    assert after["timings"]["llm.request"]["count"] > before["timings"].get("llm.request", {}).get("count", 0)
+    assert after["timings"]["llm.complete"]["count"] > before["timings"].get("llm.complete", {}).get("count", 0)
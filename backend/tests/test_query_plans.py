@@ -0,0 +1,117 @@
+import re
+import sqlite3
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import TEST_DIR, register_user
+
+# 执行计划中不允许出现：不走索引的全表扫描，以及分页查询（有 LIMIT、无 GROUP BY）为排序建临时 B 树，
+# 后者意味着要读出所有匹配行排序后才能取第一页
+FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (COVERING )?INDEX| VIRTUAL TABLE)")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+MAIN_TABLE = re.compile(r"\bFROM (\w+)")
+
+# 配置类小表（工具目录、系统设置，只有几十行），直接扫描比走索引更省，不做要求
+SMALL_TABLES = {"tools", "system_settings"}
+
+@contextmanager
+def capture_queries():
+    """记录应用经异步引擎执行的 SELECT 语句及参数"""
+    from app.db.database import async_engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+def plan_problems(connection, statement, parameters):
+    """返回执行计划中不允许出现的步骤"""
+    plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    problems = []
+    for step in plan:
+        scan = FULL_SCAN.match(step)
+        if scan and scan.group(1) not in SMALL_TABLES:
+            problems.append(step)
+    paged = " LIMIT " in statement and " GROUP BY " not in statement
+    # 全文检索按相关性排序必须在匹配结果上进行
+    ranked = " MATCH " in statement
+    if paged and not ranked and MAIN_TABLE.search(statement).group(1) not in SMALL_TABLES:
+        problems.extend(step for step in plan if step == TEMP_SORT)
+    return problems
+
+def exercise_routers(api_url, api):
+    """调用各路由的读写接口，使其查询都执行一遍"""
+    headers = register_user(api_url)
+    other = register_user(api_url)
+
+    api.get("/auth/me", headers=headers)
+
+    file_id = api.post("/files/upload", files={"file": ("plan.txt", b"query plan text", "text/plain")}, headers=headers).json()["data"]["id"]
+    api.post("/files/upload", files={"file": ("plan.txt", b"query plan text", "text/plain")}, headers=other)
+    api.get("/files/", headers=headers)
+    api.get("/files/", params={"limit": 1}, headers=headers)
+    api.get(f"/files/{file_id}", headers=headers)
+    api.get(f"/files/{file_id}/download", headers=headers)
+    token = api.post(f"/files/{file_id}/share", headers=headers).json()["data"]["share_token"]
+    api.get(f"/files/public/{token}")
+    api.get(f"/files/{file_id}/public")
+    upload_id = api.post("/files/uploads", json={"filename": "part.txt", "file_size": 4}, headers=headers).json()["data"]["upload_id"]
+    api.get(f"/files/uploads/{upload_id}", headers=headers)
+
+    session_id = api.post("/chat/sessions", json={"title": "计划 plan", "user_id": 0}, headers=headers).json()["data"]["session_id"]
+    api.post(f"/chat/sessions/{session_id}/messages", json={"role": "user", "content": "query plan", "session_id": 0}, headers=headers)
+    api.post("/chat/sessions", json={"title": "second", "user_id": 0}, headers=headers)
+    page = api.get("/chat/sessions", params={"limit": 1}, headers=headers).json()
+    api.get("/chat/sessions", params={"limit": 1, "cursor": page["next_cursor"]}, headers=headers)
+    api.get(f"/chat/sessions/{session_id}", headers=headers)
+    page = api.get(f"/chat/sessions/{session_id}/messages", params={"limit": 1}, headers=headers).json()
+    api.get(f"/chat/sessions/{session_id}/messages", params={"limit": 1, "cursor": page["next_cursor"]}, headers=headers)
+
+    api.get("/ai-tools/", headers=headers)
+    api.get("/ai-tools/", params={"category": "文本分析"}, headers=headers)
+    api.get("/ai-tools/sentiment-analysis", headers=headers)
+    api.get("/ai-tools/sentiment-analysis/related", headers=headers)
+    api.post("/ai-tools/sentiment-analysis/use", json={"text": f"很好 {uuid.uuid4().hex}"}, headers=headers)
+    job_id = api.post("/ai-tools/sentiment-analysis/jobs", json={"text": "不错"}, headers=headers).json()["data"]["job_id"]
+    api.get(f"/ai-tools/jobs/{job_id}", headers=headers)
+    api.get("/ai-tools/user/usage", headers=headers)
+    api.get("/ai-tools/categories", headers=headers)
+    api.get("/ai-tools/hot/list", headers=headers)
+
+    api.post("/dashboard/activity", params={"activity_type": "page_view"}, headers=headers)
+    api.get("/dashboard/stats", headers=headers)
+    api.get("/dashboard/active-users", headers=headers)
+    api.get("/dashboard/user/stats", headers=headers)
+    api.get("/dashboard/trends", headers=headers)
+
+    api.get("/settings/user", headers=headers)
+    api.get("/settings/system/public", headers=headers)
+    api.get("/settings/system", headers=headers)
+
+    api.get("/search/", params={"q": "plan"}, headers=headers)
+    api.get("/search/suggestions", params={"q": "plan"}, headers=headers)
+
+def test_router_queries_use_indexes(server, api_url, api):
+    with capture_queries() as statements:
+        exercise_routers(api_url, api)
+    assert statements
+
+    connection = sqlite3.connect(f"{TEST_DIR}/test.db")
+    failures = []
+    try:
+        for statement, parameters in statements:
+            problems = plan_problems(connection, statement, parameters)
+            if problems:
+                failures.append(f"{' '.join(statement.split())}\n    -> {problems}")
+    finally:
+        connection.close()
+    assert not failures, "以下查询未使用索引:\n" + "\n".join(dict.fromkeys(failures))
@@ -0,0 +1,73 @@
+import random
+import time
+from itertools import islice
+
+import pytest
+from sqlalchemy import func, insert, select, text
+
+from conftest import bench_size, percentile
+
+# 生成语料使用的词表：中英文常见词，另有只出现在少数消息中的“针”词
+WORDS_ZH = ["今天", "天气", "项目", "会议", "报告", "数据", "模型", "用户", "接口", "测试", "部署", "文档", "问题", "方案", "进度"]
+WORDS_EN = ["report", "model", "deploy", "meeting", "budget", "release", "server", "client", "query", "cache", "index", "review"]
+NEEDLES = {"zephyrquartz": 5, "量子纠缠": 5}
+
+def generate_messages(session_pk: int, count: int, seed: int = 42):
+    """生成 count 条随机消息，针词按 NEEDLES 中的次数插入到随机位置"""
+    rng = random.Random(seed)
+    needle_rows = {}
+    for needle, times in NEEDLES.items():
+        for index in rng.sample(range(count), times):
+            needle_rows[index] = needle
+    for index in range(count):
+        words = rng.choices(WORDS_ZH, k=rng.randint(3, 8)) + rng.choices(WORDS_EN, k=rng.randint(2, 6))
+        rng.shuffle(words)
+        if index in needle_rows:
+            words.insert(rng.randrange(len(words)), needle_rows[index])
+        yield {"session_id": session_pk, "role": "user", "content": " ".join(words), "tokens": 0, "cumulative_tokens": 0}
+
+@pytest.mark.benchmark
+def test_message_search_over_generated_corpus(sync_engine, api, auth_headers):
+    from app.models import ChatMessage, ChatSession
+    from app.services.search_index import rebuild_search_index
+
+    session_id = api.post("/chat/sessions", json={"title": "corpus", "user_id": 0}, headers=auth_headers).json()["data"]["session_id"]
+    count = bench_size(1_000_000, 20_000)
+    with sync_engine.begin() as connection:
+        session_pk = connection.scalar(select(ChatSession.id).where(ChatSession.session_id == session_id))
+        rows = generate_messages(session_pk, count)
+        for _ in range(0, count, 10000):
+            connection.execute(insert(ChatMessage), list(islice(rows, 10000)))
+        # 批量插入不经过 ORM 事件，按回填的方式重建索引
+        rebuild_search_index(connection)
+
+    timings = {}
+    for query, expected in (*NEEDLES.items(), ("项目 report", None), ("deploy", None)):
+        latencies = []
+        for _ in range(20):
+            started = time.perf_counter()
+            response = api.get("/search/", params={"q": query, "search_type": "chats", "limit": 20}, headers=auth_headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200
+        results = response.json()["data"]["results"]
+        if expected is not None:
+            assert len(results) == expected
+            assert all(query in result["content"] for result in results)
+        else:
+            assert len(results) == 20
+        timings[query] = latencies
+
+    # 对照：改造前的 LIKE '%q%' 全表扫描
+    with sync_engine.connect() as connection:
+        started = time.perf_counter()
+        matched = connection.scalar(
+            select(func.count()).select_from(ChatMessage).where(ChatMessage.content.contains("zephyrquartz"))
+        )
+        scan = time.perf_counter() - started
+        assert matched == NEEDLES["zephyrquartz"]
+        total = connection.scalar(text("SELECT count(*) FROM chat_messages"))
+
+    print(f"\n{total} messages, LIKE scan: {scan * 1000:.1f}ms")
+    for query, latencies in timings.items():
+        print(f"search {query!r}: p50={percentile(latencies, 0.5) * 1000:.1f}ms p99={percentile(latencies, 0.99) * 1000:.1f}ms")
+        assert percentile(latencies, 0.99) < 1.0
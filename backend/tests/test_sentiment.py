@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+from app.services.sentiment import default_analyzer, evaluate, load_samples
+
+# 独立于词典编写的留出集，未用于调整词典或阈值；下限按实测准确率（0.86）留出余量
+HOLDOUT_PATH = os.path.join(os.path.dirname(__file__), "data", "sentiment_holdout.json")
+HOLDOUT_MIN_ACCURACY = 0.8
+
+def load_holdout() -> list:
+    with open(HOLDOUT_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_accuracy_on_bundled_samples():
+    report = evaluate(default_analyzer(), load_samples(), repeat_to=0)
+    assert report["accuracy"] >= 0.95, report["errors"]
+
+def test_accuracy_on_holdout():
+    report = evaluate(default_analyzer(), load_holdout(), repeat_to=0)
+    print(f"\nholdout accuracy {report['accuracy']:.4f} {report['accuracy_by_lang']}")
+    assert report["accuracy"] >= HOLDOUT_MIN_ACCURACY, report["errors"]
+    assert all(accuracy >= HOLDOUT_MIN_ACCURACY - 0.05 for accuracy in report["accuracy_by_lang"].values())
+
+def test_batch_matches_single_texts():
+    analyzer = default_analyzer()
+    texts = [sample["text"] for sample in load_holdout()[:20]]
+    assert analyzer.analyze(texts) == [analyzer.analyze([text])[0] for text in texts]
+
+@pytest.mark.benchmark
+def test_throughput():
+    report = evaluate(default_analyzer(), load_samples() + load_holdout(), repeat_to=20000)
+    print(f"\n{report['texts_per_second']} texts/s on one core")
+    # 逐字匹配词典，单核每秒应能处理数千条短文本
+    assert report["texts_per_second"] >= 2000
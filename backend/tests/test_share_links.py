@@ -0,0 +1,79 @@
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import event, update
+
+CONTENT = b"shared file content"
+
+@contextmanager
+def file_queries():
+    """记录期间服务执行的、涉及 files 表的 SQL"""
+    from app.db.database import async_engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if " files" in statement:
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+def upload(api, headers, content: bytes = CONTENT) -> int:
+    response = api.post("/files/upload", files={"file": ("shared.txt", content, "text/plain")}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["id"]
+
+def share(api, headers, file_id: int) -> str:
+    return api.post(f"/files/{file_id}/share", headers=headers).json()["data"]["share_token"]
+
+def test_shared_link_is_served_without_db_lookup(api, auth_headers):
+    token = share(api, auth_headers, upload(api, auth_headers))
+
+    with file_queries() as statements:
+        response = api.get(f"/files/public/{token}")
+        assert response.status_code == 200
+        assert response.content == CONTENT
+        assert "filename" in response.headers["content-disposition"]
+        cached = api.get(f"/files/public/{token}", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+    assert statements == []
+
+def test_token_does_not_expose_storage_path(api, auth_headers):
+    from app.core.config import settings
+    from app.services.share_links import verify_share_token
+
+    payload = verify_share_token(share(api, auth_headers, upload(api, auth_headers)))
+    assert payload["h"]
+    assert not any(settings.BLOB_DIR in str(value) for value in payload.values())
+
+def test_shared_link_stops_after_unshare_and_delete(api, auth_headers):
+    content = uuid.uuid4().hex.encode()
+    file_id = upload(api, auth_headers, content)
+    first, second = share(api, auth_headers, file_id), share(api, auth_headers, file_id)
+
+    api.delete(f"/files/{file_id}/share", params={"share_token": first}, headers=auth_headers)
+    assert api.get(f"/files/public/{first}").status_code == 404
+    assert api.get(f"/files/public/{second}").status_code == 200
+
+    assert api.delete(f"/files/{file_id}", headers=auth_headers).status_code == 200
+    assert api.get(f"/files/public/{second}").status_code == 404
+
+def test_legacy_public_link_keeps_working_until_unshared(api, auth_headers, sync_engine):
+    from app.models import File
+
+    file_id = upload(api, auth_headers)
+    assert api.get(f"/files/{file_id}/public").status_code == 404
+
+    # 此前的分享接口设置 is_public 并发出 /files/{id}/public 链接
+    with sync_engine.begin() as connection:
+        connection.execute(update(File).where(File.id == file_id).values(is_public=True))
+    response = api.get(f"/files/{file_id}/public")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+    assert api.delete(f"/files/{file_id}/share", headers=auth_headers).status_code == 200
+    assert api.get(f"/files/{file_id}/public").status_code == 404
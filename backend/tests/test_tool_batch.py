@@ -0,0 +1,56 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from sqlalchemy import func, select
+
+TOOL_ID = "sentiment-analysis"
+CHUNK_DELAY = 2.0
+
+@pytest.fixture
+def slow_chunks(monkeypatch):
+    """每批输入交给工作进程前先等待 CHUNK_DELAY 秒，模拟执行很慢的批量任务"""
+    from app.services.jobs import job_engine
+
+    run_chunk = job_engine._run_chunk
+
+    async def slow(*args, **kwargs):
+        await asyncio.sleep(CHUNK_DELAY)
+        return await run_chunk(*args, **kwargs)
+
+    monkeypatch.setattr(job_engine, "_run_chunk", slow)
+
+def test_slow_batch_does_not_hold_a_connection(api_url, auth_headers, sync_engine, small_pool, slow_chunks):
+    from app.models import ToolUsage
+
+    def run_batch() -> httpx.Response:
+        inputs = [{"text": f"很好用 {uuid.uuid4().hex}"} for _ in range(3)]
+        return httpx.post(f"{api_url}/ai-tools/{TOOL_ID}/batch", json={"inputs": inputs}, headers=auth_headers, timeout=60)
+
+    latencies = []
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        batches = [pool.submit(run_batch) for _ in range(3)]
+        time.sleep(0.5)
+        # 批量执行期间，其他请求仍能拿到连接，不等到连接池超时
+        with httpx.Client(base_url=api_url, timeout=60) as client:
+            for _ in range(5):
+                started = time.perf_counter()
+                response = client.get(f"/ai-tools/{TOOL_ID}", headers=auth_headers)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.text
+        assert not any(batch.done() for batch in batches)
+        responses = [batch.result() for batch in batches]
+
+    assert max(latencies) < 1.0
+    job_ids = []
+    for response in responses:
+        assert response.status_code == 200, response.text
+        data = response.json()["data"]
+        assert data["succeeded"] == 3
+        job_ids.extend(item["job_id"] for item in data["items"])
+    # 执行结果用新的会话写入
+    with sync_engine.connect() as connection:
+        assert connection.scalar(select(func.count()).where(ToolUsage.job_id.in_(job_ids))) == len(job_ids)
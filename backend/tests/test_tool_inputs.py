@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+
+TOOL_ID = "data-analysis"
+CSV = "a,b\n1,2\n3,4\n"
+
+@pytest.fixture
+def secret_csv(tmp_path):
+    """服务进程可读、但不属于任何用户的文件"""
+    path = tmp_path / f"secret-{uuid.uuid4().hex}.csv"
+    path.write_text("secret,value\n42,7\n")
+    return str(path)
+
+def upload_csv(api, headers) -> int:
+    response = api.post("/files/upload", files={"file": ("data.csv", CSV.encode(), "text/csv")}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["id"]
+
+def use_tool(api, headers, input_data: dict) -> dict:
+    """使用工具并等待结束，返回任务状态"""
+    response = api.post(f"/ai-tools/{TOOL_ID}/use", json=input_data, headers=headers)
+    if response.status_code == 422:
+        return {"status": "failed", "error": response.json()["message"]}
+    assert response.status_code in (200, 202), response.text
+    if response.status_code == 200:
+        return {"status": "done", "result_data": response.json()["data"]}
+    job_id = response.json()["data"]["job_id"]
+    with api.stream("GET", f"/ai-tools/jobs/{job_id}/events", headers=headers) as events:
+        for _ in events.iter_lines():
+            pass
+    return api.get(f"/ai-tools/jobs/{job_id}", headers=headers).json()["data"]
+
+def test_use_ignores_client_file_path(api, auth_headers, secret_csv):
+    job = use_tool(api, auth_headers, {"file_path": secret_csv, "file_name": "x.csv", "mime_type": "text/csv"})
+    assert job["status"] == "failed"
+    assert "file_id" in job["error"]
+    assert "secret" not in str(job)
+
+def test_use_reads_only_the_owned_file(api, auth_headers, secret_csv):
+    file_id = upload_csv(api, auth_headers)
+    job = use_tool(api, auth_headers, {"file_id": file_id, "file_path": secret_csv})
+    assert job["status"] == "done"
+    result = job["result_data"]["result"]
+    assert result["rows"] == 2
+    assert set(result["numeric_columns"]) == {"a", "b"}
+
+def test_batch_ignores_client_file_path(api, auth_headers, secret_csv):
+    file_id = upload_csv(api, auth_headers)
+    response = api.post(
+        f"/ai-tools/{TOOL_ID}/batch",
+        json={"inputs": [{"file_path": secret_csv}, {"file_id": file_id, "file_path": secret_csv}]},
+        headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    raw, owned = response.json()["data"]["items"]
+    assert raw["status"] == "failed"
+    assert "file_id" in raw["error"]
+    assert owned["status"] == "done"
+    assert set(owned["result_data"]["result"]["numeric_columns"]) == {"a", "b"}
+    assert "secret" not in response.text
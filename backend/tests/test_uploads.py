@@ -0,0 +1,97 @@
+import os
+import socket
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from conftest import bench_size
+
+MB = 1024 * 1024
+
+class GeneratedFile:
+    """按需生成内容的只读文件对象，客户端发送大文件时不占用内存"""
+
+    def __init__(self, size: int, seed: int):
+        self.remaining = size
+        self.block = seed.to_bytes(8, "big") * (64 * 1024 // 8)
+
+    def read(self, size: int = -1) -> bytes:
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        self.remaining -= size
+        return (self.block * (size // len(self.block) + 1))[:size]
+
+def upload(api_url: str, headers: dict, size: int, seed: int) -> httpx.Response:
+    with httpx.Client(base_url=api_url, timeout=120) as client:
+        return client.post(
+            "/files/upload",
+            files={"file": (f"large-{seed}.bin", GeneratedFile(size, seed), "application/octet-stream")},
+            headers=headers
+        )
+
+@pytest.mark.benchmark
+def test_parallel_uploads_memory_ceiling(api_url, auth_headers):
+    from app.core.config import settings
+
+    parallel = bench_size(100, 10)
+    size = 16 * MB
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            responses = list(pool.map(lambda seed: upload(api_url, auth_headers, size, seed), range(parallel)))
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert {response.json()["data"]["file_size"] for response in responses} == {size}
+    assert len({response.json()["data"]["content_hash"] for response in responses}) == parallel
+
+    print(f"\n{parallel} parallel uploads of {size // MB}MB: peak Python memory {peak / MB:.1f}MB")
+    # 每个上传在内存中最多有一个写盘分块和 multipart 解析的缓冲（1MB 后转存磁盘），与文件大小无关
+    assert peak < parallel * (settings.UPLOAD_CHUNK_SIZE + 2 * MB)
+
+def test_oversized_upload_is_rejected_while_streaming(api_url, auth_headers):
+    from app.core.config import settings
+
+    response = upload(api_url, auth_headers, settings.MAX_FILE_SIZE + MB, seed=255)
+    assert response.status_code == 413
+    # 已写入的部分在中止时删除（.part 为分块上传会话的文件）
+    assert not [name for name in os.listdir(settings.UPLOAD_TEMP_DIR) if name.endswith(".upload")]
+
+def test_chunked_upload_is_rejected_once_the_limit_is_passed(server, auth_headers):
+    """
+    不带 Content-Length 的分块传输请求：只发送刚超过限制的内容、不结束请求体，
+    服务应立即返回413，而不是等待整个请求体接收完再检查大小
+    """
+    from app.core.config import settings
+
+    host, port = server.url.rsplit("//", 1)[1].split(":")
+    boundary = "chunked-upload-boundary"
+    head = (
+        "POST /api/v1/files/upload HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        f"Authorization: {auth_headers['Authorization']}\r\n"
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+        "Transfer-Encoding: chunked\r\n\r\n"
+    ).encode()
+    part = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.bin\"\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+
+    block = b"x" * (256 * 1024)
+    with socket.create_connection((host, int(port)), timeout=10) as connection:
+        connection.sendall(head + b"%x\r\n%s\r\n" % (len(part), part))
+        for _ in range(settings.MAX_FILE_SIZE // len(block) + 2):
+            connection.sendall(b"%x\r\n%s\r\n" % (len(block), block))
+        response = b""
+        while b"\r\n" not in response:
+            data = connection.recv(4096)
+            if not data:
+                break
+            response += data
+
+    assert response.split(b" ")[1] == b"413"